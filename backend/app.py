@@ -1,127 +1,323 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory, session
+from flask import Flask, Blueprint, current_app, request, jsonify, send_file, send_from_directory, session, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import warnings
-import base64
 import secrets
+import threading
+import io
+import time
+import shutil
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 
 warnings.filterwarnings("ignore", message="Core Pydantic V1 functionality")
 
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
-from groq import Groq
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import load_only
 import json
-from pydub import AudioSegment
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import io
 import re
-import random
-
-from database import db, Question, Sample
-import cloudinary
-import cloudinary.uploader
+import base64
+import binascii
+import urllib.request
+
+from database import db, Question, Sample, SampleResponse, upgrade_schema
+from audio import DecodedAudio, probe_duration, decode_pcm, encode_for_transcription, plan_segments, AudioDecodeError
+from transcripts import stitch_transcripts, stitch_words
+from fluency import analyze_fluency, apply_fluency, format_fluency
+from cache import ResultCache, content_hash
+from sample_responses import get_sample_response, warm_up, start_warm_up, warmup_status, SAMPLE_RESPONSE_VARIANTS
+from llm_output import JSONStreamScanner, parse_llm_json, parse_llm_value, LLMOutputError
+from reports import ReportStore
+from ratelimit import RateLimiter, MemoryBackend, SQLiteBackend
+from jobs import JobQueue, WorkerPool, QueueFull, TERMINAL_STATUSES
+from janitor import TempFileRegistry, Janitor
+from question_sampler import QuestionSampler
+from catalog import CatalogCache, bump_catalog_version, catalog_version
+from search import SearchIndex
+from storage import create_storage, store_sample_media, derive_sample_media, LocalStorage
+from bulk import BulkImporter, BulkImportError, export_catalog, start_import, import_status, file_hash
+from batch import extract_archive, prepare_audio, decode_pool, ClassSummary, BatchError, BatchFileError, BATCH_MAX_FILES
+from upstream import UpstreamGovernor, MemorySlots, SQLiteSlots, GovernedClient, UpstreamBusy, create_http_client, parse_limits
+import metrics
+from metrics import timed, record_tokens
+import click
 
 load_dotenv()
 
-app = Flask(__name__, static_folder='build', static_url_path='')
+# Every route, hook and CLI command below is registered on this blueprint;
+# create_app() (called at the bottom as app = create_app()) builds the app
+api = Blueprint('api', __name__, cli_group=None)
 
-# REMOVED REDIS LIMITER - Use custom rate limiting instead
-# If you need Redis later, add it back with proper configuration
+UPLOAD_FOLDER = 'uploads'
+ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'webm', 'ogg'}
 
-# Security Configuration
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_PATH'] = '/'
+# SECURE CORS - Replace * with your actual frontend domain
+ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 
-# Environment-specific cookie settings
-if os.getenv('PRODUCTION') == 'true':
-    app.config['SESSION_COOKIE_SECURE'] = True
-    app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Required for cross-origin
-else:
-    app.config['SESSION_COOKIE_SECURE'] = False
-    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+def create_app(test_config=None):
+    """Build the Flask app: configuration, extensions and the api blueprint.
 
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
+    Nothing here touches the database or imports the Groq/docx/numpy
+    stacks, so a worker (or a --preload master) is ready in a fraction of
+    the old import time. Schema setup is `flask --app app init-db`.
+    test_config overrides the environment-derived settings.
+    """
+    app = Flask(__name__, static_folder='build', static_url_path='')
+    
+    # REMOVED REDIS LIMITER - Use custom rate limiting instead
+    # If you need Redis later, add it back with proper configuration
+    
+    # Security Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_PATH'] = '/'
+    
+    # Environment-specific cookie settings
+    if os.getenv('PRODUCTION') == 'true':
+        app.config['SESSION_COOKIE_SECURE'] = True
+        app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Required for cross-origin
+    else:
+        app.config['SESSION_COOKIE_SECURE'] = False
+        app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
+    
+    # Database Configuration
+    database_url = os.getenv('DATABASE_URL')
+    if database_url and database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url or 'sqlite:///necs.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Raised for batch analysis, where a class's recordings arrive in one request
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 50)) * 1024 * 1024
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    
+    if test_config:
+        app.config.update(test_config)
+    
+    db.init_app(app)
+    
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": ALLOWED_ORIGINS,
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # ✅ Added OPTIONS
+            "allow_headers": ["Content-Type"],
+            "supports_credentials": True,
+            "expose_headers": ["Content-Type", "Retry-After"]  # ✅ Added this
+        }
+    })
+    
+    # Per-stage Prometheus histograms on /metrics, and a Server-Timing header on
+    # every response
+    metrics.init_app(app)
+    
+    app.register_blueprint(api)
+    return app
 
-# Database Configuration
-database_url = os.getenv('DATABASE_URL')
-if database_url and database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
+def init_db():
+    """Create tables, add new columns/indexes and set up search; safe to re-run"""
+    db.create_all()
+    upgrade_schema()
+    # Rows inserted outside the ORM (older migrate_samples.py runs) have no
+    # created_at, which the keyset pagination relies on; list them last
+    Sample.query.filter(Sample.created_at.is_(None)).update({Sample.created_at: datetime(1970, 1, 1)})
+    # Samples from before background uploads were already uploaded
+    Sample.query.filter(Sample.upload_status.is_(None)).update({Sample.upload_status: 'ready'})
+    db.session.commit()
+    search_index.setup()
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# Caps concurrent Groq calls per model to match the account's quota; calls
+# over the cap queue in arrival order (shared by all workers with sqlite)
+if os.getenv('UPSTREAM_GOVERNOR_BACKEND', 'sqlite') == 'memory':
+    upstream_slots = MemorySlots()
+else:
+    upstream_slots = SQLiteSlots(
+        os.getenv('UPSTREAM_GOVERNOR_PATH', os.path.join(UPLOAD_FOLDER, 'cache', 'upstream.db'))
+    )
 
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url or 'sqlite:///necs.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+upstream_governor = UpstreamGovernor(
+    upstream_slots,
+    limits=parse_limits(os.getenv('UPSTREAM_CONCURRENCY', '')),
+    default_limit=int(os.getenv('UPSTREAM_MAX_IN_FLIGHT', 8)),
+    queue_timeout=float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', 60)),
+    retry_after=int(os.getenv('UPSTREAM_RETRY_AFTER', 30))
+)
 
-db.init_app(app)
+_groq_client = None
+_groq_client_pid = None
+
+def get_groq_client():
+    """The Groq client, created on first use - importing groq is the single
+    largest cost of booting a worker. Each process gets its own connection
+    pool, and every call goes through upstream_governor."""
+    global _groq_client, _groq_client_pid
+    if _groq_client is None or _groq_client_pid != os.getpid():
+        from groq import Groq
+        _groq_client = GovernedClient(
+            Groq(api_key=os.getenv("GROQ_API_KEY"), http_client=create_http_client()),
+            upstream_governor
+        )
+        _groq_client_pid = os.getpid()
+    return _groq_client
+
+# Transcripts keyed by the decoded audio, gradings by (transcript, topic, prompt version)
+result_cache = ResultCache(
+    os.getenv('RESULT_CACHE_PATH', os.path.join(UPLOAD_FOLDER, 'cache', 'results.db')),
+    max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 256)),
+    ttl_seconds=int(os.getenv('RESULT_CACHE_TTL', 7 * 24 * 3600))
+)
 
-with app.app_context():
-    db.create_all()
-    print("✅ Database tables created successfully!")
+# Analysis results by id; the .docx is only rendered when someone downloads it
+report_store = ReportStore(
+    os.getenv('REPORT_CACHE_DIR', os.path.join(UPLOAD_FOLDER, 'reports')),
+    ttl_seconds=int(os.getenv('REPORT_TTL', 7 * 24 * 3600))
+)
 
-# Cloudinary Configuration
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-    secure=True
+# Analysis job queue - uploads live in their own folder so the temp file
+# janitor never removes a file that is still waiting in the queue
+JOB_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'jobs')
+os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+
+job_queue = JobQueue(
+    os.getenv('JOB_QUEUE_PATH', os.path.join(JOB_UPLOAD_FOLDER, 'queue.db')),
+    max_depth=int(os.getenv('JOB_QUEUE_MAX_DEPTH', 20)),
+    retry_after=int(os.getenv('JOB_RETRY_AFTER', 30)),
+    # Every gunicorn worker runs its own pool; this caps running jobs for the node
+    max_running=int(os.getenv('JOB_MAX_RUNNING', os.getenv('JOB_WORKERS', 2)))
 )
 
-# SECURE CORS - Replace * with your actual frontend domain
-ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
+# Batch (classroom) uploads, one folder per request; the files are registered
+# with the temp file janitor like single uploads
+BATCH_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'batches')
+os.makedirs(BATCH_UPLOAD_FOLDER, exist_ok=True)
+# Files of one batch analyzed at once; their upstream calls still go through
+# the shared upstream governor
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+
+# Where sample audio is stored (AUDIO_STORAGE=cloudinary|local)
+audio_storage = create_storage()
+
+# Sample audio waiting for the background uploader, and its durable queue
+PENDING_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'pending')
+os.makedirs(PENDING_UPLOAD_FOLDER, exist_ok=True)
+upload_queue = JobQueue(
+    os.path.join(PENDING_UPLOAD_FOLDER, 'queue.db'),
+    max_depth=int(os.getenv('SAMPLE_UPLOAD_QUEUE_DEPTH', 200)),
+    retry_after=int(os.getenv('JOB_RETRY_AFTER', 30))
+)
+SAMPLE_UPLOAD_RETRIES = int(os.getenv('SAMPLE_UPLOAD_RETRIES', 4))
+
+# Bulk import files and their resume checkpoints
+IMPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'imports')
+os.makedirs(IMPORT_FOLDER, exist_ok=True)
+
+# Random questions are drawn from a cached (id, category) index
+question_sampler = QuestionSampler(ttl_seconds=int(os.getenv('QUESTION_INDEX_TTL', 60)))
+
+# Serialized /api/questions and /api/samples responses, rebuilt when an admin
+# write bumps the catalog's version row
+catalog_cache = CatalogCache(max_entries=int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 256)))
+
+# Ranked search over samples and questions (indexes are created by init-db)
+search_index = SearchIndex()
+
+# TF-IDF index of sample transcripts for "related samples" after an analysis,
+# built on first use (it pulls in numpy/scipy)
+_related_samples = None
+RELATED_SAMPLES_LIMIT = int(os.getenv('RELATED_SAMPLES_LIMIT', 4))
+
+# Temp uploads are registered when written and deleted by a background thread
+# once older than TEMP_FILE_MAX_AGE, so requests never scan the upload folder.
+# A startup sweep removes files orphaned by a worker that died mid-request.
+temp_files = TempFileRegistry(max_age=int(os.getenv('TEMP_FILE_MAX_AGE', 3600)))
+janitor = Janitor(
+    temp_files,
+    sweep_folders=[
+        (UPLOAD_FOLDER, temp_files.max_age),
+        (JOB_UPLOAD_FOLDER, int(os.getenv('JOB_UPLOAD_MAX_AGE', 24 * 3600)))
+    ],
+    interval=int(os.getenv('JANITOR_INTERVAL', 60)),
+    keep={'questions.json', 'metadata.json', 'queue.db', 'queue.db-wal', 'queue.db-shm'},
+    # Batch folders left behind by a worker killed mid-batch
+    sweep_dirs=[(BATCH_UPLOAD_FOLDER, temp_files.max_age)]
+)
 
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ALLOWED_ORIGINS,
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # ✅ Added OPTIONS
-        "allow_headers": ["Content-Type"],
-        "supports_credentials": True,
-        "expose_headers": ["Content-Type"]  # ✅ Added this
-    }
-})
+# The app background work (janitor tasks, queue workers) runs under: the one
+# that started the workers in this process. A spawned job process has none
+# and uses the module's app.
+_background_app = None
 
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
-app.config['UPLOAD_FOLDER'] = 'uploads'
-ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'webm', 'ogg'}
+def background_app():
+    return _background_app or app
 
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+def purge_reports():
+    with background_app().app_context():
+        report_store.purge()
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+janitor.every(3600, purge_reports)
+janitor.every(600, job_queue.purge)
+janitor.every(600, upload_queue.purge)
+
+@api.before_app_request
+def start_background_workers():
+    global _background_app
+    if _background_app is None:
+        _background_app = current_app._get_current_object()
+    janitor.start()
+    # Uploads still queued from before a restart resume on the first request
+    upload_pool.start()
 
 # ADMIN PASSWORD - FIXED
 ADMIN_PASSWORD_HASH = os.getenv('ADMIN_PASSWORD_HASH')
-if not ADMIN_PASSWORD_HASH:
-    print("⚠️ WARNING: Using fallback password hash. Set ADMIN_PASSWORD_HASH in production!")
-    ADMIN_PASSWORD_HASH = generate_password_hash('040108Minhtri')
-    print(f"✅ Generated hash for testing: {ADMIN_PASSWORD_HASH[:50]}...")
 
-# Rate Limiting Storage (simple in-memory)
-rate_limit_storage = {}
+def admin_password_hash():
+    # The fallback is hashed on the first login rather than at import (scrypt is slow)
+    global ADMIN_PASSWORD_HASH
+    if not ADMIN_PASSWORD_HASH:
+        print("⚠️ WARNING: Using fallback password hash. Set ADMIN_PASSWORD_HASH in production!")
+        ADMIN_PASSWORD_HASH = generate_password_hash('040108Minhtri')
+        print(f"✅ Generated hash for testing: {ADMIN_PASSWORD_HASH[:50]}...")
+    return ADMIN_PASSWORD_HASH
+
+# Rate Limiting - token buckets shared by every worker on the node (sqlite)
+# or kept per process (memory)
+if os.getenv('RATE_LIMIT_BACKEND', 'sqlite') == 'memory':
+    rate_limiter = RateLimiter(MemoryBackend())
+else:
+    rate_limiter = RateLimiter(SQLiteBackend(
+        os.getenv('RATE_LIMIT_PATH', os.path.join(UPLOAD_FOLDER, 'ratelimit', 'buckets.db'))
+    ))
+
+# Off only for load tests, which send every request from one address
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') != '0'
 
-def rate_limit(max_requests=10, window_seconds=60):
-    """Simple rate limiting decorator"""
+def rate_limit(max_requests=10, window_seconds=60, scope=None):
+    """Rate limiting decorator - one bucket per client IP for each endpoint,
+    or for each scope when several endpoints share a budget"""
     def decorator(f):
+        if not RATE_LIMIT_ENABLED:
+            return f
+        
         @wraps(f)
         def wrapped(*args, **kwargs):
-            client_ip = request.remote_addr
-            current_time = datetime.now()
-            
-            if client_ip not in rate_limit_storage:
-                rate_limit_storage[client_ip] = []
-            
-            # Clean old requests
-            rate_limit_storage[client_ip] = [
-                req_time for req_time in rate_limit_storage[client_ip]
-                if (current_time - req_time).seconds < window_seconds
-            ]
+            allowed, retry_after = rate_limiter.hit(
+                f"{scope or f.__name__}:{request.remote_addr}", max_requests, window_seconds
+            )
             
-            if len(rate_limit_storage[client_ip]) >= max_requests:
-                return jsonify({"error": "Rate limit exceeded. Try again later."}), 429
+            if not allowed:
+                response = jsonify({"error": "Rate limit exceeded. Try again later."})
+                response.headers['Retry-After'] = str(int(retry_after) + 1)
+                return response, 429
             
-            rate_limit_storage[client_ip].append(current_time)
             return f(*args, **kwargs)
         return wrapped
     return decorator
@@ -139,7 +335,7 @@ def require_admin():
 
 # ============= AUTHENTICATION ROUTES =============
 
-@app.route('/api/admin/login', methods=['POST'])
+@api.route('/api/admin/login', methods=['POST'])
 @rate_limit(max_requests=5, window_seconds=300)
 def admin_login():
     """Secure admin login endpoint"""
@@ -150,7 +346,7 @@ def admin_login():
         print(f"🔐 Login attempt - Password received: {bool(password)}")
         print(f"🔐 Hash exists: {bool(ADMIN_PASSWORD_HASH)}")
         
-        if check_password_hash(ADMIN_PASSWORD_HASH, password):
+        if check_password_hash(admin_password_hash(), password):
             session['admin_authenticated'] = True
             session.permanent = True
             print("✅ Login successful!")
@@ -166,13 +362,13 @@ def admin_login():
         print(f"❌ Login error: {str(e)}")
         return jsonify({"error": "Login failed"}), 500
 
-@app.route('/api/admin/logout', methods=['POST'])
+@api.route('/api/admin/logout', methods=['POST'])
 def admin_logout():
     """Admin logout endpoint"""
     session.pop('admin_authenticated', None)
     return jsonify({"success": True, "message": "Logged out"})
 
-@app.route('/api/admin/check', methods=['GET'])
+@api.route('/api/admin/check', methods=['GET'])
 def check_admin():
     """Check if user is authenticated"""
     return jsonify({
@@ -190,62 +386,95 @@ def clean_metadata_file():
         with open(path, 'w', encoding='utf-8') as f:
             f.write(cleaned)
 
-clean_metadata_file()
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def cleanup_old_files():
-    try:
-        current_time = datetime.now().timestamp()
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if filename in ['samples', 'simulations', 'questions.json', 'metadata.json']:
-                continue
-            if os.path.isfile(filepath):
-                file_age = current_time - os.path.getmtime(filepath)
-                if file_age > 3600:
-                    os.remove(filepath)
-    except Exception as e:
-        print(f"Cleanup error: {e}")
+TRANSCRIPTION_MODEL = "whisper-large-v3-turbo"
+GRADING_MODEL = "llama-3.3-70b-versatile"
 
-def get_audio_duration(file_path):
-    audio = AudioSegment.from_file(file_path)
-    return len(audio) / 1000.0
+# Longest recording accepted, and the most audio sent in one Whisper request
+MAX_AUDIO_SECONDS = int(os.getenv('MAX_AUDIO_SECONDS', 320))
+MAX_TRANSCRIPTION_MB = float(os.getenv('MAX_TRANSCRIPTION_MB', 20))
 
-def convert_to_wav(input_path, output_path):
-    audio = AudioSegment.from_file(input_path)
-    audio = audio.set_frame_rate(16000).set_channels(1)
-    audio.export(output_path, format="wav")
-    return output_path
+# Recordings longer than 1.5x this are split at pauses and the pieces
+# transcribed concurrently (0 = always send the whole recording)
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv('TRANSCRIBE_CHUNK_SECONDS', 0))
+TRANSCRIBE_CHUNK_OVERLAP = float(os.getenv('TRANSCRIBE_CHUNK_OVERLAP', 1.5))
+TRANSCRIBE_CHUNK_WORKERS = int(os.getenv('TRANSCRIBE_CHUNK_WORKERS', 4))
 
-def transcribe_audio(file_path):
+def transcribe_audio(audio, encoded=None):
+    """Transcribe a DecodedAudio buffer - the PCM is never decoded again here"""
     try:
-        with open(file_path, 'rb') as audio_file:
-            transcription = groq_client.audio.transcriptions.create(
-                file=("audio.wav", audio_file.read()),
-                model="whisper-large-v3-turbo",
-                response_format="json",
+        filename, audio_stream, size = encoded or encode_for_transcription(audio)
+        metrics.UPSTREAM_BYTES.labels(TRANSCRIPTION_MODEL).inc(size)
+        with audio_stream:
+            transcription = get_groq_client().audio.transcriptions.create(
+                file=(filename, audio_stream),
+                model=TRANSCRIPTION_MODEL,
+                response_format="verbose_json",
+                timestamp_granularities=["word"],
             )
         
-        duration = get_audio_duration(file_path)
         transcript_text = transcription.text if hasattr(transcription, 'text') else str(transcription)
+        # verbose_json adds [{"word", "start", "end"}]; older deployments may not send it
+        words = [
+            {"word": w["word"].strip(), "start": round(w["start"], 2), "end": round(w["end"], 2)}
+            for w in getattr(transcription, 'words', None) or []
+        ]
         
         return {
             "text": transcript_text,
-            "words": [],
-            "duration": duration
+            "words": words,
+            "duration": audio.duration
         }
+    except UpstreamBusy:
+        raise
     except Exception as e:
         print(f"Transcription error: {str(e)}")
         raise Exception(f"Transcription failed: {str(e)}")
 
-def grade_speech(topic, transcript_data):
+def transcribe_segments(audio, segments):
+    """Transcribe (start, end) slices of the recording concurrently and stitch the texts.
+
+    Every slice is encoded and uploaded on its own, so the upload limit
+    applies per slice; the upstream governor still caps how many run at once.
+    """
+    def transcribe_slice(segment):
+        piece = audio.slice(*segment)
+        with timed('encode'):
+            encoded = encode_for_transcription(piece)
+        if encoded[2] / (1024 * 1024) > MAX_TRANSCRIPTION_MB:
+            encoded[1].close()
+            raise AnalysisError("Audio file too large")
+        return transcribe_audio(piece, encoded)
+    
+    with ThreadPoolExecutor(min(TRANSCRIBE_CHUNK_WORKERS, len(segments))) as pool:
+        parts = list(pool.map(transcribe_slice, segments))
+    
+    return {
+        "text": stitch_transcripts([part["text"] for part in parts]),
+        "words": stitch_words([part["words"] for part in parts], segments),
+        "duration": audio.duration
+    }
+
+# Bump whenever the grading prompt or model changes so cached gradings are not reused
+GRADING_PROMPT_VERSION = '3'
+
+def build_grading_prompt(topic, transcript_data):
     transcript_text = transcript_data["text"]
     total_words = len(transcript_text.split())
     duration = transcript_data["duration"]
     words_per_minute = (total_words / duration * 60) if duration > 0 else 0
     
+    # Measured locally from the audio, so the model grades delivery from
+    # numbers instead of guessing them from the text
+    delivery_section = ""
+    if transcript_data.get("fluency"):
+        delivery_section = f"""
+**Delivery Measurements (from the audio):**
+{format_fluency(transcript_data["fluency"])}
+"""
+    
     prompt = f"""You are an expert English speaking examiner. Grade the following speech response based on this rubric:
 
 **Rubric (Total: 2.0 points)**
@@ -271,24 +500,16 @@ def grade_speech(topic, transcript_data):
 - Total words: {total_words}
 - Duration: {duration:.1f} seconds
 - Speaking pace: {words_per_minute:.0f} words/minute
-
+{delivery_section}
 **Instructions:**
 1. Provide scores for each criterion (rounded to 2 decimal places)
 2. Give detailed feedback for each criterion with specific examples from the transcript
 3. Point out both strengths and areas for improvement
-4. Generate a comprehensive sample 2.0/2.0 response to the same topic that would take approximately 5 minutes to speak (around 600-750 words). The sample should:
-   - Start with "My question is... (if question number is provided), and the prompt is... Here is my response." and then answer the question fully
-   - End with "This is the end of my speech. Thank you."
-   - Be detailed and well-structured with clear introduction, body paragraphs, and conclusion
-   - Include specific examples, explanations, and supporting details
-   - Demonstrate sophisticated vocabulary and varied sentence structures
-   - Show natural flow with appropriate transitions
-   - Be comprehensive enough to fill a 5-minute speaking time
-   - Be creative in the introduction to hook the listener's attention
 
 Note: 
 - Return feedback in bullet points when appropriate to maximize clarity (Strengths, Weaknesses, Suggestions)
 - Grade at C2 level of the CEFR framework
+- Base the delivery score on the delivery measurements when given, and keep delivery feedback to 2-3 short bullet points that cite them
 
 **Return your response in this EXACT JSON format:**
 {{
@@ -302,112 +523,104 @@ Note:
         "content": "Detailed feedback with examples...",
         "accuracy": "Detailed feedback with examples...",
         "delivery": "Detailed feedback with examples..."
-    }},
-    "sample_response": "A complete 2.0/2.0 sample response to the topic..."
+    }}
 }}"""
 
-    response = groq_client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    
-    result_text = response.choices[0].message.content
-    
-    if "```json" in result_text:
-        result_text = result_text.split("```json")[1].split("```")[0].strip()
-    elif "```" in result_text:
-        result_text = result_text.split("```")[1].split("```")[0].strip()
-    
-    result_text = result_text.replace('"', '"').replace('"', '"')
-    result_text = result_text.replace(''', "'").replace(''', "'")
-    result_text = result_text.replace('—', '-').replace('–', '-')
-    result_text = result_text.replace('\u2018', "'").replace('\u2019', "'")
-    result_text = result_text.replace('\u201c', '"').replace('\u201d', '"')
-    result_text = result_text.replace('\u2013', '-').replace('\u2014', '-')
-    result_text = re.sub(r'[\u200b-\u200f\u202a-\u202e\u2060\uFEFF]', '', result_text)
-    result_text = result_text.replace('\u202f', ' ')
-    result_text = result_text.replace('\ufeff', '')
-    result_text = result_text.replace('\u00A0', ' ')
-    result_text = re.sub(r'[^\x00-\x7F]+', '', result_text)
-    result_text = re.sub(r'[\x00-\x1F\x7F]', '', result_text)
-    
-    return json.loads(result_text)
+    return prompt
 
-def generate_docx(topic, transcript, grading_result):
-    doc = Document()
-    
-    title = doc.add_heading('necs. - Speech Feedback Report', 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    doc.add_paragraph(f"Date: {datetime.now().strftime('%B %d, %Y')}")
-    doc.add_paragraph(f"Topic: {topic}")
-    doc.add_paragraph()
-    
-    doc.add_heading('Score Summary', 1)
-    scores = grading_result['scores']
-    
-    table = doc.add_table(rows=5, cols=2)
-    table.style = 'Light Grid Accent 1'
-    
-    score_data = [
-        ('Content', f"{scores['content']}/0.9"),
-        ('Accuracy', f"{scores['accuracy']}/0.6"),
-        ('Delivery', f"{scores['delivery']}/0.5"),
-        ('', ''),
-        ('TOTAL SCORE', f"{scores['total']}/2.0")
-    ]
-    
-    for i, (criterion, score) in enumerate(score_data):
-        table.rows[i].cells[0].text = criterion
-        table.rows[i].cells[1].text = score
-        if i == 4:
-            for cell in table.rows[i].cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.bold = True
-    
-    doc.add_paragraph()
-    
-    doc.add_heading('Detailed Feedback', 1)
-    feedback = grading_result['feedback']
-    
-    doc.add_heading('1. Content', 2)
-    doc.add_paragraph(feedback['content'])
-    
-    doc.add_heading('2. Accuracy', 2)
-    doc.add_paragraph(feedback['accuracy'])
-    
-    doc.add_heading('3. Delivery', 2)
-    doc.add_paragraph(feedback['delivery'])
-    
-    doc.add_page_break()
-    
-    doc.add_heading('Your Speech Transcript', 1)
-    doc.add_paragraph(transcript)
+GRADING_SCHEMA = {
+    "scores": {"content": float, "accuracy": float, "delivery": float, "total": float},
+    "feedback": {"content": str, "accuracy": str, "delivery": str},
+}
+
+def parse_grading_output(result_text):
+    try:
+        with timed('parse'):
+            return parse_llm_json(result_text, GRADING_SCHEMA)
+    except LLMOutputError as e:
+        print(f"Unparseable grading output: {e}\n{result_text[:2000]}")
+        raise Exception(f"Grading failed: {e}")
+
+def blend_delivery(grading_result, transcript_data):
+    """Fold the locally measured delivery score into the model's grading"""
+    return {**grading_result, "scores": apply_fluency(grading_result["scores"], transcript_data.get("fluency"))}
+
+def grade_speech(topic, transcript_data):
+    with timed('grade'):
+        response = get_groq_client().chat.completions.create(
+            model=GRADING_MODEL,
+            messages=[{"role": "user", "content": build_grading_prompt(topic, transcript_data)}],
+            temperature=0.3
+        )
+    record_tokens(GRADING_MODEL, response.usage)
     
-    doc.add_page_break()
+    return blend_delivery(parse_grading_output(response.choices[0].message.content), transcript_data)
+
+def grade_speech_stream(topic, transcript_data):
+    """Stream the grading completion, yielding sections as soon as they close.
+
+    Yields ('scores', dict), ('feedback', section, text) for each feedback
+    section and finally ('result', full grading) parsed exactly like
+    grade_speech. A section that doesn't parse on its own is not sent
+    early; it comes from the full parse at the end instead.
+    """
+    sections = []
+    sent = set()
     
-    doc.add_heading('Sample 2.0/2.0 Response', 1)
-    doc.add_paragraph(grading_result['sample_response'])
+    def on_value(path, raw):
+        if path == ('scores',):
+            spec = GRADING_SCHEMA['scores']
+        elif len(path) == 2 and path[0] == 'feedback' and path[1] in GRADING_SCHEMA['feedback']:
+            spec = str
+        else:
+            return
+        try:
+            value = parse_llm_value(raw, spec)
+        except LLMOutputError:
+            return
+        sent.add(path)
+        if path == ('scores',):
+            sections.append(('scores', apply_fluency(value, transcript_data.get("fluency"))))
+        else:
+            sections.append(('feedback', path[1], value))
     
-    file_stream = io.BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
+    scanner = JSONStreamScanner(on_value)
+    with timed('grade'):
+        stream = get_groq_client().chat.completions.create(
+            model=GRADING_MODEL,
+            messages=[{"role": "user", "content": build_grading_prompt(topic, transcript_data)}],
+            temperature=0.3,
+            stream=True
+        )
+        
+        for chunk in stream:
+            # Groq reports usage on the final chunk
+            record_tokens(GRADING_MODEL, getattr(getattr(chunk, 'x_groq', None), 'usage', None))
+            if not chunk.choices:
+                continue
+            scanner.feed(chunk.choices[0].delta.content or '')
+            while sections:
+                yield sections.pop(0)
     
-    return file_stream
-
-@app.route('/')
+    grading_result = blend_delivery(parse_grading_output(scanner.text), transcript_data)
+    if ('scores',) not in sent:
+        yield ('scores', grading_result['scores'])
+    for section, text in grading_result['feedback'].items():
+        if ('feedback', section) not in sent:
+            yield ('feedback', section, text)
+    yield ('result', grading_result)
+
+@api.route('/')
 def serve():
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(current_app.static_folder, 'index.html')
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(e):
     if request.path.startswith('/api/'):
         return jsonify({"error": "API endpoint not found"}), 404
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(current_app.static_folder, 'index.html')
 
-@app.route('/api', methods=['GET'])
+@api.route('/api', methods=['GET'])
 def api_home():
     return jsonify({
         "message": "necs. API is running!",
@@ -415,91 +628,933 @@ def api_home():
         "security": "enabled"
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"})
 
-@app.route('/api/analyze', methods=['POST'])
-@rate_limit(max_requests=10, window_seconds=3600)
-def analyze_speech():
+class AnalysisError(Exception):
+    """Raised for uploads the pipeline rejects (reported as 400, not 500)"""
+    pass
+
+def save_analysis_upload(audio_file, folder):
+    filename = secure_filename(audio_file.filename)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{timestamp}_{secrets.token_hex(4)}_{filename}"
+    filepath = os.path.join(folder, filename)
+    audio_file.save(filepath)
+    metrics.UPLOAD_BYTES.labels('analysis').inc(os.path.getsize(filepath))
+    return filepath, timestamp
+
+def validate_analysis_request():
+    """Return (audio_file, topic, None) or (None, None, error_response)"""
+    if 'audio' not in request.files:
+        return None, None, (jsonify({"error": "No audio file provided"}), 400)
+    
+    if 'topic' not in request.form:
+        return None, None, (jsonify({"error": "No topic provided"}), 400)
+    
+    audio_file = request.files['audio']
+    
+    if audio_file.filename == '':
+        return None, None, (jsonify({"error": "No file selected"}), 400)
+    
+    if not allowed_file(audio_file.filename):
+        return None, None, (jsonify({"error": "Invalid file format"}), 400)
+    
+    return audio_file, request.form['topic'], None
+
+def decode_upload(filepath, stage):
+    """Probe the container, then decode the upload exactly once"""
+    # Header probe first so over-long uploads are rejected without decoding
+    stage('probing')
+    with timed('probe'):
+        duration = probe_duration(filepath)
+    if duration is not None and duration > MAX_AUDIO_SECONDS:
+        raise AnalysisError(f"Audio file exceeds {MAX_AUDIO_SECONDS // 60} minute limit")
+    
+    stage('decoding')
     try:
-        cleanup_old_files()
+        with timed('decode'):
+            audio = decode_pcm(filepath)
+    except AudioDecodeError as e:
+        raise AnalysisError(str(e))
+    if audio.duration > MAX_AUDIO_SECONDS:
+        raise AnalysisError(f"Audio file exceeds {MAX_AUDIO_SECONDS // 60} minute limit")
+    return audio
+
+def with_fluency(audio, transcript_data):
+    with timed('fluency'):
+        fluency = analyze_fluency(audio, transcript_data["text"], transcript_data.get("words"))
+    return {**transcript_data, "fluency": fluency}
+
+def transcribe_cached(audio, stage, encoded=None):
+    """Transcript (with fluency) of a decoded recording. encoded is the
+    upload payload when the caller has already encoded it."""
+    # Identical recordings (retries, page refreshes) skip Whisper entirely
+    audio_key = content_hash(audio.pcm)
+    transcript_data = result_cache.get('transcript', audio_key)
+    if transcript_data is not None and encoded:
+        encoded[1].close()
+    if transcript_data is not None and "fluency" not in transcript_data:
+        # Cached before delivery was measured
+        transcript_data = with_fluency(audio, transcript_data)
+        result_cache.set('transcript', audio_key, transcript_data)
+    if transcript_data is None:
+        segments = None
+        if TRANSCRIBE_CHUNK_SECONDS:
+            with timed('split'):
+                segments = plan_segments(audio, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP)
         
-        if 'audio' not in request.files:
-            return jsonify({"error": "No audio file provided"}), 400
+        if segments and len(segments) > 1:
+            if encoded:
+                encoded[1].close()
+            stage('transcribing')
+            with timed('transcribe'):
+                transcript_data = transcribe_segments(audio, segments)
+            transcript_data = with_fluency(audio, transcript_data)
+            result_cache.set('transcript', audio_key, transcript_data)
+            return transcript_data
         
-        if 'topic' not in request.form:
-            return jsonify({"error": "No topic provided"}), 400
+        # Upload limit applies to what is actually sent, i.e. the encoded payload
+        if encoded is None:
+            with timed('encode'):
+                encoded = encode_for_transcription(audio)
+        file_size_mb = encoded[2] / (1024 * 1024)
         
-        audio_file = request.files['audio']
-        topic = request.form['topic']
+        if file_size_mb > MAX_TRANSCRIPTION_MB:
+            encoded[1].close()
+            raise AnalysisError("Audio file too large")
         
-        if audio_file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
+        stage('transcribing')
+        with timed('transcribe'):
+            transcript_data = transcribe_audio(audio, encoded)
+        transcript_data = with_fluency(audio, transcript_data)
+        result_cache.set('transcript', audio_key, transcript_data)
+    
+    return transcript_data
+
+def prepare_transcript(filepath, stage):
+    return transcribe_cached(decode_upload(filepath, stage), stage)
+
+def grading_cache_key(topic, transcript_data):
+    return content_hash(
+        content_hash(transcript_data["text"], f"{transcript_data['duration']:.1f}"),
+        json.dumps(transcript_data.get("fluency"), sort_keys=True),
+        ' '.join(topic.split()).lower(),
+        GRADING_PROMPT_VERSION
+    )
+
+def grade_cached(topic, transcript_data):
+    grading_key = grading_cache_key(topic, transcript_data)
+    grading_result = result_cache.get('grading', grading_key)
+    if grading_result is None:
+        grading_result = grade_speech(topic, transcript_data)
+        result_cache.set('grading', grading_key, grading_result)
+    return grading_result
+
+def get_related_samples():
+    global _related_samples
+    if _related_samples is None:
+        from recommender import RelatedSamples
+        _related_samples = RelatedSamples(min_score=float(os.getenv('RELATED_SAMPLES_MIN_SCORE', 1.5)))
+    return _related_samples
+
+def find_related_samples(topic, transcript):
+    """Summaries of the most similar high-scoring samples; never fails the analysis"""
+    try:
+        with timed('related_samples'):
+            related_samples = get_related_samples()
+            related_samples.sync(catalog_version('samples')[0])
+            hits = related_samples.query(topic, transcript, limit=RELATED_SAMPLES_LIMIT)
+        if not hits:
+            return []
+        samples = (Sample.query
+                   .options(load_only(*[getattr(Sample, c) for c in Sample.SUMMARY_COLUMNS]))
+                   .filter(Sample.id.in_([sample_id for sample_id, _ in hits]), Sample.upload_status == 'ready').all())
+        by_id = {s.id: s for s in samples}
+        return [
+            {**by_id[sample_id].to_summary_dict(), "similarity": round(similarity, 3)}
+            for sample_id, similarity in hits if sample_id in by_id
+        ]
+    except Exception as e:
+        print(f"Related samples error: {e}")
+        return []
+
+def build_analysis_response(topic, transcript_data, grading_result, timestamp):
+    with timed('save_report'):
+        report_id = report_store.save(topic, transcript_data, grading_result)
+    
+    return {
+        "success": True,
+        "transcript": transcript_data["text"],
+        "duration": transcript_data["duration"],
+        "scores": grading_result["scores"],
+        "feedback": grading_result["feedback"],
+        "fluency": transcript_data.get("fluency"),
+        "sample_response": grading_result["sample_response"],
+        "related_samples": find_related_samples(topic, transcript_data["text"]),
+        "report_id": report_id,
+        "document_url": f"/api/reports/{report_id}.docx",
+        "document_filename": f"necs_feedback_{timestamp}.docx"
+    }
+
+def run_analysis(filepath, topic, timestamp, on_stage=None):
+    """Run probe -> decode -> transcribe -> grade -> report on a saved upload.
+
+    The upload is decoded exactly once; the 16 kHz buffer is handed to every
+    later stage. on_stage(name) is called at every stage transition and the
+    upload is always removed before returning.
+    """
+    def stage(name):
+        if on_stage:
+            on_stage(name)
+    
+    try:
+        transcript_data = prepare_transcript(filepath, stage)
         
-        if not allowed_file(audio_file.filename):
-            return jsonify({"error": "Invalid file format"}), 400
+        stage('grading')
+        grading_result = grade_cached(topic, transcript_data)
         
-        filename = secure_filename(audio_file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        audio_file.save(filepath)
+        stage('sample_response')
+        with timed('sample_response'):
+            grading_result = {**grading_result, "sample_response": get_sample_response(get_groq_client(), topic)}
         
-        duration = get_audio_duration(filepath)
-        if duration > 320:
-            os.remove(filepath)
-            return jsonify({"error": "Audio file exceeds 5 minute limit"}), 400
+        stage('saving_report')
+        return build_analysis_response(topic, transcript_data, grading_result, timestamp)
+    finally:
+        temp_files.release(filepath)
+
+def stream_analysis(filepath, topic, timestamp):
+    """Generator behind /api/analyze/stream - one dict per NDJSON line.
+
+    Stage events come first, then the transcript, then scores and each
+    feedback section the moment the model has finished writing them, with
+    the long sample response last and a final 'done' carrying the report.
+    """
+    started = time.perf_counter()
+    time_to_first_score = None
+    
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000)
+    
+    try:
+        yield {"event": "stage", "stage": "decoding"}
+        audio = decode_upload(filepath, lambda name: None)
+        temp_files.release(filepath)
+        yield {"event": "stage", "stage": "transcribing"}
+        transcript_data = transcribe_cached(audio, lambda name: None)
+        del audio
+        yield {"event": "transcript", "transcript": transcript_data["text"], "duration": transcript_data["duration"],
+               "fluency": transcript_data.get("fluency")}
         
-        wav_filepath = filepath.rsplit('.', 1)[0] + '_compressed.wav'
-        convert_to_wav(filepath, wav_filepath)
-        if filepath != wav_filepath:
-            os.remove(filepath)
-        filepath = wav_filepath
+        yield {"event": "stage", "stage": "grading"}
+        grading_key = grading_cache_key(topic, transcript_data)
+        grading_result = result_cache.get('grading', grading_key)
+        if grading_result is not None:
+            updates = [('scores', grading_result['scores'])]
+            updates += [('feedback', section, text) for section, text in grading_result['feedback'].items()]
+            updates.append(('result', grading_result))
+        else:
+            updates = grade_speech_stream(topic, transcript_data)
         
-        file_size_mb = os.path.getsize(filepath) / (1024 * 1024)
+        for update in updates:
+            if update[0] == 'scores':
+                time_to_first_score = elapsed_ms()
+                metrics.TIME_TO_FIRST_SCORE.observe(time_to_first_score / 1000)
+                yield {"event": "scores", "scores": update[1], "elapsed_ms": time_to_first_score}
+            elif update[0] == 'feedback':
+                yield {"event": "feedback", "section": update[1], "text": update[2], "elapsed_ms": elapsed_ms()}
+            else:
+                grading_result = update[1]
+        result_cache.set('grading', grading_key, grading_result)
         
-        if file_size_mb > 20:
-            os.remove(filepath)
-            return jsonify({"error": "Audio file too large"}), 400
+        # Pre-generated per question, so usually a DB read rather than an LLM call
+        yield {"event": "stage", "stage": "sample_response"}
+        with timed('sample_response'):
+            grading_result = {**grading_result, "sample_response": get_sample_response(get_groq_client(), topic)}
+        yield {"event": "sample_response", "text": grading_result["sample_response"], "elapsed_ms": elapsed_ms()}
         
-        transcript_data = transcribe_audio(filepath)
-        grading_result = grade_speech(topic, transcript_data)
-        doc_stream = generate_docx(topic, transcript_data["text"], grading_result)
+        yield {"event": "stage", "stage": "saving_report"}
+        response = build_analysis_response(topic, transcript_data, grading_result, timestamp)
+        response["time_to_first_score_ms"] = time_to_first_score
+        response["total_ms"] = elapsed_ms()
+        yield {"event": "done", **response}
+    
+    except AnalysisError as e:
+        yield {"event": "error", "error": str(e), "status": 400}
+    except UpstreamBusy as e:
+        yield {"event": "error", "error": "Server is busy. Try again shortly.", "status": 503, "retry_after": e.retry_after}
+    except Exception as e:
+        print(f"Stream error: {str(e)}")
+        yield {"event": "error", "error": str(e), "status": 500}
+    finally:
+        temp_files.release(filepath)
+
+def analyze_batch_file(flask_app, item, sample_response):
+    """One file of a batch: decode and encode on the process pool, then
+    transcribe and grade here. Runs in a batch thread; only the transcript
+    and scores outlive it, never the decoded audio."""
+    # Long recordings are split and their pieces encoded at transcription time
+    encode_up_to = TRANSCRIBE_CHUNK_SECONDS * 1.5 if TRANSCRIBE_CHUNK_SECONDS else None
+    try:
+        with timed('decode'):
+            try:
+                pcm, encoded = decode_pool().submit(prepare_audio, item['path'], MAX_AUDIO_SECONDS, encode_up_to).result()
+            except BrokenProcessPool:
+                # A child died under another file; decode_pool() hands out a fresh pool
+                pcm, encoded = decode_pool().submit(prepare_audio, item['path'], MAX_AUDIO_SECONDS, encode_up_to).result()
+    finally:
+        temp_files.release(item['path'])
+    audio = DecodedAudio(pcm)
+    if encoded:
+        encoded = (encoded[0], io.BytesIO(encoded[1]), len(encoded[1]))
+    
+    with flask_app.app_context():
+        transcript_data = transcribe_cached(audio, lambda name: None, encoded)
+        del audio, pcm
+        grading_result = grade_cached(item['topic'], transcript_data)
+        grading_result = {**grading_result, "sample_response": sample_response(item['topic'])}
+        with timed('save_report'):
+            report_id = report_store.save(item['topic'], transcript_data, grading_result)
+    
+    return {
+        "transcript": transcript_data["text"],
+        "duration": transcript_data["duration"],
+        "scores": grading_result["scores"],
+        "feedback": grading_result["feedback"],
+        "fluency": transcript_data.get("fluency"),
+        "report_id": report_id,
+        "document_url": f"/api/reports/{report_id}.docx"
+    }
+
+def stream_batch(items, folder):
+    """Generator behind /api/analyze/batch - one dict per NDJSON line.
+
+    Files are analyzed BATCH_CONCURRENCY at a time and reported in the
+    order they finish; the class summary is updated as each one arrives
+    and saved as its own report once the last is done.
+    """
+    # Batch threads run outside the request, under the app serving it
+    flask_app = current_app._get_current_object()
+    summary = ClassSummary(len(items))
+    sample_responses = {}
+    topic_locks = {}
+    
+    def sample_response(topic):
+        # A class usually shares a topic; fetch (or generate) it once per batch.
+        # Locked per topic, so a miss on one topic never holds up the others
+        with topic_locks.setdefault(topic, threading.Lock()):
+            if topic not in sample_responses:
+                with flask_app.app_context(), timed('sample_response'):
+                    sample_responses[topic] = get_sample_response(get_groq_client(), topic)
+            return sample_responses[topic]
+    
+    pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch')
+    try:
+        yield {"event": "accepted", "files": [
+            {"index": index, "filename": item['filename'], "student": item['student'], "topic": item['topic']}
+            for index, item in enumerate(items)
+        ]}
+        futures = {pool.submit(analyze_batch_file, flask_app, item, sample_response): index for index, item in enumerate(items)}
         
-        os.remove(filepath)
+        for completed, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            item = items[index]
+            event = {"index": index, "filename": item['filename'], "student": item['student'],
+                     "topic": item['topic'], "completed": completed}
+            try:
+                result = future.result()
+            except (BatchFileError, AnalysisError) as e:
+                summary.add_failure(item, str(e))
+                yield {"event": "error", **event, "error": str(e), "status": 400}
+                continue
+            except UpstreamBusy as e:
+                summary.add_failure(item, "Server is busy")
+                yield {"event": "error", **event, "error": "Server is busy. Try again shortly.", "status": 503,
+                       "retry_after": e.retry_after}
+                continue
+            except Exception as e:
+                print(f"Batch error ({item['filename']}): {str(e)}")
+                summary.add_failure(item, str(e))
+                yield {"event": "error", **event, "error": str(e), "status": 500}
+                continue
+            summary.add(item, result)
+            yield {"event": "result", **event, **result}
         
-        doc_bytes = doc_stream.getvalue()
-        doc_base64 = base64.b64encode(doc_bytes).decode('utf-8')
+        class_summary = summary.as_dict()
+        with timed('save_report'):
+            report_id = report_store.save_class_summary(class_summary)
+        yield {"event": "summary", "summary": class_summary, "report_id": report_id,
+               "document_url": f"/api/reports/{report_id}.docx"}
+    
+    except Exception as e:
+        print(f"Batch error: {str(e)}")
+        yield {"event": "error", "error": str(e), "status": 500}
+    finally:
+        # Client gone or batch done: drop queued files, let running ones finish
+        pool.shutdown(wait=False, cancel_futures=True)
+        for item in items:
+            temp_files.release(item['path'])
+        shutil.rmtree(folder, ignore_errors=True)
+
+def process_analysis_job(payload, set_stage):
+    """Job queue handler - runs in a pool worker thread or process"""
+    with background_app().app_context():
+        return run_analysis(payload['filepath'], payload['topic'], payload['timestamp'], on_stage=set_stage)
+
+def process_sample_upload(payload, set_stage):
+    """Upload queue handler: store a pending sample's audio, retrying with backoff"""
+    with background_app().app_context():
+        for attempt in range(SAMPLE_UPLOAD_RETRIES + 1):
+            set_stage(f"uploading (attempt {attempt + 1})")
+            try:
+                media = store_sample_media(audio_storage, payload['path'], payload['key'])
+                break
+            except Exception as e:
+                if attempt == SAMPLE_UPLOAD_RETRIES:
+                    sample = db.session.get(Sample, payload['sample_id'])
+                    if sample:
+                        sample.upload_status = 'failed'
+                        bump_catalog_version('samples')
+                        db.session.commit()
+                    # The admin re-uploads a failed sample, so its pending copy is of no further use
+                    if os.path.exists(payload['path']):
+                        os.remove(payload['path'])
+                    raise
+                print(f"⚠️ Upload of sample {payload['sample_id']} failed ({e}), retrying")
+                time.sleep(min(2 ** attempt, 30))
         
-        return jsonify({
-            "success": True,
-            "transcript": transcript_data["text"],
-            "duration": transcript_data["duration"],
-            "scores": grading_result["scores"],
-            "feedback": grading_result["feedback"],
-            "sample_response": grading_result["sample_response"],
-            "document_base64": doc_base64,
-            "document_filename": f"necs_feedback_{timestamp}.docx"
-        })
+        # The sample may have been deleted while its audio was uploading
+        sample = db.session.get(Sample, payload['sample_id'])
+        if sample:
+            sample.audio_url = media['audio_url']
+            sample.preview_url = media['preview_url']
+            sample.peaks = media['peaks']
+            sample.upload_status = 'ready'
+            bump_catalog_version('samples')
+            db.session.commit()
+        if os.path.exists(payload['path']):
+            os.remove(payload['path'])
+        return {"sample_id": payload['sample_id'], "audio_url": media['audio_url']}
+
+upload_pool = WorkerPool(
+    upload_queue,
+    process_sample_upload,
+    size=int(os.getenv('SAMPLE_UPLOAD_WORKERS', 2)),
+    mode='thread'
+)
+
+job_pool = WorkerPool(
+    job_queue,
+    process_analysis_job,
+    size=int(os.getenv('JOB_WORKERS', 2)),
+    mode=os.getenv('JOB_WORKER_MODE', 'thread')
+)
+
+@api.route('/api/analyze', methods=['POST'])
+@rate_limit(max_requests=10, window_seconds=3600, scope='analyze')
+def analyze_speech():
+    try:
+        audio_file, topic, error = validate_analysis_request()
+        if error:
+            return error
+        
+        filepath, timestamp = save_analysis_upload(audio_file, UPLOAD_FOLDER)
+        temp_files.register(filepath)
+        return jsonify(run_analysis(filepath, topic, timestamp))
+    
+    except AnalysisError as e:
+        return jsonify({"error": str(e)}), 400
+    except UpstreamBusy as e:
+        response = jsonify({"error": "Server is busy. Try again shortly."})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/analyze/stream', methods=['POST'])
+@rate_limit(max_requests=10, window_seconds=3600, scope='analyze')
+def analyze_speech_stream():
+    """Same pipeline as /api/analyze, streamed back as NDJSON events"""
+    try:
+        audio_file, topic, error = validate_analysis_request()
+        if error:
+            return error
+        
+        filepath, timestamp = save_analysis_upload(audio_file, UPLOAD_FOLDER)
+        temp_files.register(filepath)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    def lines():
+        for event in stream_analysis(filepath, topic, timestamp):
+            yield json.dumps(event) + "\n"
+    
+    return Response(
+        stream_with_context(lines()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def save_batch_upload(folder):
+    """Batch items [{"filename", "path", "topic", "student"}] from either a ZIP
+    ('archive', topics from its manifest or the 'topic' field) or repeated
+    'audio' files with one 'topic' each (or a single one for all)."""
+    if 'archive' in request.files:
+        archive_path = os.path.join(folder, 'archive.zip')
+        request.files['archive'].save(archive_path)
+        metrics.UPLOAD_BYTES.labels('batch').inc(os.path.getsize(archive_path))
+        try:
+            items = extract_archive(archive_path, folder, request.form.get('topic'))
+        finally:
+            os.remove(archive_path)
+    else:
+        files = [f for f in request.files.getlist('audio') if f.filename]
+        topics = request.form.getlist('topic')
+        students = request.form.getlist('student')
+        if not files:
+            raise BatchError("No audio files provided")
+        if len(files) > BATCH_MAX_FILES:
+            raise BatchError(f"At most {BATCH_MAX_FILES} files per batch")
+        if len(topics) == 1:
+            topics = topics * len(files)
+        if len(topics) != len(files):
+            raise BatchError("Provide one topic per file, or a single topic for all")
+        
+        items = []
+        for index, (audio_file, topic) in enumerate(zip(files, topics)):
+            if not allowed_file(audio_file.filename):
+                raise BatchError(f"Invalid file format: {audio_file.filename}")
+            path = os.path.join(folder, f"{index:03d}_{secure_filename(audio_file.filename) or 'audio'}")
+            audio_file.save(path)
+            metrics.UPLOAD_BYTES.labels('batch').inc(os.path.getsize(path))
+            student = students[index] if index < len(students) else ''
+            items.append({
+                'filename': audio_file.filename,
+                'path': path,
+                'topic': topic.strip(),
+                'student': student.strip() or os.path.splitext(audio_file.filename)[0],
+            })
     
+    for item in items:
+        temp_files.register(item['path'])
+    if not items:
+        raise BatchError("No audio files found in the archive")
+    missing = [item['filename'] for item in items if not item['topic']]
+    if missing:
+        raise BatchError(f"No topic for: {', '.join(missing[:5])}")
+    return items
+
+@api.route('/api/analyze/batch', methods=['POST'])
+@rate_limit(max_requests=3, window_seconds=3600)
+def analyze_batch():
+    """Analyze a class's recordings, streamed back as NDJSON: one result
+    event per file as it finishes, then the class summary"""
+    folder = os.path.join(BATCH_UPLOAD_FOLDER, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}")
+    os.makedirs(folder)
+    try:
+        items = save_batch_upload(folder)
+    except BatchError as e:
+        shutil.rmtree(folder, ignore_errors=True)
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
+        shutil.rmtree(folder, ignore_errors=True)
         print(f"Error: {str(e)}")
-        if 'filepath' in locals() and os.path.exists(filepath):
+        return jsonify({"error": str(e)}), 500
+    
+    def lines():
+        for event in stream_batch(items, folder):
+            yield json.dumps(event) + "\n"
+    
+    return Response(
+        stream_with_context(lines()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/api/analyze/jobs', methods=['POST'])
+@rate_limit(max_requests=10, window_seconds=3600, scope='analyze')
+def submit_analysis_job():
+    """Persist the upload, enqueue it and return a job id immediately"""
+    try:
+        audio_file, topic, error = validate_analysis_request()
+        if error:
+            return error
+        
+        if job_queue.depth() >= job_queue.max_depth:
+            response = jsonify({"error": "Server is busy. Try again shortly."})
+            response.headers['Retry-After'] = str(job_queue.retry_after)
+            return response, 503
+        
+        filepath, timestamp = save_analysis_upload(audio_file, JOB_UPLOAD_FOLDER)
+        try:
+            job_id = job_queue.submit({"filepath": filepath, "topic": topic, "timestamp": timestamp})
+        except QueueFull as e:
             os.remove(filepath)
+            response = jsonify({"error": "Server is busy. Try again shortly."})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+        
+        job_pool.start()
+        job_pool.notify()
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status_url": f"/api/analyze/jobs/{job_id}",
+            "stream_url": f"/api/analyze/jobs/{job_id}/stream"
+        }), 202
+    
+    except Exception as e:
+        print(f"Job submit error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job_pool.start()
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@api.route('/api/analyze/jobs/<job_id>/stream', methods=['GET'])
+def stream_analysis_job(job_id):
+    """Server-Sent Events feed of stage transitions, ending with the result"""
+    job_pool.start()
+    if not job_queue.get(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    
+    def events():
+        last_stage = None
+        last_sent = time.time()
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"Job not found\"}\n\n"
+                return
+            if job['stage'] != last_stage:
+                last_stage = job['stage']
+                last_sent = time.time()
+                if job['status'] == 'done':
+                    yield f"event: done\ndata: {json.dumps(job['result'])}\n\n"
+                elif job['status'] == 'failed':
+                    yield f"event: error\ndata: {json.dumps({'error': job.get('error')})}\n\n"
+                else:
+                    data = {"stage": job['stage'], "position": job.get('position')}
+                    yield f"event: stage\ndata: {json.dumps(data)}\n\n"
+            elif time.time() - last_sent > 15:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            if job['status'] in TERMINAL_STATUSES:
+                return
+            time.sleep(0.5)
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/api/media/<path:name>', methods=['GET'])
+def serve_media(name):
+    """Sample audio and previews when AUDIO_STORAGE=local, with Range support for seeking"""
+    path = audio_storage.path(name) if isinstance(audio_storage, LocalStorage) else None
+    if not path:
+        return jsonify({"error": "Not found"}), 404
+    # Stored names embed the content hash, so the name is a strong validator
+    # that is the same on every node, and the bytes behind it never change
+    response = send_file(path, conditional=True, etag=os.path.basename(path), max_age=31536000)
+    response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint, summed over all workers under gunicorn"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@api.route('/api/reports/<report_id>.docx', methods=['GET'])
+def download_report(report_id):
+    """Render (first request only) and download the feedback report"""
+    try:
+        report = report_store.get(report_id)
+        if not report:
+            return jsonify({"error": "Report not found or expired"}), 404
+        
+        with timed('docx'):
+            docx_path = report_store.docx_path(report)
+        return send_file(
+            docx_path,
+            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            as_attachment=True,
+            download_name=f"necs_{'class_summary' if report.topic == 'Class summary' else 'feedback'}_"
+                          f"{report.created_at.strftime('%Y%m%d_%H%M%S')}.docx",
+            max_age=3600
+        )
+    except Exception as e:
+        print(f"Report error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 # ============= SECURED ADMIN ROUTES =============
 
-@app.route('/api/samples', methods=['GET'])
+@api.route('/api/admin/cache', methods=['GET'])
+@require_admin()
+def get_cache_stats():
+    """Hit/miss counters for this worker's result cache"""
+    return jsonify(result_cache.stats())
+
+@api.route('/api/admin/sample-responses/warmup', methods=['POST'])
+@require_admin()
+def warm_up_sample_responses():
+    """Pre-generate sample 2.0 responses for every question in the background"""
+    data = request.get_json(silent=True) or {}
+    variants = int(data.get('variants', SAMPLE_RESPONSE_VARIANTS))
+    if not start_warm_up(current_app._get_current_object(), get_groq_client(), variants):
+        return jsonify({"error": "Warm-up already running", "status": warmup_status}), 409
+    return jsonify({"success": True, "status": warmup_status}), 202
+
+@api.route('/api/admin/sample-responses/warmup', methods=['GET'])
+@require_admin()
+def get_sample_response_warmup():
+    return jsonify(warmup_status)
+
+@api.route('/api/admin/import', methods=['POST'])
+@require_admin()
+def import_catalog():
+    """Start a bulk import from an uploaded .jsonl or .zip; re-upload the same file to resume"""
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename.lower().endswith(('.jsonl', '.zip')):
+            return jsonify({"error": "Upload a .jsonl or .zip file"}), 400
+        
+        path = os.path.join(IMPORT_FOLDER, f"{secrets.token_hex(8)}_{secure_filename(upload.filename)}")
+        upload.save(path)
+        
+        importer = BulkImporter(audio_storage, IMPORT_FOLDER)
+        if not start_import(current_app._get_current_object(), importer, path):
+            os.remove(path)
+            return jsonify({"error": "An import is already running", "status": import_status}), 409
+        return jsonify({"success": True, "status": import_status}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/admin/import', methods=['GET'])
+@require_admin()
+def get_import_status():
+    return jsonify(import_status)
+
+@api.route('/api/admin/export', methods=['GET'])
+@require_admin()
+def export_catalog_download():
+    """?include=questions,samples&format=zip|jsonl"""
+    try:
+        include = [part for part in request.args.get('include', 'questions,samples').split(',') if part]
+        extension = 'zip' if request.args.get('format', 'zip') == 'zip' else 'jsonl'
+        filename = f"necs_catalog_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        path = temp_files.register(os.path.join(IMPORT_FOLDER, f"{secrets.token_hex(8)}_{filename}"))
+        export_catalog(path, include)
+        return send_file(path, as_attachment=True, download_name=filename)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Create/upgrade the schema and search indexes (run on deploy, before starting workers)"""
+    init_db()
+    print("✅ Database tables created successfully!")
+
+@api.cli.command('clean-metadata')
+def clean_metadata_command():
+    """Strip control characters from uploads/samples/metadata.json"""
+    clean_metadata_file()
+    print("✅ Metadata cleaned")
+
+@api.cli.command('import-catalog')
+@click.argument('path')
+def import_catalog_command(path):
+    """Import questions/samples from a .jsonl or .zip (rerun to resume)"""
+    importer = BulkImporter(audio_storage, IMPORT_FOLDER)
+    try:
+        status = importer.run(path)
+    except BulkImportError as e:
+        raise click.ClickException(str(e))
+    for failure in status['failed']:
+        print(f"⚠️ {failure['record']}: {failure['error']}")
+    print(f"✅ Questions: {status['questions_inserted']} added, {status['questions_updated']} updated. "
+          f"Samples: {status['samples_inserted']} added, {status['samples_updated']} updated, "
+          f"{len(status['failed'])} failed")
+
+@api.cli.command('export-catalog')
+@click.argument('path')
+@click.option('--include', default='questions,samples', help='Comma-separated: questions, samples')
+def export_catalog_command(path, include):
+    """Export questions/samples to PATH (.zip or .jsonl)"""
+    counts = export_catalog(path, include.split(','))
+    print(f"✅ Exported {counts} to {path}")
+
+@api.cli.command('warm-sample-responses')
+def warm_sample_responses_command():
+    """Generate missing sample 2.0 responses for every question"""
+    warm_up(get_groq_client())
+
+@api.cli.command('build-sample-previews')
+def build_sample_previews_command():
+    """Add waveform peaks and a preview to samples stored before they were generated"""
+    samples = Sample.query.filter(Sample.peaks.is_(None), Sample.audio_url.isnot(None)).all()
+    for sample in samples:
+        key = f"sample_{sample.content_hash[:16]}" if sample.content_hash else f"sample_{sample.id}"
+        path = None
+        if isinstance(audio_storage, LocalStorage) and sample.audio_url.startswith(audio_storage.base_url):
+            path = audio_storage.path(sample.audio_url[len(audio_storage.base_url):])
+        downloaded = path is None
+        if downloaded:
+            extension = os.path.splitext(sample.audio_url.split('?')[0])[1] or '.audio'
+            path = os.path.join(PENDING_UPLOAD_FOLDER, f"{key}_original{extension}")
+            try:
+                urllib.request.urlretrieve(sample.audio_url, path)
+            except Exception as e:
+                print(f"⚠️ Sample {sample.id}: could not download audio ({e})")
+                continue
+        try:
+            sample.preview_url, sample.peaks = derive_sample_media(audio_storage, path, key)
+        finally:
+            if downloaded and os.path.exists(path):
+                os.remove(path)
+        bump_catalog_version('samples')
+        db.session.commit()
+    print(f"✅ Processed {len(samples)} samples")
+
+def catalog_response(name, key, build, vary_cookie=False):
+    """Cached JSON for a catalog read with ETag/Last-Modified; 304 when the client is current.
+    vary_cookie marks bodies that depend on the admin session."""
+    version, last_modified = catalog_version(name)
+    # The key covers everything the body depends on besides the version (filters,
+    # page, admin view), so one listing's ETag never validates another's
+    etag = f"{name}-v{version}-{content_hash(repr(key))[:16]}"
+    
+    not_modified = request.if_none_match.contains(etag) if request.if_none_match else (
+        last_modified is not None and request.if_modified_since is not None
+        and last_modified <= request.if_modified_since
+    )
+    if not_modified:
+        response = Response(status=304)
+    else:
+        response = Response(catalog_cache.get(name, key, version, build), mimetype='application/json')
+    
+    response.set_etag(etag)
+    if vary_cookie:
+        response.vary.add('Cookie')
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Revalidate every time; the 304 keeps that cheap
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+SAMPLES_PAGE_SIZE = 24
+SAMPLES_MAX_PAGE_SIZE = 100
+
+def encode_sample_cursor(sample):
+    raw = f"{sample.created_at.isoformat()}|{sample.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_sample_cursor(cursor):
+    """(created_at, id) of the last sample on the previous page; ValueError if malformed"""
+    try:
+        created_at, sample_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(sample_id)
+    except (UnicodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+
+@api.route('/api/samples', methods=['GET'])
 def get_samples():
+    """Newest-first page of sample summaries; pass next_cursor back as ?cursor="""
     try:
-        samples = Sample.query.order_by(Sample.created_at.desc()).all()
-        return jsonify({"samples": [s.to_dict() for s in samples]})
+        limit = min(max(request.args.get('limit', SAMPLES_PAGE_SIZE, type=int), 1), SAMPLES_MAX_PAGE_SIZE)
+        # Admins can list samples whose audio is still uploading (or failed to)
+        include_pending = bool(request.args.get('include_pending')) and session.get('admin_authenticated', False)
+        cursor = request.args.get('cursor')
+        try:
+            position = decode_sample_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        
+        def build():
+            query = Sample.query.options(load_only(*[getattr(Sample, c) for c in Sample.SUMMARY_COLUMNS]))
+            if not include_pending:
+                query = query.filter(Sample.upload_status == 'ready')
+            if position:
+                created_at, sample_id = position
+                query = query.filter(or_(
+                    Sample.created_at < created_at,
+                    and_(Sample.created_at == created_at, Sample.id < sample_id)
+                ))
+            samples = query.order_by(Sample.created_at.desc(), Sample.id.desc()).limit(limit + 1).all()
+            next_cursor = encode_sample_cursor(samples[limit - 1]) if len(samples) > limit else None
+            return {
+                "samples": [s.to_summary_dict() for s in samples[:limit]],
+                "next_cursor": next_cursor
+            }
+        
+        return catalog_response('samples', (limit, position, include_pending), build,
+                                vary_cookie=bool(request.args.get('include_pending')))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/samples/upload', methods=['POST'])
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+def search_response(catalog, load):
+    """Ranked, paginated ?q= search; load(ids) returns {id: dict} for the hits"""
+    query = ' '.join(request.args.get('q', '').split())
+    if not query:
+        return jsonify({"error": "Missing search query"}), 400
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_MAX_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    def build():
+        hits = search_index.search(catalog, query, limit, offset)
+        items = load([hit[0] for hit in hits[:limit]])
+        results = [
+            {**items[hit_id], "snippet": snippet, "rank": round(rank, 4)}
+            for hit_id, rank, snippet in hits[:limit] if hit_id in items
+        ]
+        return {
+            "results": results,
+            "next_offset": offset + limit if len(hits) > limit else None
+        }
+    
+    # Results change only when the catalog does, so they share its version
+    return catalog_response(catalog, ('search', query.lower(), limit, offset), build)
+
+@api.route('/api/samples/search', methods=['GET'])
+def search_samples():
+    """Samples matching ?q= in topic, question, speaker or transcript, best first"""
+    try:
+        def load(ids):
+            samples = (Sample.query
+                       .options(load_only(*[getattr(Sample, c) for c in Sample.SUMMARY_COLUMNS]))
+                       .filter(Sample.id.in_(ids), Sample.upload_status == 'ready').all())
+            return {s.id: s.to_summary_dict() for s in samples}
+        return search_response('samples', load)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/samples/<int:sample_id>', methods=['GET'])
+def get_sample(sample_id):
+    try:
+        # Like the listing, samples still uploading (or failed) are admin-only
+        include_pending = bool(request.args.get('include_pending')) and session.get('admin_authenticated', False)
+        sample = db.session.get(Sample, sample_id)
+        if not sample or (sample.upload_status != 'ready' and not include_pending):
+            return jsonify({"error": "Not found"}), 404
+        return jsonify({"sample": sample.to_dict()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/samples/upload', methods=['POST'])
 @require_admin()
 @rate_limit(max_requests=20, window_seconds=3600)
 def upload_sample():
@@ -519,48 +1574,67 @@ def upload_sample():
             return jsonify({"error": "Missing required fields"}), 400
         
         filename = secure_filename(audio_file.filename)
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        temp_path = os.path.join(UPLOAD_FOLDER, f"{secrets.token_hex(4)}_{filename}")
         audio_file.save(temp_path)
+        temp_files.register(temp_path)
         
-        try:
-            duration = int(get_audio_duration(temp_path))
-        except:
-            duration = 0
-        
-        upload_result = cloudinary.uploader.upload(
-            temp_path,
-            resource_type="video",
-            folder="necs_samples",
-            public_id=f"sample_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            overwrite=True
-        )
+        audio_hash = file_hash(temp_path)
+        sample = Sample.query.filter_by(content_hash=audio_hash).first()
+        if sample and sample.upload_status != 'failed':
+            temp_files.release(temp_path)
+            return jsonify({"error": "This recording is already in the library"}), 409
         
-        os.remove(temp_path)
-        
-        new_sample = Sample(
-            filename=filename,
-            topic=topic,
-            question=question,
-            speaker=speaker,
-            score=score,
-            duration=duration,
-            transcript=transcript,
-            feedback=feedback,
-            audio_url=upload_result['secure_url']
-        )
+        # Header/ffprobe only - the audio is never decoded here
+        duration = int(probe_duration(temp_path) or 0)
+        
+        # The row goes in now as 'pending'; the upload queue stores the audio
+        # and fills in audio_url, so the request never waits on the upload
+        pending_path = os.path.join(PENDING_UPLOAD_FOLDER, audio_hash + os.path.splitext(filename)[1].lower())
+        os.replace(temp_path, pending_path)
+        temp_files.release(temp_path)
+        submitted = False
+        
+        if sample is None:
+            sample = Sample(content_hash=audio_hash)
+            db.session.add(sample)
+        sample.filename = filename
+        sample.topic = topic
+        sample.question = question
+        sample.speaker = speaker
+        sample.score = score
+        sample.duration = duration
+        sample.transcript = transcript
+        sample.feedback = feedback
+        sample.upload_status = 'pending'
+        db.session.flush()
         
-        db.session.add(new_sample)
+        try:
+            upload_queue.submit({"sample_id": sample.id, "path": pending_path, "key": f"sample_{audio_hash[:16]}"})
+            submitted = True
+        except QueueFull as e:
+            db.session.rollback()
+            os.remove(pending_path)
+            response = jsonify({"error": "Too many uploads in progress. Try again shortly."})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+        
+        bump_catalog_version('samples')
         db.session.commit()
+        upload_pool.start()
+        upload_pool.notify()
         
-        return jsonify({"success": True, "id": new_sample.id})
+        return jsonify({"success": True, "id": sample.id, "upload_status": "pending"}), 202
         
     except Exception as e:
         db.session.rollback()
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
+        if 'temp_path' in locals():
+            temp_files.release(temp_path)
+        # Once queued, the upload worker owns the pending file
+        if 'pending_path' in locals() and not submitted and os.path.exists(pending_path):
+            os.remove(pending_path)
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/samples/<int:sample_id>', methods=['PUT'])
+@api.route('/api/samples/<int:sample_id>', methods=['PUT'])
 @require_admin()
 def update_sample(sample_id):
     try:
@@ -575,6 +1649,7 @@ def update_sample(sample_id):
         if 'transcript' in request.form: sample.transcript = request.form['transcript']
         if 'feedback' in request.form: sample.feedback = request.form['feedback']
 
+        bump_catalog_version('samples')
         db.session.commit()
         return jsonify({"success": True})
         
@@ -582,7 +1657,7 @@ def update_sample(sample_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/samples/<int:sample_id>', methods=['DELETE'])
+@api.route('/api/samples/<int:sample_id>', methods=['DELETE'])
 @require_admin()
 def delete_sample(sample_id):
     try:
@@ -591,6 +1666,7 @@ def delete_sample(sample_id):
             return jsonify({"error": "Not found"}), 404
 
         db.session.delete(sample)
+        bump_catalog_version('samples')
         db.session.commit()
         return jsonify({"success": True})
         
@@ -598,15 +1674,26 @@ def delete_sample(sample_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/questions', methods=['GET'])
+@api.route('/api/questions', methods=['GET'])
 def get_questions():
     try:
-        questions = Question.query.all()
-        return jsonify({"questions": [q.to_dict() for q in questions]})
+        return catalog_response('questions', None, lambda: {
+            "questions": [q.to_dict() for q in Question.query.all()]
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/questions', methods=['POST'])
+@api.route('/api/questions/search', methods=['GET'])
+def search_questions():
+    """Questions matching ?q= in topic, question or category, best first"""
+    try:
+        def load(ids):
+            return {q.id: q.to_dict() for q in Question.query.filter(Question.id.in_(ids)).all()}
+        return search_response('questions', load)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/questions', methods=['POST'])
 @require_admin()
 def add_question():
     try:
@@ -617,13 +1704,14 @@ def add_question():
             category=data.get('category', 'General')
         )
         db.session.add(new_question)
+        bump_catalog_version('questions')
         db.session.commit()
         return jsonify({"success": True, "id": new_question.id})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/questions/<int:question_id>', methods=['PUT'])
+@api.route('/api/questions/<int:question_id>', methods=['PUT'])
 @require_admin()
 def update_question(question_id):
     try:
@@ -635,37 +1723,54 @@ def update_question(question_id):
         if 'topic' in data: question.topic = data['topic']
         if 'question' in data: question.question = data['question']
         if 'category' in data: question.category = data['category']
+        if 'topic' in data or 'question' in data:
+            question.content_hash = None    # recomputed by the next bulk import
         
+        bump_catalog_version('questions')
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/questions/<int:question_id>', methods=['DELETE'])
+@api.route('/api/questions/<int:question_id>', methods=['DELETE'])
 @require_admin()
 def delete_question(question_id):
     try:
         question = Question.query.get(question_id)
         if not question:
             return jsonify({"error": "Not found"}), 404
+        SampleResponse.query.filter_by(question_id=question_id).delete()
         db.session.delete(question)
+        bump_catalog_version('questions')
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/questions/random', methods=['GET'])
+@api.route('/api/questions/random', methods=['GET'])
 def get_random_question():
+    """?category= limits the pick; ?no_repeat=1 cycles the bank without repeats per session"""
     try:
-        questions = Question.query.all()
-        if not questions:
+        category = request.args.get('category') or None
+        no_repeat = request.args.get('no_repeat', '').lower() in ('1', 'true', 'yes')
+        
+        decks = session.get('question_decks', {})
+        deck_key = category or '*'
+        question_sampler.sync(catalog_version('questions')[0])
+        question, deck = question_sampler.pick(category, decks.get(deck_key), no_repeat=no_repeat)
+        if not question:
             return jsonify({"error": "No questions"}), 404
-        return jsonify({"question": random.choice(questions).to_dict()})
+        
+        if no_repeat:
+            session['question_decks'] = {**decks, deck_key: deck}
+        return jsonify({"question": question.to_dict()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+app = create_app()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,271 @@
+import os
+import io
+import json
+import wave
+import shutil
+import tempfile
+import threading
+import subprocess
+
+# Everything downstream (Whisper, analysis) works on 16 kHz mono 16-bit PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+
+# Format sent to the transcription backend: flac (lossless, ~2x smaller than
+# WAV), opus (speech-tuned, ~10x smaller) or wav (no encoder needed)
+TRANSCODE_FORMAT = os.getenv('TRANSCODE_FORMAT', 'flac')
+
+# Encoded payloads above this size spill from memory to a temp file
+SPOOL_MAX_BYTES = int(os.getenv('TRANSCODE_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+
+# A silence is at least SILENCE_MIN_SECONDS of 20 ms frames quieter than
+# SILENCE_THRESHOLD_DB below the recording's loud (95th percentile) level
+SILENCE_THRESHOLD_DB = float(os.getenv('SILENCE_THRESHOLD_DB', -35))
+SILENCE_MIN_SECONDS = float(os.getenv('SILENCE_MIN_SECONDS', 0.3))
+SILENCE_FRAME_SECONDS = 0.02
+
+# Waveform resolution stored per sample, and the preview the library streams
+# instead of the full-quality original
+WAVEFORM_PEAKS = int(os.getenv('WAVEFORM_PEAKS', 200))
+PREVIEW_BITRATE = os.getenv('PREVIEW_BITRATE', '32k')
+
+ENCODERS = {
+    'flac': ('audio.flac', ['-c:a', 'flac', '-compression_level', '5', '-f', 'flac']),
+    'opus': ('audio.ogg', ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip', '-f', 'ogg']),
+}
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class DecodedAudio:
+    """A submission decoded once to 16 kHz mono PCM and shared by every stage"""
+
+    def __init__(self, pcm, sample_rate=SAMPLE_RATE):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (self.sample_rate * SAMPLE_WIDTH * CHANNELS)
+
+    def slice(self, start, end):
+        """The recording between start and end seconds, as its own DecodedAudio"""
+        frame = SAMPLE_WIDTH * CHANNELS
+        first = int(start * self.sample_rate) * frame
+        last = int(end * self.sample_rate) * frame
+        return DecodedAudio(self.pcm[first:last], self.sample_rate)
+
+    def to_wav_bytes(self):
+        """Wrap the PCM in a WAV header - no re-decode, no disk"""
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(CHANNELS)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.pcm)
+        return buffer.getvalue()
+
+
+def _wav_header_duration(path):
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def _ffprobe_duration(path):
+    result = subprocess.run(
+        [FFPROBE_BINARY, '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'json', path],
+        capture_output=True, check=True
+    )
+    return float(json.loads(result.stdout)['format']['duration'])
+
+
+def probe_duration(path):
+    """Duration in seconds read from container headers, without decoding PCM.
+
+    WAV files are read with the stdlib header parser; everything else goes
+    through ffprobe. Returns None when the container does not record a
+    duration (e.g. MediaRecorder WebM) - callers then check the decoded
+    buffer instead of paying for a second decode here.
+    """
+    if path.lower().endswith('.wav'):
+        try:
+            return _wav_header_duration(path)
+        except (wave.Error, EOFError):
+            pass
+
+    try:
+        return _ffprobe_duration(path)
+    except (OSError, subprocess.CalledProcessError, KeyError, ValueError):
+        return None
+
+
+def decode_pcm(path):
+    """Decode and resample any supported upload to 16 kHz mono in one ffmpeg pass"""
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, '-nostdin', '-v', 'error', '-i', path,
+             '-ac', str(CHANNELS), '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+            capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is not installed")
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"Could not decode audio: {e.stderr.decode(errors='ignore').strip()}")
+
+    return DecodedAudio(result.stdout)
+
+
+def _feed_stdin(pipe, data):
+    try:
+        view = memoryview(data)
+        for offset in range(0, len(view), 64 * 1024):
+            pipe.write(view[offset:offset + 64 * 1024])
+    except BrokenPipeError:
+        pass
+    finally:
+        pipe.close()
+
+
+def _encode_pcm(audio, codec_args):
+    """Pipe PCM through ffmpeg stdin -> stdout into a spooled buffer"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        process = subprocess.Popen(
+            [FFMPEG_BINARY, '-v', 'error', '-f', 's16le', '-ar', str(audio.sample_rate),
+             '-ac', str(CHANNELS), '-i', 'pipe:0', *codec_args, 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is not installed")
+
+    # Feed stdin from a thread so a full stdout pipe can never deadlock us
+    writer = threading.Thread(target=_feed_stdin, args=(process.stdin, audio.pcm), daemon=True)
+    writer.start()
+    for chunk in iter(lambda: process.stdout.read(64 * 1024), b''):
+        spool.write(chunk)
+    writer.join()
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        spool.close()
+        raise AudioDecodeError(f"Could not encode audio: {stderr.decode(errors='ignore').strip()}")
+
+    spool.seek(0)
+    return spool
+
+
+def encode_for_transcription(audio, fmt=None):
+    """Return (filename, file object, size in bytes) ready to upload to Whisper.
+
+    Falls back to WAV when the configured encoder is unavailable, so a
+    deployment without libopus keeps working.
+    """
+    fmt = fmt or TRANSCODE_FORMAT
+    if fmt in ENCODERS:
+        filename, codec_args = ENCODERS[fmt]
+        try:
+            encoded = _encode_pcm(audio, codec_args)
+            size = encoded.seek(0, os.SEEK_END)
+            encoded.seek(0)
+            return filename, encoded, size
+        except AudioDecodeError as e:
+            print(f"⚠️ {fmt} encode failed, falling back to WAV: {e}")
+    elif fmt != 'wav':
+        print(f"⚠️ Unknown TRANSCODE_FORMAT '{fmt}', using WAV")
+
+    wav_bytes = audio.to_wav_bytes()
+    return 'audio.wav', io.BytesIO(wav_bytes), len(wav_bytes)
+
+
+def waveform_peaks(audio, buckets=None):
+    """Peak amplitude (0-100) of each of `buckets` equal slices of the PCM.
+
+    Two reduceat passes over the int16 frames, so a five-minute recording
+    takes a few milliseconds.
+    """
+    import numpy as np    # only needed at sample ingestion
+
+    buckets = buckets or WAVEFORM_PEAKS
+    frames = np.frombuffer(audio.pcm, dtype=np.int16)
+    buckets = min(buckets, len(frames))
+    if not buckets:
+        return []
+    # Slice edges from linspace so lengths that don't divide evenly lose no tail frames
+    edges = np.linspace(0, len(frames), buckets + 1).astype(np.int64)[:-1]
+    peaks = np.maximum(np.maximum.reduceat(frames, edges).astype(np.int32),
+                       -np.minimum.reduceat(frames, edges).astype(np.int32))
+    return np.minimum(np.round(peaks * (100 / 32768)), 100).astype(int).tolist()
+
+
+def encode_preview(audio, path):
+    """Write a low-bitrate Opus/Ogg preview of the decoded PCM to path"""
+    codec_args = ['-c:a', 'libopus', '-b:a', PREVIEW_BITRATE, '-application', 'voip', '-f', 'ogg']
+    encoded = _encode_pcm(audio, codec_args)
+    try:
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(encoded, f)
+    finally:
+        encoded.close()
+    return path
+
+
+def find_silences(audio, threshold_db=None, min_seconds=None):
+    """(start, end) seconds of every pause in the recording, as an (n, 2) array.
+
+    Frame loudness is computed for the whole buffer at once (one reshape
+    and one reduction over the int16 samples) instead of pydub-style
+    per-chunk loops, and runs of quiet frames are found with a diff.
+    """
+    import numpy as np
+
+    threshold_db = SILENCE_THRESHOLD_DB if threshold_db is None else threshold_db
+    min_seconds = SILENCE_MIN_SECONDS if min_seconds is None else min_seconds
+    hop = int(audio.sample_rate * SILENCE_FRAME_SECONDS)
+    samples = np.frombuffer(audio.pcm, dtype=np.int16)
+    count = len(samples) // hop
+    if not count:
+        return np.empty((0, 2))
+
+    frames = samples[:count * hop].reshape(count, hop).astype(np.float32)
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / hop) + 1e-6
+    # Relative to the loud frames, so recording gain doesn't matter and one click doesn't set the scale
+    quiet = 20 * np.log10(rms / max(np.percentile(rms, 95), 1e-6)) < threshold_db
+
+    edges = np.diff(np.concatenate(([0], quiet.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    keep = (ends - starts) * SILENCE_FRAME_SECONDS >= min_seconds
+    return np.column_stack((starts[keep], ends[keep])) * SILENCE_FRAME_SECONDS
+
+
+def plan_segments(audio, chunk_seconds, overlap_seconds):
+    """Split points for transcribing the recording in ~chunk_seconds pieces.
+
+    Each cut goes in the middle of the pause closest to the ideal position
+    (within a quarter chunk either side), or at the ideal position when
+    there is none. Segments extend overlap_seconds past each cut so a word
+    clipped by one is whole in the other. Returns [(start, end)] seconds;
+    a single segment when the recording is short enough to send as is.
+    """
+    duration = audio.duration
+    if duration <= chunk_seconds * 1.5:
+        return [(0.0, duration)]
+
+    silences = find_silences(audio)
+    middles = silences.mean(axis=1) if len(silences) else []
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds * 1.5:
+        ideal = cuts[-1] + chunk_seconds
+        nearby = [m for m in middles if abs(m - ideal) <= chunk_seconds / 4]
+        cuts.append(float(min(nearby, key=lambda m: abs(m - ideal))) if nearby else ideal)
+    cuts.append(duration)
+
+    return [
+        (max(0.0, start - overlap_seconds), min(duration, end + overlap_seconds))
+        for start, end in zip(cuts, cuts[1:])
+    ]
@@ -0,0 +1,230 @@
+import os
+import csv
+import json
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+from audio import probe_duration, decode_pcm, encode_for_transcription, AudioDecodeError
+
+# Files accepted in one batch, and decode/transcode processes per worker
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 40))
+BATCH_DECODE_PROCESSES = int(os.getenv('BATCH_DECODE_PROCESSES', os.cpu_count() or 2))
+# Uncompressed size allowed for a ZIP's audio, so a zip bomb can't fill the disk
+BATCH_MAX_EXTRACTED_MB = int(os.getenv('BATCH_MAX_EXTRACTED_MB', 1024))
+
+AUDIO_EXTENSIONS = {'wav', 'mp3', 'm4a', 'webm', 'ogg'}
+MANIFEST_NAMES = ('manifest.csv', 'manifest.json')
+
+# Score bands used in the class summary, as (label, lower bound)
+SCORE_BANDS = (('1.75-2.0', 1.75), ('1.5-1.75', 1.5), ('1.25-1.5', 1.25), ('1.0-1.25', 1.0), ('below 1.0', 0))
+CRITERIA = ('content', 'accuracy', 'delivery', 'total')
+FLUENCY_AVERAGES = ('words_per_minute', 'pauses_per_minute', 'fillers_per_minute')
+
+
+class BatchError(ValueError):
+    """The batch as a whole can't be read (bad archive, manifest or file count)"""
+    pass
+
+
+class BatchFileError(Exception):
+    """One file of the batch was rejected; the rest carry on"""
+    pass
+
+
+def _read_manifest(path):
+    """{filename: {"topic", "student"}} from a manifest.csv (file,topic[,student] columns)
+    or a manifest.json (a list of such rows, or {filename: topic})"""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):    # {"file.mp3": "topic"} or {"file.mp3": {"topic", "student"}}
+            rows = [{'file': name, **(value if isinstance(value, dict) else {'topic': value})}
+                    for name, value in rows.items()]
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+    manifest = {}
+    for row in rows:
+        filename = (row.get('file') or row.get('filename') or '').strip()
+        if filename:
+            manifest[os.path.basename(filename)] = {
+                'topic': (row.get('topic') or '').strip(),
+                'student': (row.get('student') or '').strip(),
+            }
+    return manifest
+
+
+def extract_archive(path, folder, default_topic=None):
+    """Audio files of a ZIP as [{"filename", "path", "topic", "student"}].
+
+    Topics and student names come from a manifest.csv / manifest.json at
+    any level of the archive, falling back to default_topic. Nested
+    folders are flattened; other files are ignored.
+    """
+    if not zipfile.is_zipfile(path):
+        raise BatchError("Archive is not a ZIP file")
+
+    items, manifest = [], {}
+    with zipfile.ZipFile(path) as archive:
+        entries = [info for info in archive.infolist() if not info.is_dir()]
+        for info in entries:
+            name = os.path.basename(info.filename)
+            if name.lower() in MANIFEST_NAMES:
+                target = os.path.join(folder, name.lower())
+                with archive.open(info) as src, open(target, 'wb') as dst:
+                    dst.write(src.read())
+                try:
+                    manifest.update(_read_manifest(target))
+                except (ValueError, KeyError, csv.Error) as e:
+                    raise BatchError(f"Could not read {name}: {e}")
+
+        audio_entries = [
+            info for info in entries
+            if not os.path.basename(info.filename).startswith('.')
+            and os.path.basename(info.filename).rsplit('.', 1)[-1].lower() in AUDIO_EXTENSIONS
+        ]
+        if len(audio_entries) > BATCH_MAX_FILES:
+            raise BatchError(f"At most {BATCH_MAX_FILES} files per batch")
+        if sum(info.file_size for info in audio_entries) > BATCH_MAX_EXTRACTED_MB * 1024 * 1024:
+            raise BatchError(f"Archive audio is larger than {BATCH_MAX_EXTRACTED_MB} MB uncompressed")
+
+        for index, info in enumerate(audio_entries):
+            name = os.path.basename(info.filename)
+            target = os.path.join(folder, f"{index:03d}_{secure_filename(name) or 'audio'}")
+            # Streamed entry by entry, so a large archive is never read into memory
+            with archive.open(info) as src, open(target, 'wb') as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                    dst.write(chunk)
+            entry = manifest.get(name, {})
+            items.append({
+                'filename': name,
+                'path': target,
+                'topic': entry.get('topic') or default_topic,
+                'student': entry.get('student') or os.path.splitext(name)[0],
+            })
+    return items
+
+
+def prepare_audio(path, max_seconds, encode_up_to=None):
+    """Process pool task: decode an upload and encode it for Whisper.
+
+    Returns (pcm bytes, (filename, encoded bytes) or None); the parent
+    wraps them back into DecodedAudio / a file object. Runs in a separate
+    process so the CPU-bound work of a whole class spreads across cores.
+    Recordings longer than encode_up_to seconds are left unencoded - they
+    are split and each piece encoded at transcription time.
+    """
+    duration = probe_duration(path)
+    if duration is not None and duration > max_seconds:
+        raise BatchFileError(f"Audio file exceeds {max_seconds // 60} minute limit")
+    try:
+        audio = decode_pcm(path)
+    except AudioDecodeError as e:
+        raise BatchFileError(str(e))
+    if audio.duration > max_seconds:
+        raise BatchFileError(f"Audio file exceeds {max_seconds // 60} minute limit")
+    if encode_up_to is not None and audio.duration > encode_up_to:
+        return audio.pcm, None
+
+    filename, stream, _ = encode_for_transcription(audio)
+    with stream:
+        return audio.pcm, (filename, stream.read())
+
+
+_decode_pool = None
+_decode_pool_pid = None
+_decode_pool_lock = threading.Lock()
+
+
+def decode_pool():
+    """The worker's process pool for prepare_audio, started on first use.
+
+    Spawned rather than forked: a gunicorn worker has threads running, and
+    a spawned child only imports this module and audio. A pool left broken
+    by a child that crashed (or was OOM-killed) is replaced.
+    """
+    global _decode_pool, _decode_pool_pid
+    with _decode_pool_lock:
+        if _decode_pool is None or _decode_pool_pid != os.getpid() or _decode_pool._broken:
+            if _decode_pool is not None and _decode_pool_pid == os.getpid():
+                _decode_pool.shutdown(wait=False, cancel_futures=True)
+            _decode_pool = ProcessPoolExecutor(
+                max_workers=BATCH_DECODE_PROCESSES, mp_context=multiprocessing.get_context('spawn')
+            )
+            _decode_pool_pid = os.getpid()
+        return _decode_pool
+
+
+class _Running:
+    """Count, mean, min and max of a stream of numbers"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def as_dict(self):
+        if not self.count:
+            return None
+        return {'mean': round(self.total / self.count, 2), 'min': self.min, 'max': self.max}
+
+
+class ClassSummary:
+    """Class statistics updated as each result arrives.
+
+    Keeps running totals and one short roster row per student - never
+    transcripts or audio - so a batch of any size summarises in constant
+    memory per file.
+    """
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.criteria = {criterion: _Running() for criterion in CRITERIA}
+        self.fluency = {metric: _Running() for metric in FLUENCY_AVERAGES}
+        self.bands = {label: 0 for label, _ in SCORE_BANDS}
+        self.topics = {}
+        self.roster = []
+        self.failed = []
+
+    def add(self, item, result):
+        scores = result['scores']
+        for criterion in CRITERIA:
+            self.criteria[criterion].add(scores[criterion])
+        for metric in FLUENCY_AVERAGES:
+            self.fluency[metric].add((result.get('fluency') or {}).get(metric))
+        # Anything under the last band's floor (a negative total) still counts in it
+        self.bands[next((label for label, low in SCORE_BANDS if scores['total'] >= low), SCORE_BANDS[-1][0])] += 1
+        self.topics[item['topic']] = self.topics.get(item['topic'], 0) + 1
+        self.roster.append({
+            'student': item['student'], 'filename': item['filename'], 'topic': item['topic'],
+            **{criterion: scores[criterion] for criterion in CRITERIA},
+            'report_id': result.get('report_id'),
+        })
+
+    def add_failure(self, item, error):
+        self.failed.append({'student': item['student'], 'filename': item['filename'], 'error': error})
+
+    def as_dict(self):
+        return {
+            'files': self.total_files,
+            'analyzed': len(self.roster),
+            'failed': self.failed,
+            'scores': {criterion: running.as_dict() for criterion, running in self.criteria.items()},
+            'fluency': {metric: running.as_dict() for metric, running in self.fluency.items()},
+            'score_bands': self.bands,
+            'topics': self.topics,
+            'roster': sorted(self.roster, key=lambda row: row['student'].lower()),
+        }
@@ -0,0 +1,100 @@
+"""CPU and peak RSS of the analyze audio path, legacy pydub vs decode-once.
+
+Usage (from backend/):
+    python -m benchmarks.bench_audio_decode [--seconds 300] [--repeat 3] [--json out.json]
+
+Each path runs in a fresh child process so ru_maxrss is not polluted by the
+other run; CPU includes the ffmpeg/ffprobe subprocesses it spawns.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def legacy_path(path):
+    # What /api/analyze did before: three full pydub decodes and a WAV on disk
+    from pydub import AudioSegment
+    AudioSegment.from_file(path)
+    wav_path = os.path.join(tempfile.mkdtemp(), 'out.wav')
+    AudioSegment.from_file(path).set_frame_rate(16000).set_channels(1).export(wav_path, format='wav')
+    with open(wav_path, 'rb') as f:
+        f.read()
+    AudioSegment.from_file(wav_path)
+    os.remove(wav_path)
+
+
+def decode_once_path(path):
+    from audio import probe_duration, decode_pcm
+    probe_duration(path)
+    audio = decode_pcm(path)
+    audio.to_wav_bytes()
+
+
+PATHS = {'legacy': legacy_path, 'decode_once': decode_once_path}
+
+
+def run_child(name, path):
+    start = time.perf_counter()
+    PATHS[name](path)
+    wall = time.perf_counter() - start
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(json.dumps({
+        'wall_s': wall,
+        'cpu_s': own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        'python_peak_rss_mb': own.ru_maxrss / 1024,
+        'ffmpeg_peak_rss_mb': children.ru_maxrss / 1024,
+    }))
+
+
+def measure(name, path, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_audio_decode', '--child', name, path],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            sys.exit(f"{name} run failed:\n{out.stderr}")
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: min(r[key] for r in runs) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=300)
+    parser.add_argument('--format', default='mp3')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from benchmarks.fixtures import synthetic_audio
+    path = synthetic_audio(args.seconds, args.format)
+
+    results = {name: measure(name, path, args.repeat) for name in PATHS}
+    print(f"{args.seconds}s {args.format} upload, best of {args.repeat}")
+    print(f"{'path':<12} {'wall s':>8} {'cpu s':>8} {'py RSS MB':>10} {'ffmpeg RSS MB':>14}")
+    for name, r in results.items():
+        print(f"{name:<12} {r['wall_s']:>8.2f} {r['cpu_s']:>8.2f} "
+              f"{r['python_peak_rss_mb']:>10.1f} {r['ffmpeg_peak_rss_mb']:>14.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'seconds': args.seconds, 'format': args.format, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
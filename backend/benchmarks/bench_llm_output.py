@@ -0,0 +1,100 @@
+"""Grading-output parsing: legacy replace/regex chain vs llm_output.parse_llm_json.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_output [--number 2000] [--json out.json]
+
+Runs both parsers over every completion in benchmarks/llm_outputs/ and
+reports how many each one turns into a valid grading, plus time per call.
+"""
+import os
+import re
+import sys
+import json
+import glob
+import timeit
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from llm_output import parse_llm_json, validate, LLMOutputError
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'llm_outputs')
+
+GRADING_SCHEMA = {
+    "scores": {"content": float, "accuracy": float, "delivery": float, "total": float},
+    "feedback": {"content": str, "accuracy": str, "delivery": str},
+}
+
+
+def legacy_parse(result_text):
+    # The post-processing grade_speech used to run on every completion
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+
+    result_text = result_text.replace('—', '-').replace('–', '-')
+    result_text = result_text.replace('‘', "'").replace('’', "'")
+    result_text = result_text.replace('“', '"').replace('”', '"')
+    result_text = result_text.replace('–', '-').replace('—', '-')
+    result_text = re.sub(r'[​-‏‪-‮⁠﻿]', '', result_text)
+    result_text = result_text.replace(' ', ' ')
+    result_text = result_text.replace('﻿', '')
+    result_text = result_text.replace(' ', ' ')
+    result_text = re.sub(r'[^\x00-\x7F]+', '', result_text)
+    result_text = re.sub(r'[\x00-\x1F\x7F]', '', result_text)
+
+    return json.loads(result_text)
+
+
+def new_parse(result_text):
+    return parse_llm_json(result_text, GRADING_SCHEMA)
+
+
+def load_corpus():
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+
+def outcome(parser, text):
+    try:
+        validate(parser(text), GRADING_SCHEMA)
+        return 'ok'
+    except (ValueError, LLMOutputError, KeyError, IndexError) as e:
+        return type(e).__name__
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='calls per fixture')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    results = {}
+    print(f"{'fixture':<42} {'legacy':>16} {'new':>16}")
+    for name, text in corpus.items():
+        row = {}
+        for label, fn in (('legacy', legacy_parse), ('new', new_parse)):
+            status = outcome(fn, text)
+            per_call_us = timeit.timeit(lambda: outcome(fn, text), number=args.number) / args.number * 1e6
+            row[label] = {'status': status, 'us_per_call': per_call_us}
+        results[name] = row
+        print(f"{name:<42} {row['legacy']['status']:>6} {row['legacy']['us_per_call']:>7.1f}us "
+              f"{row['new']['status']:>6} {row['new']['us_per_call']:>7.1f}us")
+
+    for label in ('legacy', 'new'):
+        ok = sum(1 for row in results.values() if row[label]['status'] == 'ok')
+        print(f"{label}: {ok}/{len(results)} parsed")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
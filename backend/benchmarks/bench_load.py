@@ -0,0 +1,306 @@
+"""End-to-end load test of /api/analyze under gunicorn against a fake Groq API.
+
+For every --workers x --threads combination this starts gunicorn in a
+scratch directory (throwaway SQLite database, result cache and rate
+limiting off) with GROQ_BASE_URL pointing at an in-process FakeGroq,
+then sends --requests analyses from --concurrency client threads, cycling
+through the audio fixtures. It reports throughput, p50/p95/p99 latency
+(and time to first score for --endpoint stream), peak RSS of the server
+process tree and server CPU seconds per request, ffmpeg included.
+Reads /proc, so Linux only.
+
+Results go to benchmarks/results/load_<commit>.json unless --json is
+given; pass an earlier file as --compare to print the change per run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load [--workers 1,2,4] [--threads 1,4] [--concurrency 8] [--requests 40]
+        [--durations 30,60] [--formats mp3,wav,m4a,webm,ogg] [--endpoint analyze|stream]
+        [--latency 0.8] [--tokens-per-second 250] [--transcription-latency 0.5]
+        [--json out.json] [--compare old.json]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_groq import FakeGroq
+from benchmarks.fixtures import fixture_set, FIXTURE_DURATIONS, FORMAT_ARGS
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+MIME_TYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'm4a': 'audio/mp4', 'webm': 'audio/webm', 'ogg': 'audio/ogg'}
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _process_tree(root_pid):
+    """root_pid and all its live descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _rss_bytes(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+def _cpu_seconds(pids):
+    """User + system time of pids, plus their reaped children (ffmpeg, dead workers)"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += sum(int(value) for value in fields[11:15])
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / CLOCK_TICKS
+
+
+class ResourceSampler:
+    """Polls the server's process tree for peak RSS while a run is in flight"""
+
+    def __init__(self, root_pid, interval=0.2):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, _rss_bytes(_process_tree(self.root_pid)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_server(workers, threads, groq_url, scratch, port):
+    env = dict(
+        os.environ,
+        GROQ_BASE_URL=groq_url,
+        GROQ_API_KEY='fake',
+        DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+        RATE_LIMIT_ENABLED='0',
+        # Every request should run the full pipeline, not hit cached transcripts/gradings
+        RESULT_CACHE_TTL='0',
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(scratch, 'metrics'),
+    )
+    # A fresh database, so create the schema first like a deploy would (the
+    # metrics directory only exists once gunicorn has started)
+    init_env = {key: value for key, value in env.items() if key != 'PROMETHEUS_MULTIPROC_DIR'}
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=scratch,
+                   env=dict(init_env, PYTHONPATH=BACKEND_DIR), check=True, capture_output=True)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--chdir', scratch, '--pythonpath', BACKEND_DIR,
+         '-c', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+         '-w', str(workers), '--threads', str(threads), '--timeout', '600',
+         '-b', f'127.0.0.1:{port}', 'app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(scratch, 'gunicorn.log'), 'wb')
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited, see {os.path.join(scratch, 'gunicorn.log')}")
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health', timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.kill()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def analyze(client, url, endpoint, payload):
+    """One analysis; returns (ok, seconds, seconds to first score or None)"""
+    (seconds, fmt), data = payload
+    files = {'audio': (f"answer_{seconds}s.{fmt}", data, MIME_TYPES[fmt])}
+    form = {'topic': f"Benchmark topic {seconds}s"}
+    started = time.perf_counter()
+    if endpoint == 'analyze':
+        response = client.post(f"{url}/api/analyze", files=files, data=form)
+        return response.status_code == 200, time.perf_counter() - started, None
+
+    first_score, ok = None, False
+    with client.stream('POST', f"{url}/api/analyze/stream", files=files, data=form) as response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line).get('event')
+            if event == 'scores' and first_score is None:
+                first_score = time.perf_counter() - started
+            if event in ('done', 'error'):
+                ok = event == 'done'
+    return ok and response.status_code == 200, time.perf_counter() - started, first_score
+
+
+def run_load(url, endpoint, payloads, requests, concurrency, server_pid):
+    client = httpx.Client(timeout=600)
+    # One warm-up request per client thread so imports and first-request setup aren't timed
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda i: analyze(client, url, endpoint, payloads[i % len(payloads)]), range(concurrency)))
+
+    tree = _process_tree(server_pid)
+    cpu_before = _cpu_seconds(tree)
+    with ResourceSampler(server_pid) as sampler, ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(lambda i: analyze(client, url, endpoint, payloads[i % len(payloads)]),
+                                range(requests)))
+        wall = time.perf_counter() - started
+        cpu_after = _cpu_seconds(set(tree) | set(_process_tree(server_pid)))
+    client.close()
+
+    latencies = np.array([seconds for ok, seconds, _ in results if ok]) * 1000
+    first_scores = np.array([ttfs for ok, _, ttfs in results if ok and ttfs is not None]) * 1000
+    run = {
+        'requests': requests,
+        'errors': sum(1 for ok, _, _ in results if not ok),
+        'wall_s': round(wall, 2),
+        'throughput_rps': round(len(latencies) / wall, 3),
+        'peak_rss_mb': round(sampler.peak_rss / 2 ** 20, 1),
+        'cpu_s_per_request': round((cpu_after - cpu_before) / requests, 3),
+    }
+    for name, values in (('latency', latencies), ('first_score', first_scores)):
+        if len(values):
+            for p in (50, 95, 99):
+                run[f'{name}_p{p}_ms'] = round(float(np.percentile(values, p)), 1)
+    return run
+
+
+def print_runs(runs, baseline=None):
+    columns = ('workers', 'threads', 'throughput_rps', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms',
+               'first_score_p50_ms', 'peak_rss_mb', 'cpu_s_per_request', 'errors')
+    print(' '.join(f"{c:>18}" for c in columns))
+    for run in runs:
+        print(' '.join(f"{run.get(c, '-'):>18}" for c in columns))
+        previous = (baseline or {}).get((run['workers'], run['threads']))
+        if previous:
+            deltas = []
+            for c in columns[2:-1]:
+                if isinstance(run.get(c), (int, float)) and previous.get(c):
+                    deltas.append(f"{(run[c] - previous[c]) / previous[c] * 100:+17.1f}%")
+                else:
+                    deltas.append(f"{'-':>18}")
+            print(f"{'vs baseline':>37} " + ' '.join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--threads', default='1,4')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--durations', default=','.join(map(str, FIXTURE_DURATIONS[:2])))
+    parser.add_argument('--formats', default=','.join(FORMAT_ARGS))
+    parser.add_argument('--endpoint', choices=('analyze', 'stream'), default='analyze')
+    parser.add_argument('--latency', type=float, default=0.8, help='fake Groq: seconds to first token')
+    parser.add_argument('--tokens-per-second', type=float, default=250.0)
+    parser.add_argument('--transcription-latency', type=float, default=0.5)
+    parser.add_argument('--json', help='write results here (default: benchmarks/results/load_<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args()
+
+    fixtures = fixture_set([int(d) for d in args.durations.split(',')], args.formats.split(','))
+    payloads = []
+    for key, path in sorted(fixtures.items()):
+        with open(path, 'rb') as f:
+            payloads.append((key, f.read()))
+
+    fake = FakeGroq(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                    transcription_latency=args.transcription_latency, seed=42)
+    groq_url = fake.start()
+
+    runs = []
+    try:
+        for workers in (int(w) for w in args.workers.split(',')):
+            for threads in (int(t) for t in args.threads.split(',')):
+                with tempfile.TemporaryDirectory() as scratch:
+                    port = _free_port()
+                    server = start_server(workers, threads, groq_url, scratch, port)
+                    try:
+                        run = run_load(f'http://127.0.0.1:{port}', args.endpoint, payloads,
+                                       args.requests, args.concurrency, server.pid)
+                    finally:
+                        server.terminate()
+                        server.wait(timeout=30)
+                runs.append({'workers': workers, 'threads': threads, **run})
+                print(f"workers={workers} threads={threads}: {run['throughput_rps']} req/s, "
+                      f"p95 {run.get('latency_p95_ms')} ms, {run['errors']} errors")
+    finally:
+        fake.stop()
+
+    results = {
+        'commit': _commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('json', 'compare')},
+        'runs': runs,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(run['workers'], run['threads']): run for run in json.load(f)['runs']}
+    print()
+    print_runs(runs, baseline)
+
+    path = args.json or os.path.join(RESULTS_DIR, f"load_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == '__main__':
+    main()
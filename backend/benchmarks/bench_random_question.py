@@ -0,0 +1,94 @@
+"""Random question pick: loading the whole bank vs the cached id index.
+
+Builds a throwaway SQLite bank of --questions rows and times one pick per
+call for the legacy Question.query.all() + random.choice, an indexed random
+pick, an indexed pick within a category and a no-repeat deck pick.
+
+Usage (from backend/):
+    python -m benchmarks.bench_random_question [--questions 10000] [--number 500] [--json out.json]
+"""
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+
+from database import db, Question
+from question_sampler import QuestionSampler
+
+CATEGORIES = ['General', 'Education', 'Technology', 'Environment', 'Society']
+
+
+def build_app(path, count):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Question.__table__.insert(), [
+            {'topic': f"Topic {i}", 'question': f"Question {i}: " + "Discuss the statement. " * 10,
+             'category': CATEGORIES[i % len(CATEGORIES)]}
+            for i in range(count)
+        ])
+        db.session.commit()
+    return app
+
+
+def legacy_pick():
+    questions = Question.query.all()
+    return random.choice(questions).to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=10000)
+    parser.add_argument('--number', type=int, default=500)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), args.questions)
+        sampler = QuestionSampler(ttl_seconds=3600)
+        deck = {}
+
+        def deck_pick():
+            question, deck['state'] = sampler.pick(deck=deck.get('state'), no_repeat=True)
+            return question.to_dict()
+
+        cases = (
+            ('legacy', legacy_pick),
+            ('indexed', lambda: sampler.pick()[0].to_dict()),
+            ('category', lambda: sampler.pick('Education')[0].to_dict()),
+            ('no_repeat', deck_pick),
+        )
+
+        results = {'questions': args.questions}
+        with app.app_context():
+            sampler.pick()    # build the index outside the timed loop, as a warm worker would have
+            for name, fn in cases:
+                # Legacy is orders of magnitude slower; keep its run short
+                number = max(1, args.number // 50) if name == 'legacy' else args.number
+                seconds = timeit.timeit(fn, number=number)
+                db.session.remove()
+                results[name] = {'us_per_pick': seconds / number * 1e6}
+                print(f"{name:<10} {results[name]['us_per_pick']:>12.1f} us/pick")
+
+            sampler.invalidate()
+            seconds = timeit.timeit(lambda: sampler._ids(), number=1)
+            results['index_rebuild_ms'] = seconds * 1000
+            print(f"index rebuild {results['index_rebuild_ms']:.1f} ms ({args.questions} questions)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
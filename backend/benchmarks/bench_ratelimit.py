@@ -0,0 +1,92 @@
+"""Per-request overhead of the rate limiter: legacy per-IP lists vs token buckets.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ratelimit [--keys 10000] [--hits 50000] [--json out.json]
+
+Clients are drawn at random from --keys distinct IPs against the
+analyze limit (10 per hour). Reports microseconds per hit and the memory
+held by the limiter state afterwards (memory backends only).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ratelimit import RateLimiter, MemoryBackend, SQLiteBackend
+
+
+class LegacyLimiter:
+    # The list-of-datetimes limiter the rate_limit decorator used before
+    def __init__(self):
+        self.storage = {}
+
+    def hit(self, key, max_requests, window_seconds):
+        current_time = datetime.now()
+        if key not in self.storage:
+            self.storage[key] = []
+        self.storage[key] = [
+            t for t in self.storage[key] if (current_time - t).seconds < window_seconds
+        ]
+        if len(self.storage[key]) >= max_requests:
+            return False, window_seconds
+        self.storage[key].append(current_time)
+        return True, 0
+
+
+def drive(limiter, keys, hits):
+    rng = random.Random(42)
+    ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(keys)]
+    start = time.perf_counter()
+    for _ in range(hits):
+        limiter.hit(f"analyze_speech:{rng.choice(ips)}", 10, 3600)
+    return time.perf_counter() - start
+
+
+def run(make_limiter, keys, hits, track_memory):
+    elapsed = drive(make_limiter(), keys, hits)
+    memory_kb = None
+    if track_memory:
+        # Separate pass: tracemalloc would distort the timing above
+        tracemalloc.start()
+        limiter = make_limiter()
+        drive(limiter, keys, hits)
+        memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+    return {'us_per_hit': elapsed / hits * 1e6, 'state_kb': memory_kb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--hits', type=int, default=50000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    limiters = {
+        'legacy': (LegacyLimiter, True),
+        'memory': (lambda: RateLimiter(MemoryBackend()), True),
+        'sqlite': (lambda: RateLimiter(SQLiteBackend(os.path.join(tmp_dir, 'buckets.db'))), False),
+    }
+
+    results = {}
+    for name, (limiter, track_memory) in limiters.items():
+        results[name] = run(limiter, args.keys, args.hits, track_memory)
+        memory = f"{results[name]['state_kb']:.0f} KB" if results[name]['state_kb'] is not None else 'on disk'
+        print(f"{name:<8} {results[name]['us_per_hit']:>8.2f} us/hit   state: {memory}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
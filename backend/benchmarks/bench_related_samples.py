@@ -0,0 +1,98 @@
+"""Related-samples TF-IDF index: build, incremental update and query latency.
+
+Builds a throwaway SQLite library of --samples synthetic transcripts
+(~600 words each), syncs the index from it, then times queries, a
+one-sample edit followed by the next query, and a full cold sync.
+
+Usage (from backend/):
+    python -m benchmarks.bench_related_samples [--samples 5000] [--queries 200] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+
+from database import db, Sample
+from recommender import RelatedSamples
+
+THEMES = {
+    'technology': "computers internet smartphones software online digital screen social media apps coding".split(),
+    'environment': "climate pollution recycling energy solar forests carbon emissions plastic ocean".split(),
+    'education': "school teachers students homework exams classroom university curriculum learning grades".split(),
+    'health': "exercise diet sleep stress doctors hospital fitness vegetables sugar wellbeing".split(),
+    'society': "community family neighbours volunteering culture tradition government city rural elderly".split(),
+}
+FILLER = ("people think important because example reason believe however therefore many "
+          "young life world future change problem solution benefit").split()
+
+
+def synthetic_transcript(rng, theme, words=600):
+    vocabulary = THEMES[theme] * 3 + FILLER
+    return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    themes = list(THEMES)
+    results = {'samples': args.samples}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(Sample.__table__.insert(), [
+                {'filename': f"s{i}.mp3", 'topic': f"{themes[i % 5].title()} question {i}", 'speaker': 'Speaker',
+                 'score': rng.choice([1.4, 1.6, 1.8, 2.0]), 'transcript': synthetic_transcript(rng, themes[i % 5]),
+                 'feedback': ''}
+                for i in range(args.samples)
+            ])
+            db.session.commit()
+
+            index = RelatedSamples()
+            started = time.perf_counter()
+            index.sync(1)
+            index.query('warm up', 'warm up')
+            results['cold_sync_ms'] = (time.perf_counter() - started) * 1000
+
+            queries = [(f"{t.title()} question", synthetic_transcript(rng, t, 300))
+                       for t in (rng.choice(themes) for _ in range(args.queries))]
+            started = time.perf_counter()
+            for topic, transcript in queries:
+                index.query(topic, transcript)
+            results['query_ms'] = (time.perf_counter() - started) / len(queries) * 1000
+
+            # An admin edits one sample: re-sync against the new version, then query
+            sample = db.session.get(Sample, 1)
+            sample.transcript = synthetic_transcript(rng, 'health')
+            db.session.commit()
+            started = time.perf_counter()
+            index.sync(2)
+            index.query(*queries[0])
+            results['edit_sync_and_query_ms'] = (time.perf_counter() - started) * 1000
+
+    for key, value in results.items():
+        print(f"{key:<24} {value:>10.1f}" if isinstance(value, float) else f"{key:<24} {value:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Report building: Document() from scratch vs filling the pre-styled template.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reports [--number 50] [--json out.json]
+"""
+import os
+import io
+import sys
+import json
+import timeit
+import argparse
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from reports import generate_docx
+
+TOPIC = "Cooperative learning is the most effective approach for students to achieve academic success."
+TRANSCRIPT = " ".join(["My question number is 3 and here is my response."] * 70)
+GRADING = {
+    "scores": {"content": 0.72, "accuracy": 0.48, "delivery": 0.4, "total": 1.6},
+    "feedback": {
+        "content": "**Strengths:**\n- Clear position\n\n**Weaknesses:**\n- Thin examples",
+        "accuracy": "**Strengths:**\n- Good linking devices\n\n**Weaknesses:**\n- Agreement errors",
+        "delivery": "**Strengths:**\n- Steady pace\n\n**Weaknesses:**\n- Long pauses",
+    },
+    "sample_response": " ".join(["This is a sentence of the sample response."] * 80),
+}
+
+
+def legacy_generate_docx(topic, transcript, grading_result):
+    # The builder /api/analyze used to run on every request
+    doc = Document()
+    title = doc.add_heading('necs. - Speech Feedback Report', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Date: {datetime.now().strftime('%B %d, %Y')}")
+    doc.add_paragraph(f"Topic: {topic}")
+    doc.add_paragraph()
+    doc.add_heading('Score Summary', 1)
+    scores = grading_result['scores']
+    table = doc.add_table(rows=5, cols=2)
+    table.style = 'Light Grid Accent 1'
+    score_data = [
+        ('Content', f"{scores['content']}/0.9"),
+        ('Accuracy', f"{scores['accuracy']}/0.6"),
+        ('Delivery', f"{scores['delivery']}/0.5"),
+        ('', ''),
+        ('TOTAL SCORE', f"{scores['total']}/2.0")
+    ]
+    for i, (criterion, score) in enumerate(score_data):
+        table.rows[i].cells[0].text = criterion
+        table.rows[i].cells[1].text = score
+        if i == 4:
+            for cell in table.rows[i].cells:
+                for paragraph in cell.paragraphs:
+                    for run in paragraph.runs:
+                        run.bold = True
+    doc.add_paragraph()
+    doc.add_heading('Detailed Feedback', 1)
+    feedback = grading_result['feedback']
+    doc.add_heading('1. Content', 2)
+    doc.add_paragraph(feedback['content'])
+    doc.add_heading('2. Accuracy', 2)
+    doc.add_paragraph(feedback['accuracy'])
+    doc.add_heading('3. Delivery', 2)
+    doc.add_paragraph(feedback['delivery'])
+    doc.add_page_break()
+    doc.add_heading('Your Speech Transcript', 1)
+    doc.add_paragraph(transcript)
+    doc.add_page_break()
+    doc.add_heading('Sample 2.0/2.0 Response', 1)
+    doc.add_paragraph(grading_result['sample_response'])
+    file_stream = io.BytesIO()
+    doc.save(file_stream)
+    file_stream.seek(0)
+    return file_stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=50)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    # Build the template outside the timed loop, as a warm worker would have
+    generate_docx(TOPIC, TRANSCRIPT, GRADING)
+
+    results = {}
+    for name, fn in (('legacy', legacy_generate_docx), ('template', generate_docx)):
+        seconds = timeit.timeit(lambda: fn(TOPIC, TRANSCRIPT, GRADING), number=args.number)
+        results[name] = {'ms_per_report': seconds / args.number * 1000,
+                         'bytes': len(fn(TOPIC, TRANSCRIPT, GRADING).getvalue())}
+        print(f"{name:<10} {results[name]['ms_per_report']:>7.2f} ms/report  {results[name]['bytes']} bytes")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Worker boot time: importing the app and serving its first request.
+
+Each repetition runs in a fresh interpreter (a scratch SQLite database,
+initialised once up front with `flask init-db`) and measures the time to
+`import app`, to the first /api/health response through the test client,
+and which heavy optional modules (groq, docx, numpy, ...) were pulled in
+along the way - those should only load on first use. With --importtime
+the slowest modules from `python -X importtime` are listed too.
+
+Results go to benchmarks/results/startup_<commit>.json unless --json is
+given; pass an earlier file as --compare to print the change, and
+--max-ms to exit non-zero when the median import time exceeds a budget
+(a CI regression guard).
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--repeat 10] [--importtime] [--top 15]
+        [--max-ms 800] [--json out.json] [--compare old.json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from benchmarks.bench_load import _commit
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+# Modules that only some requests need; importing any of them at boot is a regression
+LAZY_MODULES = ('groq', 'docx', 'numpy', 'scipy', 'cloudinary', 'recommender', 'boto3')
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'modules': len(sys.modules),
+    'eager': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def _env(scratch):
+    return dict(
+        os.environ,
+        GROQ_API_KEY=os.getenv('GROQ_API_KEY', 'fake'),
+        DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+        PYTHONPATH=BACKEND_DIR,
+        PROMETHEUS_MULTIPROC_DIR='',
+    )
+
+
+def init_scratch(scratch):
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                   cwd=scratch, env=_env(scratch), check=True, capture_output=True)
+
+
+def probe(scratch):
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=scratch, env=_env(scratch),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(scratch, top):
+    """Slowest modules by cumulative import time, as [(module, ms), ...]"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=scratch,
+                            env=_env(scratch), capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # app itself and what it imports directly; deeper entries are already in those totals
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--importtime', action='store_true', help='also list the slowest imports')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-ms', type=float, help='fail if the median import time is above this')
+    parser.add_argument('--json', help='write results here (default: benchmarks/results/startup_<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        init_scratch(scratch)
+        probes = [probe(scratch) for _ in range(args.repeat)]
+        profile = import_profile(scratch, args.top) if args.importtime else None
+
+    summary = {'modules': probes[-1]['modules'], 'eager': probes[-1]['eager'],
+               'errors': sum(1 for p in probes if p['status'] != 200)}
+    for key in ('import_ms', 'first_request_ms'):
+        values = np.array([p[key] for p in probes])
+        summary[f'{key[:-3]}_p50_ms'] = round(float(np.percentile(values, 50)), 1)
+        summary[f'{key[:-3]}_min_ms'] = round(float(values.min()), 1)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['summary']
+    for key, value in summary.items():
+        line = f"{key:>22}: {value}"
+        if baseline and isinstance(value, (int, float)) and baseline.get(key):
+            line += f"  ({(value - baseline[key]) / baseline[key] * 100:+.1f}% vs baseline)"
+        print(line)
+    if profile:
+        print("\nSlowest imports (cumulative ms):")
+        for name, ms in profile:
+            print(f"{ms:>10.1f}  {name}")
+
+    results = {
+        'commit': _commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'config': {'repeat': args.repeat},
+        'summary': summary,
+        'imports': profile,
+    }
+    path = args.json or os.path.join(RESULTS_DIR, f"startup_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.max_ms and summary['import_p50_ms'] > args.max_ms:
+        sys.exit(f"Median import time {summary['import_p50_ms']} ms exceeds --max-ms {args.max_ms}")
+
+
+if __name__ == '__main__':
+    main()
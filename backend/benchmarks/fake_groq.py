@@ -0,0 +1,203 @@
+"""Local stand-in for the Groq API so the backend can be load-tested offline.
+
+Serves the three endpoints the backend calls - audio transcriptions, chat
+completions and streamed chat completions - with configurable latency
+and token rate. Grading prompts get a valid grading JSON back, every
+other prompt gets prose. Point the backend at it with GROQ_BASE_URL.
+
+Usage (from backend/):
+    python -m benchmarks.fake_groq [--port 8090] [--latency 0.8] [--tokens-per-second 250]
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=fake gunicorn app:app
+"""
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRADING_MARKER = 'EXACT JSON format'
+
+SAMPLE_WORDS = ("I believe this question matters because it shapes how young people learn and grow. "
+                "For example, many students in my school use technology every day, and however useful it is, "
+                "we should also think about its drawbacks for our health and our communities.").split()
+
+
+def grading_json(rng):
+    scores = {'content': round(rng.uniform(0.4, 0.9), 2), 'accuracy': round(rng.uniform(0.3, 0.6), 2),
+              'delivery': round(rng.uniform(0.2, 0.5), 2)}
+    scores['total'] = round(sum(scores.values()), 2)
+    feedback = {section: "- Strengths: " + ' '.join(rng.choices(SAMPLE_WORDS, k=60)) +
+                "\n- Suggestions: " + ' '.join(rng.choices(SAMPLE_WORDS, k=40))
+                for section in ('content', 'accuracy', 'delivery')}
+    return json.dumps({'scores': scores, 'feedback': feedback}, indent=2)
+
+
+def _tokens(text):
+    """Split text into roughly token-sized pieces that join back to the original"""
+    return re.findall(r'\s*\S+|\s+$', text)
+
+
+class FakeGroq:
+    """Threaded HTTP server speaking the subset of the Groq API the backend uses.
+
+    latency: seconds before a completion's first token.
+    transcription_latency: seconds per transcription request, plus
+        transcription_seconds_per_mb for each MB uploaded.
+    tokens_per_second: generation speed once a completion has started.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.8, tokens_per_second=250.0,
+                 transcription_latency=0.5, transcription_seconds_per_mb=0.1, seed=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.transcription_latency = transcription_latency
+        self.transcription_seconds_per_mb = transcription_seconds_per_mb
+        self.rng = random.Random(seed)
+        self.counts = {'transcriptions': 0, 'completions': 0, 'streams': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def _completion_text(self, prompt):
+        with self._lock:
+            if GRADING_MARKER in prompt:
+                return grading_json(self.rng)
+            return ' '.join(self.rng.choices(SAMPLE_WORDS, k=250))
+
+    def _transcript_text(self):
+        with self._lock:
+            return ' '.join(self.rng.choices(SAMPLE_WORDS, k=120))
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.endswith('/audio/transcriptions'):
+                    fake._count('transcriptions')
+                    time.sleep(fake.transcription_latency + fake.transcription_seconds_per_mb * len(body) / 2 ** 20)
+                    text = fake._transcript_text()
+                    payload = {'text': text, 'x_groq': {'id': uuid.uuid4().hex}}
+                    if b'verbose_json' in body:
+                        # ~150 words/minute with a short gap after every sentence-sized run
+                        payload['words'] = [{'word': word, 'start': round(i * 0.4 + i // 12 * 0.6, 2),
+                                             'end': round(i * 0.4 + i // 12 * 0.6 + 0.35, 2)}
+                                            for i, word in enumerate(text.split())]
+                    return self._send_json(payload)
+                if self.path.endswith('/chat/completions'):
+                    request = json.loads(body or b'{}')
+                    prompt = ' '.join(m.get('content', '') for m in request.get('messages', []))
+                    if request.get('stream'):
+                        return self._stream(request, prompt)
+                    return self._complete(request, prompt)
+                self._send_json({'error': {'message': f'Unknown path {self.path}'}}, 404)
+
+            def _usage(self, prompt, tokens):
+                return {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(tokens),
+                        'total_tokens': len(prompt) // 4 + len(tokens)}
+
+            def _complete(self, request, prompt):
+                fake._count('completions')
+                text = fake._completion_text(prompt)
+                tokens = _tokens(text)
+                time.sleep(fake.latency + len(tokens) / fake.tokens_per_second)
+                self._send_json({
+                    'id': f"chatcmpl-{uuid.uuid4().hex}", 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': request.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                                 'finish_reason': 'stop'}],
+                    'usage': self._usage(prompt, tokens),
+                })
+
+            def _stream(self, request, prompt):
+                fake._count('streams')
+                text = fake._completion_text(prompt)
+                tokens = _tokens(text)
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                def send(payload):
+                    data = f"data: {payload}\n\n".encode('utf-8')
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                def chunk(delta, finish_reason=None, **extra):
+                    return json.dumps({
+                        'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                        'model': request.get('model'),
+                        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}], **extra
+                    })
+
+                time.sleep(fake.latency)
+                # Tokens go out in small batches so sleep overhead doesn't cap the rate
+                batch = max(1, int(fake.tokens_per_second / 50))
+                for start in range(0, len(tokens), batch):
+                    send(chunk({'content': ''.join(tokens[start:start + batch])}))
+                    time.sleep(batch / fake.tokens_per_second)
+                send(chunk({}, 'stop', x_groq={'id': chunk_id, 'usage': self._usage(prompt, tokens)}))
+                send('[DONE]')
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.8, help='seconds to first completion token')
+    parser.add_argument('--tokens-per-second', type=float, default=250.0)
+    parser.add_argument('--transcription-latency', type=float, default=0.5)
+    parser.add_argument('--transcription-seconds-per-mb', type=float, default=0.1)
+    args = parser.parse_args()
+
+    fake = FakeGroq(args.host, args.port, args.latency, args.tokens_per_second,
+                    args.transcription_latency, args.transcription_seconds_per_mb)
+    print(f"Fake Groq API on {fake.base_url} (GROQ_BASE_URL={fake.base_url})")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
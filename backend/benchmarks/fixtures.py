@@ -0,0 +1,74 @@
+"""Synthetic audio fixtures for the benchmarks.
+
+Usage (from backend/), to generate the load-test set ahead of time:
+    python -m benchmarks.fixtures [--durations 30,60,120,300] [--formats mp3,wav,m4a,webm,ogg]
+"""
+import os
+import argparse
+import subprocess
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Codec arguments for every upload format /api/analyze accepts
+FORMAT_ARGS = {
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '128k'],
+    'wav': ['-c:a', 'pcm_s16le'],
+    'm4a': ['-c:a', 'aac', '-b:a', '128k'],
+    'webm': ['-c:a', 'libopus', '-b:a', '64k'],
+    'ogg': ['-c:a', 'libopus', '-b:a', '64k'],
+}
+
+# Answer lengths the load test covers, from a short answer to the 5 minute cap
+FIXTURE_DURATIONS = (30, 60, 120, 300)
+
+
+def synthetic_audio(seconds, fmt='mp3', sample_rate=44100, channels=2):
+    """Generate (or reuse) a speech-like test recording of the given length.
+
+    A tone modulated on and off every ~0.6 s with quiet gaps, mixed with
+    low noise - close enough to speech for decode/encode/silence benchmarks.
+    """
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    name = f"synthetic_{seconds}s"
+    if (sample_rate, channels) != (44100, 2):
+        name += f"_{sample_rate}hz_{channels}ch"
+    path = os.path.join(FIXTURE_DIR, f"{name}.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    source = (
+        f"aevalsrc='0.5*sin(2*PI*(180+40*sin(2*PI*0.3*t))*t)*gt(sin(2*PI*0.8*t),-0.3)"
+        f"+0.01*(random(0)-0.5)':s={sample_rate}:d={seconds}"
+    )
+    subprocess.run(
+        [FFMPEG_BINARY, '-nostdin', '-v', 'error', '-y', '-f', 'lavfi', '-i', source,
+         '-ac', str(channels), *FORMAT_ARGS[fmt], path],
+        check=True
+    )
+    return path
+
+
+def fixture_set(durations=FIXTURE_DURATIONS, formats=tuple(FORMAT_ARGS)):
+    """{(seconds, format): path} for every combination, as a phone/browser records them (mono 44.1 kHz).
+
+    Mono keeps a 5 minute WAV (~26 MB) under the 50 MB upload limit.
+    """
+    return {(seconds, fmt): synthetic_audio(seconds, fmt, channels=1)
+            for seconds in durations for fmt in formats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the load-test audio fixtures')
+    parser.add_argument('--durations', default=','.join(map(str, FIXTURE_DURATIONS)))
+    parser.add_argument('--formats', default=','.join(FORMAT_ARGS))
+    args = parser.parse_args()
+
+    fixtures = fixture_set([int(d) for d in args.durations.split(',')], args.formats.split(','))
+    for (seconds, fmt), path in sorted(fixtures.items()):
+        print(f"{seconds:>4}s {fmt:<5} {os.path.getsize(path) / 2 ** 20:6.1f} MB  {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+import os
+import json
+import shutil
+import hashlib
+import zipfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sqlalchemy import insert, update
+
+from database import db, Question, Sample
+from catalog import bump_catalog_version
+from audio import probe_duration
+from storage import store_sample_media
+
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 200))
+BULK_UPLOAD_WORKERS = int(os.getenv('BULK_UPLOAD_WORKERS', 4))
+
+QUESTION_FIELDS = ('topic', 'question', 'category')
+SAMPLE_FIELDS = ('filename', 'topic', 'question', 'speaker', 'score', 'duration', 'transcript', 'feedback')
+REQUIRED_FIELDS = {
+    'question': ('topic', 'question'),
+    'sample': ('topic', 'speaker', 'transcript', 'feedback'),
+}
+
+
+class BulkImportError(ValueError):
+    """The import file is malformed"""
+    pass
+
+
+def _normalized(text):
+    return ' '.join((text or '').split()).lower()
+
+
+def question_hash(topic, question):
+    """Questions differing only in spacing/case are the same question"""
+    return hashlib.sha256(f"{_normalized(topic)}\x00{_normalized(question)}".encode('utf-8')).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _read_jsonl(path, default_type, questions, samples):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BulkImportError(f"{os.path.basename(path)} line {line_number}: {e}")
+            kind = record.pop('type', default_type)
+            if kind not in REQUIRED_FIELDS:
+                raise BulkImportError(f"{os.path.basename(path)} line {line_number}: unknown type {kind!r}")
+            missing = [field for field in REQUIRED_FIELDS[kind] if not record.get(field)]
+            if kind == 'sample' and not (record.get('audio') or record.get('audio_url')):
+                missing.append('audio or audio_url')
+            if missing:
+                raise BulkImportError(f"{os.path.basename(path)} line {line_number}: missing {', '.join(missing)}")
+            record['_line'] = f"{os.path.basename(path)}:{line_number}"
+            (questions if kind == 'question' else samples).append(record)
+
+
+def load_import(path, work_dir):
+    """(questions, samples, base_dir) from a .jsonl file or a .zip bundle.
+
+    A JSONL file holds one record per line with "type": "question" or
+    "sample". A ZIP holds questions.jsonl and/or samples.jsonl plus the
+    audio files that sample records reference by relative "audio" path.
+    """
+    questions, samples = [], []
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as bundle:
+            bundle.extractall(work_dir)    # extractall drops absolute and '..' paths
+        for name, kind in (('questions.jsonl', 'question'), ('samples.jsonl', 'sample')):
+            if os.path.exists(os.path.join(work_dir, name)):
+                _read_jsonl(os.path.join(work_dir, name), kind, questions, samples)
+        return questions, samples, work_dir
+
+    _read_jsonl(path, None, questions, samples)
+    return questions, samples, os.path.dirname(os.path.abspath(path))
+
+
+class Checkpoint:
+    """Uploads finished by a previous run of the same import, so a rerun reuses them"""
+
+    def __init__(self, path):
+        self.path = path
+        self.uploaded = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.uploaded = json.load(f).get('uploaded', {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'uploaded': self.uploaded, 'saved_at': datetime.utcnow().isoformat()}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BulkImporter:
+    """Idempotent, resumable import of questions and samples.
+
+    Rows are upserted in batches keyed by content hash (normalized text for
+    questions, audio bytes for samples), so importing the same file twice
+    changes nothing. Audio uploads run on a bounded thread pool and each
+    finished upload is checkpointed per batch; an interrupted import
+    resumes by re-running it with the same file.
+    """
+
+    def __init__(self, storage, work_root, workers=BULK_UPLOAD_WORKERS, batch_size=BULK_BATCH_SIZE, status=None):
+        self.storage = storage
+        self.work_root = work_root
+        self.workers = workers
+        self.batch_size = batch_size
+        self.status = status if status is not None else {}
+
+    def run(self, path):
+        import_id = file_hash(path)[:16]
+        work_dir = os.path.join(self.work_root, import_id)
+        os.makedirs(work_dir, exist_ok=True)
+        questions, samples, base_dir = load_import(path, work_dir)
+        checkpoint = Checkpoint(os.path.join(work_dir, 'checkpoint.json'))
+
+        self.status.update(import_id=import_id, questions_total=len(questions), samples_total=len(samples),
+                           questions_inserted=0, questions_updated=0, samples_inserted=0,
+                           samples_updated=0, samples_uploaded=0, failed=[])
+        self.import_questions(questions)
+        self.import_samples(samples, base_dir, checkpoint)
+
+        if not self.status['failed']:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return self.status
+
+    def _backfill_question_hashes(self):
+        """Give rows created before content_hash existed a hash (first duplicate wins)"""
+        taken = {h for (h,) in db.session.query(Question.content_hash).filter(Question.content_hash.isnot(None))}
+        for question in Question.query.filter(Question.content_hash.is_(None)).order_by(Question.id):
+            h = question_hash(question.topic, question.question)
+            if h not in taken:
+                question.content_hash = h
+                taken.add(h)
+        db.session.commit()
+
+    def import_questions(self, records):
+        if not records:
+            return
+        self._backfill_question_hashes()
+        for batch in _chunks(records, self.batch_size):
+            by_hash = {question_hash(r['topic'], r['question']): r for r in batch}
+            existing = dict(db.session.query(Question.content_hash, Question.id)
+                            .filter(Question.content_hash.in_(list(by_hash))))
+            new_rows, updates = [], []
+            for h, record in by_hash.items():
+                fields = {field: record[field] for field in QUESTION_FIELDS if record.get(field) is not None}
+                fields.setdefault('category', 'General')
+                if h in existing:
+                    updates.append({'id': existing[h], 'category': fields['category']})
+                else:
+                    new_rows.append({**fields, 'content_hash': h, 'created_at': datetime.utcnow()})
+            if new_rows:
+                db.session.execute(insert(Question), new_rows)
+            if updates:
+                db.session.execute(update(Question), updates)
+            bump_catalog_version('questions')
+            db.session.commit()
+            self.status['questions_inserted'] += len(new_rows)
+            self.status['questions_updated'] += len(updates)
+
+    def _audio_path(self, record, base_dir):
+        root = os.path.realpath(base_dir)
+        path = os.path.realpath(os.path.join(root, record['audio']))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            raise BulkImportError(f"{record['_line']}: audio file not found: {record['audio']}")
+        return path
+
+    def _upload(self, record, path, content_hash):
+        """Runs on the pool: store the audio with its preview/peaks and probe its duration (header only)"""
+        media = store_sample_media(self.storage, path, f"sample_{content_hash[:16]}")
+        duration = record.get('duration') or int(probe_duration(path) or 0)
+        return media['audio_url'], duration, media['preview_url'], media['peaks']
+
+    def import_samples(self, records, base_dir, checkpoint):
+        if not records:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-upload') as pool:
+            for batch in _chunks(records, self.batch_size):
+                self._import_sample_batch(batch, base_dir, checkpoint, pool)
+
+    def _import_sample_batch(self, batch, base_dir, checkpoint, pool):
+        by_hash, paths = {}, {}
+        for record in batch:
+            try:
+                if record.get('audio'):
+                    path = self._audio_path(record, base_dir)
+                    h = file_hash(path)
+                    paths[h] = path
+                else:
+                    # Exported rows carry the hash of the audio already stored
+                    h = record.get('content_hash') or hashlib.sha256(record['audio_url'].encode('utf-8')).hexdigest()
+                by_hash[h] = record
+            except (BulkImportError, OSError) as e:
+                self.status['failed'].append({'record': record['_line'], 'error': str(e)})
+
+        existing = dict(db.session.query(Sample.content_hash, Sample.id)
+                        .filter(Sample.content_hash.in_(list(by_hash))))
+
+        # Upload audio for new samples that weren't uploaded by an earlier run
+        stored = {}
+        futures = {}
+        for h, record in by_hash.items():
+            if h in existing:
+                continue
+            if h in checkpoint.uploaded:
+                stored[h] = tuple(checkpoint.uploaded[h])
+            elif h in paths:
+                futures[pool.submit(self._upload, record, paths[h], h)] = h
+            else:
+                stored[h] = (record['audio_url'], record.get('duration') or 0,
+                             record.get('preview_url'), record.get('peaks'))
+        for future in as_completed(futures):
+            h = futures[future]
+            try:
+                stored[h] = checkpoint.uploaded[h] = future.result()
+                self.status['samples_uploaded'] += 1
+            except Exception as e:
+                self.status['failed'].append({'record': by_hash[h]['_line'], 'error': f"Upload failed: {e}"})
+        if futures:
+            checkpoint.save()
+
+        new_rows, updates = [], []
+        for h, record in by_hash.items():
+            fields = {field: record[field] for field in SAMPLE_FIELDS if record.get(field) is not None}
+            if h in existing:
+                fields.pop('duration', None)
+                updates.append({**fields, 'id': existing[h]})
+            elif h in stored:
+                # Checkpoints written before previews existed hold (url, duration)
+                audio_url, duration, preview_url, peaks = (tuple(stored[h]) + (None, None))[:4]
+                fields.setdefault('filename', os.path.basename(record.get('audio') or audio_url))
+                fields.setdefault('score', 2.0)
+                new_rows.append({**fields, 'duration': duration, 'audio_url': audio_url,
+                                 'preview_url': preview_url, 'peaks': peaks,
+                                 'content_hash': h, 'created_at': datetime.utcnow()})
+        if new_rows:
+            db.session.execute(insert(Sample), new_rows)
+        if updates:
+            db.session.execute(update(Sample), updates)
+        bump_catalog_version('samples')
+        db.session.commit()
+        self.status['samples_inserted'] += len(new_rows)
+        self.status['samples_updated'] += len(updates)
+
+
+def _question_record(question):
+    return {'type': 'question', 'topic': question.topic, 'question': question.question,
+            'category': question.category}
+
+
+def _sample_record(sample):
+    return {'type': 'sample', **{field: getattr(sample, field) for field in SAMPLE_FIELDS},
+            'audio_url': sample.audio_url, 'preview_url': sample.preview_url, 'peaks': sample.peaks,
+            'content_hash': sample.content_hash}
+
+
+def export_catalog(out_path, include=('questions', 'samples')):
+    """Write the catalog as JSONL (one file, typed records) or a ZIP of per-type JSONL.
+
+    Samples reference their stored audio by audio_url; importing the export
+    elsewhere reuses those URLs instead of uploading again.
+    """
+    sources = []
+    if 'questions' in include:
+        sources.append(('questions.jsonl', Question.query.order_by(Question.id), _question_record))
+    if 'samples' in include:
+        sources.append(('samples.jsonl', Sample.query.order_by(Sample.id), _sample_record))
+
+    counts = {}
+    if out_path.endswith('.zip'):
+        with zipfile.ZipFile(out_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for name, query, to_record in sources:
+                with bundle.open(name, 'w') as f:
+                    counts[name] = _write_records(f, query, to_record, binary=True)
+    else:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            for name, query, to_record in sources:
+                counts[name] = _write_records(f, query, to_record)
+    return counts
+
+
+def _write_records(f, query, to_record, binary=False):
+    count = 0
+    for row in query.yield_per(500):
+        line = json.dumps(to_record(row), ensure_ascii=False) + '\n'
+        f.write(line.encode('utf-8') if binary else line)
+        count += 1
+    return count
+
+
+import_status = {'running': False, 'started_at': None, 'finished_at': None, 'error': None}
+_import_lock = threading.Lock()
+
+
+def start_import(app, importer, path):
+    """Run importer on path in a background thread; False if an import is running.
+
+    The import file is removed when the run ends; the checkpoint stays
+    until every record has been imported.
+    """
+    with _import_lock:
+        if import_status['running']:
+            return False
+        import_status.clear()
+        import_status.update(running=True, started_at=datetime.utcnow().isoformat(),
+                             finished_at=None, error=None)
+    importer.status = import_status
+
+    def run():
+        try:
+            with app.app_context():
+                importer.run(path)
+            print(f"✅ Bulk import: {import_status.get('questions_inserted', 0)} questions and "
+                  f"{import_status.get('samples_inserted', 0)} samples added, "
+                  f"{len(import_status.get('failed', []))} failed")
+        except Exception as e:
+            import_status['error'] = str(e)
+            print(f"Bulk import error: {e}")
+        finally:
+            import_status['finished_at'] = datetime.utcnow().isoformat()
+            import_status['running'] = False
+            if os.path.exists(path):
+                os.remove(path)
+
+    threading.Thread(target=run, name="bulk-import", daemon=True).start()
+    return True
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+
+
+def content_hash(*parts):
+    """sha256 over the given bytes/str parts, unambiguous across boundaries"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed cache: in-process LRU in front of a shared SQLite file.
+
+    Entries live in namespaces ('transcript', 'grading', ...) and expire
+    after ttl_seconds in both tiers. The memory tier holds at most
+    max_entries items; the disk tier is shared by every worker on the node
+    and is trimmed of expired rows as new entries are written.
+    """
+
+    def __init__(self, path, max_entries=256, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = defaultdict(lambda: {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _remember(self, namespace, key, value, expires_at):
+        with self._lock:
+            self._memory[(namespace, key)] = (value, expires_at)
+            self._memory.move_to_end((namespace, key))
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end((namespace, key))
+                    self.counters[namespace]['memory_hits'] += 1
+                    return entry[0]
+                del self._memory[(namespace, key)]
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache_entries "
+                    "WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            row = None
+
+        if row is None:
+            with self._lock:
+                self.counters[namespace]['misses'] += 1
+            return None
+
+        value = json.loads(row[0])
+        self._remember(namespace, key, value, row[1])
+        with self._lock:
+            self.counters[namespace]['disk_hits'] += 1
+        return value
+
+    def set(self, namespace, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(namespace, key, value, expires_at)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), expires_at)
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = {namespace: dict(counts) for namespace, counts in self.counters.items()}
+            memory_entries = len(self._memory)
+        for counts in stats.values():
+            lookups = counts['memory_hits'] + counts['disk_hits'] + counts['misses']
+            counts['hit_rate'] = round((lookups - counts['misses']) / lookups, 3) if lookups else 0.0
+        return {'namespaces': stats, 'memory_entries': memory_entries}
@@ -0,0 +1,57 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from database import db, CatalogVersion
+
+
+def bump_catalog_version(name):
+    """Mark a catalog as changed; the caller's commit publishes the new version"""
+    now = datetime.utcnow()
+    updated = CatalogVersion.query.filter_by(name=name).update({
+        CatalogVersion.version: CatalogVersion.version + 1,
+        CatalogVersion.updated_at: now
+    })
+    if not updated:
+        db.session.add(CatalogVersion(name=name, version=1, updated_at=now))
+
+
+def catalog_version(name):
+    """(version, last modified as an aware UTC datetime or None) - one primary key lookup"""
+    # Column query rather than session.get, so the identity map can never
+    # hide another worker's bump
+    row = db.session.query(CatalogVersion.version, CatalogVersion.updated_at).filter_by(name=name).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+class CatalogCache:
+    """Serialized catalog responses kept in process memory.
+
+    Entries are tagged with the catalog version they were built from and
+    rebuilt when the database reports a newer one, so an admin write
+    through any worker or node invalidates every cache on the next request.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, key, version, build):
+        """JSON body for (name, key) at version, calling build() on a miss"""
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end((name, key))
+                return entry[1]
+
+        body = json.dumps(build()).encode('utf-8')
+        with self._lock:
+            self._entries[(name, key)] = (version, body)
+            self._entries.move_to_end((name, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -11,6 +12,8 @@ class Question(db.Model):
     question = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(200), default='General')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Identifies the question's text for idempotent bulk imports
+    content_hash = db.Column(db.String(64), unique=True, index=True)
     
     def to_dict(self):
         return {
@@ -34,7 +37,39 @@ class Sample(db.Model):
     transcript = db.Column(db.Text, nullable=False)
     feedback = db.Column(db.Text, nullable=False)
     audio_url = db.Column(db.String(1000))
+    # Low-bitrate Opus copy for library playback, and waveform peaks (0-100)
+    # for drawing; both derived from the audio at ingestion
+    preview_url = db.Column(db.String(1000))
+    peaks = db.Column(db.JSON(none_as_null=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # sha256 of the audio file, so re-imports and re-uploads are idempotent
+    content_hash = db.Column(db.String(64), unique=True, index=True)
+    # pending until the background uploader has stored the audio, then ready (or failed)
+    upload_status = db.Column(db.String(20), default='ready')
+    
+    # Supports the keyset-paginated library listing (newest first)
+    __table_args__ = (db.Index('ix_samples_created_at_id', 'created_at', 'id'),)
+    
+    # Columns the library list needs; transcript and feedback are only loaded
+    # by the detail endpoint
+    SUMMARY_COLUMNS = ('id', 'filename', 'topic', 'question', 'speaker', 'score',
+                       'duration', 'audio_url', 'preview_url', 'upload_status', 'created_at')
+    
+    def to_summary_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'topic': self.topic,
+            'question': self.question,
+            'speaker': self.speaker,
+            'score': self.score,
+            'duration': self.duration,
+            'audioUrl': self.audio_url,
+            'previewUrl': self.preview_url,
+            'tags': [self.topic, self.speaker, f"{self.score}/2.0"],
+            'upload_status': self.upload_status,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
     
     def to_dict(self):
         return {
@@ -48,5 +83,69 @@ class Sample(db.Model):
             'transcript': self.transcript,
             'feedback': self.feedback,
             'audioUrl': self.audio_url,
-            'tags': [self.topic, self.speaker, f"{self.score}/2.0"]
-        }
\ No newline at end of file
+            'previewUrl': self.preview_url,
+            'peaks': self.peaks,
+            'tags': [self.topic, self.speaker, f"{self.score}/2.0"],
+            'upload_status': self.upload_status
+        }
+
+class SampleResponse(db.Model):
+    __tablename__ = 'sample_responses'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), nullable=True)
+    topic_key = db.Column(db.String(64), nullable=False, index=True)
+    topic = db.Column(db.Text, nullable=False)
+    variant = db.Column(db.Integer, nullable=False, default=0)
+    text = db.Column(db.Text, nullable=False)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'question_id': self.question_id,
+            'topic': self.topic,
+            'variant': self.variant,
+            'text': self.text,
+            'prompt_version': self.prompt_version,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class AnalysisReport(db.Model):
+    __tablename__ = 'analysis_reports'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    topic = db.Column(db.Text, nullable=False)
+    transcript = db.Column(db.Text, nullable=False)
+    duration = db.Column(db.Float)
+    result = db.Column(db.Text, nullable=False)  # JSON: scores, feedback, sample_response
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_versions'
+    
+    # One row per catalog ('questions', 'samples'), bumped in the same
+    # transaction as every admin write so all workers see the change
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all() only creates missing tables, so deployments with existing
+    questions/samples tables get new nullable columns and indexes here.
+    """
+    inspector = inspect(db.engine)
+    for model in (Question, Sample):
+        table = model.__table__
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        db.session.commit()
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -0,0 +1,119 @@
+import os
+import re
+
+from audio import find_silences, SILENCE_FRAME_SECONDS
+
+# Pauses at least this long are listed individually
+LONG_PAUSE_SECONDS = float(os.getenv('LONG_PAUSE_SECONDS', 2.0))
+# Speaking rate is measured per window to see how steady it is
+RATE_WINDOW_SECONDS = 10.0
+# Share of the delivery score taken from the local measurements (0 = LLM only)
+FLUENCY_WEIGHT = float(os.getenv('FLUENCY_WEIGHT', 0.3))
+
+FILLER_WORDS = {'um', 'umm', 'uh', 'uhm', 'er', 'erm', 'ah', 'eh', 'hmm', 'mm'}
+FILLER_PHRASES = ('you know', 'i mean')
+
+
+def _tokens(text):
+    return re.findall(r"[a-z']+", text.lower())
+
+
+def count_fillers(text):
+    tokens = _tokens(text)
+    joined = ' ' + ' '.join(tokens) + ' '
+    return sum(1 for t in tokens if t in FILLER_WORDS) + sum(joined.count(f' {p} ') for p in FILLER_PHRASES)
+
+
+def analyze_fluency(audio, text, words=None):
+    """Delivery measurements for one recording, small enough to go in a prompt
+    (None when there is less than a second of speech).
+
+    Pauses come from the PCM (audio.find_silences); only the ones between
+    the first and last speech count. Speaking rate and its variation use
+    the word timestamps when the transcription has them, filler words the
+    transcript text.
+    """
+    import numpy as np
+
+    duration = audio.duration
+    silences = find_silences(audio)
+    speech_start, speech_end = 0.0, duration
+    if len(silences) and silences[0, 0] == 0:
+        speech_start = float(silences[0, 1])
+    if len(silences) and silences[-1, 1] > duration - SILENCE_FRAME_SECONDS:
+        speech_end = float(silences[-1, 0])
+    span = speech_end - speech_start
+    if span < 1:
+        return None    # no speech to measure
+    minutes = span / 60
+
+    inner = silences[(silences[:, 0] > 0) & (silences[:, 1] <= duration - SILENCE_FRAME_SECONDS)] \
+        if len(silences) else silences
+    lengths = inner[:, 1] - inner[:, 0] if len(inner) else np.empty(0)
+    long_pauses = inner[lengths >= LONG_PAUSE_SECONDS] if len(inner) else inner
+
+    word_count = len(words) if words else len(text.split())
+    rate_variation = None
+    if words:
+        starts = np.array([w['start'] for w in words])
+        edges = np.arange(speech_start, speech_end, RATE_WINDOW_SECONDS)
+        # Whole windows only; a short last window would skew the spread
+        if len(edges) > 2:
+            per_window = np.histogram(starts, bins=edges)[0]
+            if per_window.mean() > 0:
+                rate_variation = round(float(per_window.std() / per_window.mean()), 2)
+
+    fillers = count_fillers(' '.join(w['word'] for w in words) if words else text)
+    paused = float(lengths.sum())
+    return {
+        'speaking_seconds': round(span, 1),
+        'words_per_minute': round(word_count / minutes),
+        'articulation_rate': round(word_count / max(span - paused, 1e-6) * 60),
+        'rate_variation': rate_variation,
+        'phonation_ratio': round(1 - paused / span, 2),
+        'pauses': len(lengths),
+        'pauses_per_minute': round(len(lengths) / minutes, 1),
+        'mean_pause_seconds': round(float(lengths.mean()), 2) if len(lengths) else 0,
+        'longest_pause_seconds': round(float(lengths.max()), 2) if len(lengths) else 0,
+        'long_pauses': [[round(float(s), 1), round(float(e), 1)] for s, e in long_pauses],
+        'fillers': fillers,
+        'fillers_per_minute': round(fillers / minutes, 1),
+    }
+
+
+def fluency_score(fluency, max_score=0.5):
+    """Heuristic 0-max_score delivery score: full marks for a steady
+    110-170 wpm with few long pauses and fillers"""
+    wpm = fluency['words_per_minute']
+    penalty = min(max(110 - wpm, wpm - 170, 0) / 60 * 0.3, 0.3)
+    penalty += min(len(fluency['long_pauses']) / max(fluency['speaking_seconds'] / 60, 1) * 0.1, 0.3)
+    penalty += min(fluency['fillers_per_minute'] * 0.05, 0.2)
+    if fluency['rate_variation'] is not None:
+        penalty += min(max(fluency['rate_variation'] - 0.3, 0) * 0.5, 0.2)
+    return round(max_score * max(1 - penalty, 0), 2)
+
+
+def apply_fluency(scores, fluency):
+    """Blend the measured delivery score into the model's and re-add the total"""
+    if not fluency or not FLUENCY_WEIGHT:
+        return scores
+    try:
+        content, accuracy, delivery = (float(scores[key]) for key in ('content', 'accuracy', 'delivery'))
+    except (KeyError, TypeError, ValueError):
+        return scores    # malformed scores are reported by the output parser, not here
+    delivery = round((1 - FLUENCY_WEIGHT) * delivery + FLUENCY_WEIGHT * fluency_score(fluency), 2)
+    return {**scores, 'delivery': delivery, 'total': round(content + accuracy + delivery, 2)}
+
+
+def format_fluency(fluency):
+    """The measurements as prompt lines"""
+    variation = f"{fluency['rate_variation']:.0%}" if fluency['rate_variation'] is not None else 'n/a'
+    long_pauses = ', '.join(f"{s:.0f}-{e:.0f}s" for s, e in fluency['long_pauses'][:5]) or 'none'
+    return (
+        f"- Pace: {fluency['words_per_minute']} words/minute overall, {fluency['articulation_rate']} while speaking; "
+        f"variation between {RATE_WINDOW_SECONDS:.0f} s windows: {variation}\n"
+        f"- Pauses: {fluency['pauses']} ({fluency['pauses_per_minute']}/min), mean {fluency['mean_pause_seconds']} s, "
+        f"longest {fluency['longest_pause_seconds']} s; over {LONG_PAUSE_SECONDS:.0f} s at: {long_pauses}\n"
+        f"- Speaking time: {fluency['phonation_ratio']:.0%} of the answer\n"
+        f"- Filler words: {fluency['fillers']} ({fluency['fillers_per_minute']}/min)"
+    )
@@ -0,0 +1,38 @@
+import os
+import shutil
+
+# GUNICORN_WORKER_CLASS=gevent serves many requests per worker while they
+# wait on Groq. The stdlib must be patched before the app is imported,
+# which with --preload is in the master - so patch here, not in the worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+# Prometheus multiprocess mode: each worker writes its metrics to files in
+# this directory and /metrics adds them up. Set here so it is in the
+# environment before any worker imports prometheus_client.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join('uploads', 'metrics'))
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to the new totals
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # With --preload the app is imported once in the master; make sure no
+    # pooled database connection is shared with the forked workers
+    import sys
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        with app_module.app.app_context():
+            for engine in app_module.db.engines.values():
+                engine.dispose(close=False)
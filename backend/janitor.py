@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import threading
+
+
+class TempFileRegistry:
+    """Temp files this process created, with the time after which they may go"""
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def register(self, path, max_age=None):
+        with self._lock:
+            self._files[path] = time.time() + (max_age or self.max_age)
+        return path
+
+    def release(self, path):
+        """Delete a file now and stop tracking it"""
+        with self._lock:
+            self._files.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def expired(self):
+        now = time.time()
+        with self._lock:
+            paths = [path for path, expires_at in self._files.items() if expires_at <= now]
+            for path in paths:
+                del self._files[path]
+        return paths
+
+
+class Janitor:
+    """Background thread that removes expired temp files and runs periodic purges.
+
+    On start it sweeps the given folders once for files older than their
+    max age, which cleans up after a worker that crashed before releasing
+    its files. sweep_dirs are folders of per-request subdirectories (batch
+    uploads); there whole subdirectories older than their max age go. After
+    that only registered files are touched, so requests never pay for a
+    directory scan.
+    """
+
+    def __init__(self, registry, sweep_folders=(), interval=60, keep=(), sweep_dirs=()):
+        self.registry = registry
+        self.sweep_folders = sweep_folders    # [(folder, max_age_seconds)]
+        self.sweep_dirs = sweep_dirs          # [(folder, max_age_seconds)]
+        self.interval = interval
+        self.keep = set(keep)
+        self._tasks = []                      # [[interval, fn, next_run]]
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def every(self, interval, fn):
+        """Run fn roughly every `interval` seconds on the janitor thread"""
+        self._tasks.append([interval, fn, time.time() + interval])
+
+    def start(self):
+        """Start the thread once per process (safe to call on every request)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="janitor", daemon=True).start()
+
+    def sweep_on_startup(self):
+        now = time.time()
+        removed = 0
+        for folder, max_age in self.sweep_folders:
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name in self.keep or not entry.is_file():
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > max_age:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass    # another worker's sweep got there first
+        for folder, max_age in self.sweep_dirs:
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            print(f"🧹 Startup sweep removed {removed} stale temp files")
+
+    def run_once(self):
+        for path in self.registry.expired():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Cleanup error: {e}")
+
+        now = time.time()
+        for task in self._tasks:
+            if task[2] <= now:
+                task[2] = now + task[0]
+                try:
+                    task[1]()
+                except Exception as e:
+                    print(f"Janitor task error: {e}")
+
+    def _run(self):
+        try:
+            self.sweep_on_startup()
+        except Exception as e:
+            print(f"Cleanup error: {e}")
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import multiprocessing
+from datetime import datetime
+
+# Job lifecycle: queued -> running (stage updates) -> done | failed
+TERMINAL_STATUSES = ('done', 'failed')
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds max_depth pending jobs"""
+    def __init__(self, depth, retry_after):
+        super().__init__(f"Job queue is full ({depth} pending)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass    # alive, owned by another user
+    return True
+
+
+class JobQueue:
+    """Durable job queue stored in a local SQLite file.
+
+    Every gunicorn worker on the node opens the same file, so a job submitted
+    by one worker can be claimed and reported on by any other. Connections
+    are opened per call which keeps the queue safe across threads and forks.
+    max_running caps the jobs running at once across all of them, however
+    many worker pools are draining the queue.
+    """
+
+    def __init__(self, path, max_depth=20, retry_after=30, stale_after=900, max_running=None):
+        self.path = path
+        self.max_depth = max_depth
+        self.max_running = max_running
+        self.retry_after = retry_after
+        self.stale_after = stale_after
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner_pid INTEGER
+                )
+            """)
+            # Queue files created before jobs recorded the process running them
+            if 'owner_pid' not in [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def depth(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def submit(self, payload):
+        """Enqueue a job and return its id, or raise QueueFull"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if depth >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise QueueFull(depth, self.retry_after)
+            conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, created_at, updated_at) "
+                "VALUES (?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now)
+            )
+            conn.execute("COMMIT")
+        return job_id
+
+    def claim(self):
+        """Atomically move the oldest queued job to running and return it
+        (None when the queue is empty or max_running jobs are already running)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs left running by a crashed or recycled worker go back to the
+            # queue: at once when their process is gone, else once they stop
+            # reporting progress for stale_after seconds
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?",
+                (now, now - self.stale_after)
+            )
+            for (pid,) in conn.execute(
+                "SELECT DISTINCT owner_pid FROM jobs WHERE status = 'running' AND owner_pid IS NOT NULL"
+            ).fetchall():
+                if not _pid_alive(pid):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ? "
+                        "WHERE status = 'running' AND owner_pid = ?",
+                        (now, pid)
+                    )
+            if self.max_running and conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'running'"
+            ).fetchone()[0] >= self.max_running:
+                conn.execute("COMMIT")
+                return None
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'started', updated_at = ?, owner_pid = ? WHERE id = ?",
+                (now, os.getpid(), row['id'])
+            )
+            conn.execute("COMMIT")
+        return {'id': row['id'], 'payload': json.loads(row['payload'])}
+
+    def set_stage(self, job_id, stage):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?",
+                (stage, time.time(), job_id)
+            )
+
+    def finish(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', stage = 'done', result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (str(error), time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row['id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'created_at': datetime.fromtimestamp(row['created_at']).isoformat(),
+            'updated_at': datetime.fromtimestamp(row['updated_at']).isoformat(),
+        }
+        if row['status'] == 'queued':
+            with self._connect() as conn:
+                ahead = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                    (row['created_at'],)
+                ).fetchone()[0]
+            job['position'] = ahead + 1
+        if row['result'] is not None:
+            job['result'] = json.loads(row['result'])
+        if row['error'] is not None:
+            job['error'] = row['error']
+        return job
+
+    def purge(self, older_than_seconds=3600):
+        """Delete finished jobs older than the retention window"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - older_than_seconds,)
+            )
+
+
+def _run_worker(queue, handler, poll_interval, wakeup=None, stop=None):
+    while stop is None or not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            if wakeup is not None:
+                wakeup.wait(poll_interval)
+                wakeup.clear()
+            else:
+                time.sleep(poll_interval)
+            continue
+
+        try:
+            result = handler(job['payload'], lambda stage: queue.set_stage(job['id'], stage))
+            queue.finish(job['id'], result)
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            queue.fail(job['id'], e)
+
+
+class WorkerPool:
+    """Bounded pool of workers that drain a JobQueue.
+
+    mode='thread' runs workers inside the current process (cheap, shares
+    memory). mode='process' starts separate processes so CPU-bound decoding
+    does not contend for the GIL. They are spawned rather than forked: a
+    gunicorn worker has threads and pooled database connections that a
+    forked child would inherit. handler(payload, set_stage) must be a
+    module-level function so the child can import it.
+    """
+
+    def __init__(self, queue, handler, size=2, mode='thread', poll_interval=1.0):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown worker mode: {mode}")
+        self.queue = queue
+        self.handler = handler
+        self.size = size
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._workers = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start the workers once per process (safe to call on every request)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._workers = []
+            for i in range(self.size):
+                if self.mode == 'thread':
+                    worker = threading.Thread(
+                        target=_run_worker,
+                        args=(self.queue, self.handler, self.poll_interval, self._wakeup),
+                        name=f"job-worker-{i}",
+                        daemon=True
+                    )
+                else:
+                    worker = multiprocessing.get_context('spawn').Process(
+                        target=_run_worker,
+                        args=(self.queue, self.handler, self.poll_interval),
+                        name=f"job-worker-{i}",
+                        daemon=True
+                    )
+                worker.start()
+                self._workers.append(worker)
+            print(f"✅ Started {self.size} {self.mode} job workers")
+
+    def notify(self):
+        """Wake idle thread workers after a local submit"""
+        self._wakeup.set()
@@ -0,0 +1,326 @@
+import re
+import json
+
+
+class LLMOutputError(ValueError):
+    """The completion could not be turned into a valid result"""
+    pass
+
+
+# Typographic characters models like to emit, mapped in a single translate pass.
+# Curly double quotes are left alone here: inside a string they are content,
+# and only extract_json_object knows which side of a string it is on.
+_NORMALIZE_TABLE = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u2032': "'",
+    '\u2013': '-', '\u2014': '-', '\u2212': '-',
+    '\u00a0': ' ', '\u202f': ' ', '\u2009': ' ',
+    '\u200b': None, '\u200c': None, '\u200d': None, '\u200e': None, '\u200f': None,
+    '\u202a': None, '\u202b': None, '\u202c': None, '\u202d': None, '\u202e': None,
+    '\u2060': None, '\ufeff': None,
+    '\x00': None, '\x7f': None,
+})
+
+
+# str.translate falls off its fast path on any non-ASCII text and then looks up
+# every character; matching only the mapped characters first is ~10x faster
+_NORMALIZE_PATTERN = re.compile('[%s]+' % re.escape(''.join(map(chr, _NORMALIZE_TABLE))))
+
+
+def _translate_match(match):
+    return match.group().translate(_NORMALIZE_TABLE)
+
+
+def normalize_llm_text(text):
+    """Straighten apostrophes/dashes and drop invisible characters in one pass"""
+    return _NORMALIZE_PATTERN.sub(_translate_match, text)
+
+
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+# Runs of ordinary string content (including valid escapes) and of plain
+# structural text are consumed by one regex match each instead of being
+# walked a character at a time
+_STRING_BODY = re.compile(r'(?:[^\\"\x00-\x1f\u201d]+|\\.)*', re.S)
+_STRUCTURE_SPECIAL = re.compile(r'\s*(["{}\[\],\u201c\u201d])')
+
+
+def extract_json_object(text):
+    """Return the first balanced {...} in text, repaired so json.loads accepts it.
+
+    One left-to-right scan that tracks string/escape state and nesting, and
+    on the way: escapes raw newlines and control characters inside strings,
+    drops trailing commas before } or ], treats curly quotes around keys and
+    values as real quotes (but keeps them as text inside a string), and
+    closes any strings/containers left open by a truncated completion.
+    """
+    start = text.find('{')
+    if start == -1:
+        raise LLMOutputError("No JSON object in model output")
+
+    out = []
+    closers = []
+    pending_comma = False
+    pos = start
+    end = len(text)
+
+    while pos < end:
+        match = _STRUCTURE_SPECIAL.search(text, pos)
+        if match is None:
+            out.append(text[pos:])
+            break
+        if match.start() > pos:
+            literal = text[pos:match.start()].strip()
+            if literal:
+                if pending_comma:
+                    out.append(',')
+                    pending_comma = False
+                out.append(literal)
+        ch = match.group(1)
+        pos = match.end()
+
+        if ch in '}]':
+            pending_comma = False
+            if not closers or closers[-1] != ch:
+                raise LLMOutputError("Unbalanced brackets in model output")
+            closers.pop()
+            out.append(ch)
+            if not closers:
+                return ''.join(out)
+            continue
+
+        if pending_comma:
+            out.append(',')
+            pending_comma = False
+
+        if ch == ',':
+            # Held back until we know it is not a trailing comma
+            pending_comma = True
+        elif ch == '{':
+            closers.append('}')
+            out.append(ch)
+        elif ch == '[':
+            closers.append(']')
+            out.append(ch)
+        elif ch in '"\u201c\u201d':
+            # A string opened by a curly quote may also be closed by one
+            curly = ch != '"'
+            out.append('"')
+            while True:
+                body = _STRING_BODY.match(text, pos)
+                out.append(body.group())
+                pos = body.end()
+                if pos >= end or (text[pos] == '\\' and pos + 1 >= end):
+                    # Truncated inside a string: close it and the containers
+                    out.append('"')
+                    pos = end
+                    break
+                ch = text[pos]
+                pos += 1
+                if ch == '"':
+                    out.append('"')
+                    break
+                elif ch == '\u201d':
+                    if curly:
+                        out.append('"')
+                        break
+                    out.append(ch)
+                else:
+                    out.append(_ESCAPES.get(ch, f'\\u{ord(ch):04x}'))
+        else:
+            out.append(ch)
+
+    # Truncated completion: close whatever is still open
+    out.extend(reversed(closers))
+    return ''.join(out)
+
+
+def _check(value, spec, path):
+    if isinstance(spec, dict):
+        if not isinstance(value, dict):
+            raise LLMOutputError(f"{path or 'result'} should be an object")
+        checked = dict(value)
+        for key, child in spec.items():
+            if key not in value:
+                raise LLMOutputError(f"Missing field {path}{key}")
+            checked[key] = _check(value[key], child, f"{path}{key}.")
+        return checked
+
+    if spec is float:
+        # Models sometimes quote numbers ("0.85")
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        raise LLMOutputError(f"{path.rstrip('.')} should be a number")
+
+    if not isinstance(value, spec):
+        raise LLMOutputError(f"{path.rstrip('.')} should be {spec.__name__}")
+    return value
+
+
+def validate(result, schema):
+    """Check result against a nested {key: type | {...}} schema, coercing numbers"""
+    return _check(result, schema, '')
+
+
+_decoder = json.JSONDecoder()
+
+
+def parse_llm_json(text, schema=None):
+    """Normalize, extract, repair and (optionally) validate a JSON completion"""
+    text = normalize_llm_text(text)
+    start = text.find('{')
+    try:
+        # Well-formed output (the common case) is parsed by the C decoder in
+        # place; raw_decode stops at the end of the first object
+        result = _decoder.raw_decode(text, start)[0] if start != -1 else None
+    except json.JSONDecodeError:
+        result = None
+
+    if not isinstance(result, dict):
+        try:
+            result = json.loads(extract_json_object(text))
+        except json.JSONDecodeError as e:
+            raise LLMOutputError(f"Model returned invalid JSON: {e}")
+    return validate(result, schema) if schema else result
+
+
+def parse_llm_value(raw, spec):
+    """Repair and validate a single JSON value (e.g. one streamed section)"""
+    return parse_llm_json('{"value": %s}' % raw, {'value': spec})['value']
+
+
+class JSONStreamScanner:
+    """Incrementally scans a streamed JSON object and reports finished values.
+
+    feed() only looks at the newly received characters, so the whole
+    completion is scanned once no matter how many chunks it arrives in.
+    on_value(path, raw) is called with the key path (e.g. ('feedback',
+    'content')) and raw JSON text of every value nested up to max_depth
+    levels as soon as its closing character arrives. Text before the first
+    '{' (code fences, preamble) is skipped.
+    """
+
+    def __init__(self, on_value, max_depth=2):
+        self.on_value = on_value
+        self.max_depth = max_depth
+        self._text = ''
+        self._pos = 0
+        self._stack = []            # one frame per open object/array: current key + what comes next
+        self._value_start = None    # offset where the value currently being read began
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._key_start = None
+        self._primitive = False
+        self.finished = False
+
+    @property
+    def text(self):
+        return self._text
+
+    def _path(self):
+        return tuple(frame['key'] for frame in self._stack)
+
+    def _emit(self, end):
+        depth = len(self._stack)
+        if 1 <= depth <= self.max_depth:
+            self.on_value(self._path(), self._text[self._value_start:end])
+        self._value_start = None
+
+    def feed(self, chunk):
+        if self.finished or not chunk:
+            return
+        self._text += chunk
+        text = self._text
+
+        while self._pos < len(text):
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+
+            if not self._stack:
+                if ch == '{':
+                    self._stack.append({'key': None, 'expect': 'key'})
+                continue
+
+            frame = self._stack[-1]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        frame['key'] = json.loads(text[self._key_start:i + 1], strict=False)
+                        frame['expect'] = 'colon'
+                    else:
+                        self._emit(i + 1)
+                        frame['expect'] = 'comma'
+                continue
+
+            if self._primitive:
+                if ch in ',}]' or ch.isspace():
+                    self._primitive = False
+                    self._emit(i)
+                    frame['expect'] = 'comma'
+                else:
+                    continue
+
+            if ch.isspace():
+                continue
+
+            if frame['expect'] == 'key':
+                if ch == '"':
+                    self._in_string = True
+                    self._string_is_key = True
+                    self._key_start = i
+                elif ch == '}':
+                    self._close(i)
+            elif frame['expect'] == 'colon':
+                if ch == ':':
+                    frame['expect'] = 'value'
+            elif frame['expect'] == 'value':
+                if ch == ']' and frame.get('array'):
+                    self._close(i)
+                    continue
+                self._value_start = i
+                if ch == '"':
+                    self._in_string = True
+                    self._string_is_key = False
+                elif ch in '{[':
+                    frame['expect'] = 'nested'
+                    frame['nested_start'] = i
+                    if ch == '{':
+                        self._stack.append({'key': None, 'expect': 'key'})
+                    else:
+                        self._stack.append({'key': 0, 'expect': 'value', 'array': True})
+                else:
+                    self._primitive = True
+            elif frame['expect'] == 'comma':
+                if ch == ',':
+                    if frame.get('array'):
+                        frame['key'] += 1
+                        frame['expect'] = 'value'
+                    else:
+                        frame['expect'] = 'key'
+                elif ch in '}]':
+                    self._close(i)
+
+            if self.finished:
+                return
+
+    def _close(self, i):
+        self._stack.pop()
+        if not self._stack:
+            self.finished = True
+            return
+        parent = self._stack[-1]
+        self._value_start = parent.pop('nested_start')
+        self._emit(i + 1)
+        parent['expect'] = 'comma'
@@ -0,0 +1,101 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Under gunicorn every worker writes its samples to files in this directory
+# (see gunicorn.conf.py) and /metrics sums them; without it the metrics are
+# this process's own
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Stages range from a header probe (ms) to a long Whisper/LLM call (tens of s)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+STAGE_SECONDS = Histogram(
+    'necs_stage_duration_seconds', 'Time spent in each analysis stage', ['stage'], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter('necs_stage_errors_total', 'Stages that raised, by stage', ['stage'])
+UPSTREAM_TOKENS = Counter('necs_upstream_tokens_total', 'Tokens reported by the LLM API', ['model', 'kind'])
+UPSTREAM_BYTES = Counter('necs_upstream_bytes_total', 'Audio bytes uploaded for transcription', ['model'])
+UPLOAD_BYTES = Counter('necs_upload_bytes_total', 'Audio bytes received from clients', ['kind'])
+UPSTREAM_QUEUE_SECONDS = Histogram(
+    'necs_upstream_queue_seconds', 'Time waiting for a free upstream slot', ['model'], buckets=STAGE_BUCKETS
+)
+UPSTREAM_REJECTED = Counter('necs_upstream_rejected_total', 'Calls that gave up waiting for a slot', ['model'])
+UPSTREAM_IN_FLIGHT = Gauge(
+    'necs_upstream_in_flight', 'Upstream calls holding a slot', ['model'], multiprocess_mode='livesum'
+)
+TIME_TO_FIRST_SCORE = Histogram(
+    'necs_time_to_first_score_seconds', 'Streamed analysis: upload received to scores sent', buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'necs_http_request_duration_seconds', 'Time to produce a response (headers, for streams)',
+    ['method', 'endpoint', 'status'], buckets=STAGE_BUCKETS
+)
+
+
+@contextmanager
+def timed(stage):
+    """Observe the block's duration under stage, count it as an error if it raises.
+
+    Inside a request the timing is also added to that response's
+    Server-Timing header.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if has_request_context():
+            g.setdefault('server_timing', []).append((stage, elapsed))
+
+
+def record_tokens(model, usage):
+    """Count prompt/completion tokens from an OpenAI-style usage object (None is ignored)"""
+    if usage is None:
+        return
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f'{kind}_tokens', None)
+        if tokens:
+            UPSTREAM_TOKENS.labels(model, kind).inc(tokens)
+
+
+def init_app(app):
+    """Time every request and send the stages it ran as a Server-Timing header"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def add_server_timing(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(elapsed)
+
+        timings = g.pop('server_timing', [])
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings]
+        entries.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+def render():
+    """(body, content type) of every metric in Prometheus text format"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
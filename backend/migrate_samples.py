@@ -1,71 +1,36 @@
+"""Import the legacy uploads/samples library (metadata.json + audio files).
+
+Safe to rerun: samples are keyed by the hash of their audio, so ones that
+are already in the database are skipped, and uploads finished by an
+interrupted run are reused from the checkpoint.
+"""
 import os
 import json
-import cloudinary
-import cloudinary.uploader
-from dotenv import load_dotenv
-import psycopg2
-
-load_dotenv()
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
+from app import app, audio_storage, clean_metadata_file, init_db, IMPORT_FOLDER
+from bulk import BulkImporter, Checkpoint
 
-# Connect to database
-DATABASE_URL = os.getenv('DATABASE_URL')
-if DATABASE_URL.startswith('postgres://'):
-    DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+SAMPLES_DIR = 'uploads/samples'
 
-conn = psycopg2.connect(DATABASE_URL)
-cur = conn.cursor()
-
-# Read existing samples metadata
-metadata_file = 'uploads/samples/metadata.json'
-with open(metadata_file, 'r', encoding='utf-8') as f:
+clean_metadata_file()
+with open(os.path.join(SAMPLES_DIR, 'metadata.json'), 'r', encoding='utf-8') as f:
     samples = json.load(f)
 
-# Upload each sample
-for sample in samples:
-    filename = sample['filename']
-    filepath = f"uploads/samples/{filename}"
-    
-    if not os.path.exists(filepath):
-        print(f"❌ File not found: {filename}")
-        continue
-    
-    print(f"Uploading {filename}...")
-    
-    # Upload to Cloudinary
-    result = cloudinary.uploader.upload(
-        filepath,
-        resource_type="video",
-        folder="necs_samples",
-        public_id=f"sample_{sample['id']}"
-    )
-    
-    # Insert into database
-    cur.execute("""
-        INSERT INTO samples (filename, topic, question, speaker, score, duration, transcript, feedback, audio_url)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (
-        sample['filename'],
-        sample['topic'],
-        sample.get('question', ''),
-        sample['speaker'],
-        sample['score'],
-        sample.get('duration', 0),
-        sample['transcript'],
-        sample['feedback'],
-        result['secure_url']
-    ))
-    
-    print(f"✅ Uploaded: {result['secure_url']}")
+records = [
+    {**sample, 'audio': sample['filename'], '_line': f"metadata.json #{sample.get('id', i)}"}
+    for i, sample in enumerate(samples)
+]
+
+with app.app_context():
+    init_db()
+    importer = BulkImporter(audio_storage, IMPORT_FOLDER)
+    importer.status.update(samples_inserted=0, samples_updated=0, samples_uploaded=0, failed=[])
+    checkpoint = Checkpoint(os.path.join(IMPORT_FOLDER, 'legacy-samples', 'checkpoint.json'))
+    importer.import_samples(records, SAMPLES_DIR, checkpoint)
 
-conn.commit()
-cur.close()
-conn.close()
+status = importer.status
+for failure in status['failed']:
+    print(f"❌ {failure['record']}: {failure['error']}")
 
-print(f"\n✅ Migrated {len(samples)} samples!")
\ No newline at end of file
+print(f"\n✅ Migrated {status['samples_inserted']} new samples "
+      f"({status['samples_updated']} already present, {len(status['failed'])} failed)")
@@ -0,0 +1,85 @@
+import math
+import time
+import random
+import threading
+
+from database import db, Question
+
+
+class QuestionSampler:
+    """Random question picks from a cached id index instead of loading the bank.
+
+    The index holds only (id, category) pairs and is rebuilt when sync()
+    sees a new catalog version (bumped by the admin question routes) or once
+    it is older than ttl_seconds. A pick is then a list lookup plus one
+    primary-key fetch.
+
+    For no-repeat mode the caller keeps a small deck state (e.g. in the
+    session). The deck walks the category's ids in the order
+    (a * position + b) mod n with a coprime to n, which visits every
+    question once per round without storing a shuffled list.
+    """
+
+    def __init__(self, ttl_seconds=60):
+        self.ttl_seconds = ttl_seconds
+        self._index = None
+        self._built_at = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._index = None
+
+    def sync(self, version):
+        """Drop the index if the questions catalog changed since it was built"""
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def _ids(self, category=None):
+        index = self._index
+        if index is None or time.time() - self._built_at > self.ttl_seconds:
+            with self._lock:
+                index = self._index
+                if index is None or time.time() - self._built_at > self.ttl_seconds:
+                    index = {None: []}
+                    rows = db.session.query(Question.id, Question.category).order_by(Question.id)
+                    for question_id, question_category in rows:
+                        index[None].append(question_id)
+                        index.setdefault(question_category, []).append(question_id)
+                    self._index = index
+                    self._built_at = time.time()
+        return index.get(category, [])
+
+    def _new_deck(self, ids):
+        n = len(ids)
+        a = random.randrange(1, n) if n > 1 else 1
+        while math.gcd(a, n) != 1:
+            a = random.randrange(1, n)
+        # size and last id identify the index the deck was dealt from, the
+        # same on every worker
+        return {'size': n, 'last_id': ids[-1], 'a': a, 'b': random.randrange(n), 'pos': 0}
+
+    def _next_from_deck(self, ids, deck):
+        if not deck or deck.get('size') != len(ids) or deck.get('last_id') != ids[-1] or deck['pos'] >= len(ids):
+            deck = self._new_deck(ids)
+        question_id = ids[(deck['a'] * deck['pos'] + deck['b']) % deck['size']]
+        deck = dict(deck, pos=deck['pos'] + 1)
+        return question_id, deck
+
+    def pick(self, category=None, deck=None, no_repeat=False):
+        """Return (question or None, deck) - deck is only used when no_repeat"""
+        for attempt in range(2):
+            ids = self._ids(category)
+            if not ids:
+                return None, deck
+            if no_repeat:
+                question_id, deck = self._next_from_deck(ids, deck)
+            else:
+                question_id = random.choice(ids)
+            question = db.session.get(Question, question_id)
+            if question is not None:
+                return question, deck
+            # Deleted through another worker since the index was built
+            self.invalidate()
+        return None, deck
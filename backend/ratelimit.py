@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+import threading
+
+
+class MemoryBackend:
+    """Token buckets in a dict - per process, so only for single-worker setups.
+
+    Each key costs one small list regardless of traffic, and a background
+    thread drops keys whose bucket has refilled (an idle key is
+    indistinguishable from a new one).
+    """
+
+    def __init__(self, sweep_interval=60):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._sweeper = None
+
+    def _start_sweeper(self):
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="ratelimit-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self._sweep_interval)
+            self.sweep()
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            idle = [key for key, bucket in self._buckets.items() if bucket[2] <= now]
+            for key in idle:
+                del self._buckets[key]
+
+    def hit(self, key, capacity, rate):
+        now = time.time()
+        with self._lock:
+            self._start_sweeper()
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            if tokens < 1:
+                return False, (1 - tokens) / rate
+            tokens -= 1
+            # [tokens, last update, time at which the bucket is full again]
+            self._buckets[key] = [tokens, now, now + (capacity - tokens) / rate]
+            return True, 0
+
+
+class SQLiteBackend:
+    """Token buckets in a WAL-mode SQLite file shared by every worker on the node.
+
+    A hit is a single UPSERT ... RETURNING statement, so the read-refill-
+    consume cycle is atomic across processes without an explicit lock.
+    Rows whose bucket has refilled are deleted periodically.
+    """
+
+    def __init__(self, path, sweep_every=1000):
+        self.path = path
+        self._local = threading.local()
+        self._sweep_every = sweep_every
+        self._hits = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                full_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_full_at ON buckets (full_at)")
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def sweep(self):
+        self._connection().execute("DELETE FROM buckets WHERE full_at <= ?", (time.time(),))
+
+    def hit(self, key, capacity, rate):
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute("""
+            INSERT INTO buckets (key, tokens, updated_at, full_at)
+            VALUES (:key, :capacity - 1, :now, :now + 1.0 / :rate)
+            ON CONFLICT (key) DO UPDATE SET
+                tokens = min(:capacity, tokens + (:now - updated_at) * :rate) - 1,
+                updated_at = :now,
+                full_at = :now + (:capacity - (min(:capacity, tokens + (:now - updated_at) * :rate) - 1)) / :rate
+            WHERE min(:capacity, tokens + (:now - updated_at) * :rate) >= 1
+            RETURNING tokens
+        """, {'key': key, 'capacity': capacity, 'now': now, 'rate': rate}).fetchone()
+
+        self._hits += 1
+        if self._hits % self._sweep_every == 0:
+            self.sweep()
+
+        if row is not None:
+            return True, 0
+
+        current = conn.execute(
+            "SELECT min(?, tokens + (? - updated_at) * ?) FROM buckets WHERE key = ?",
+            (capacity, now, rate, key)
+        ).fetchone()
+        tokens = current[0] if current else 0
+        return False, (1 - tokens) / rate
+
+
+class RateLimiter:
+    """Token-bucket limiter: max_requests per window_seconds, refilled smoothly"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key, max_requests, window_seconds):
+        """Consume one token for key; returns (allowed, retry_after_seconds)"""
+        return self.backend.hit(key, float(max_requests), max_requests / float(window_seconds))
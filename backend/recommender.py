@@ -0,0 +1,129 @@
+import re
+import zlib
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from database import db, Sample
+
+# Terms are hashed into a fixed-width space so documents can be added and
+# removed without maintaining a vocabulary
+N_FEATURES = 2 ** 18
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOP_WORDS = frozenset("""
+a an and are as at be because been but by can could do does for from had has have he her his
+i if in into is it its me my not of on or our she so that the their them there these they this
+to was we were what when which who will with would you your um uh like just really very also
+""".split())
+
+
+def _tokens(text):
+    return [t for t in TOKEN_PATTERN.findall((text or '').lower()) if t not in STOP_WORDS and len(t) > 1]
+
+
+def _term_counts(topic, transcript, topic_weight):
+    """(feature indices, counts) for one document; topic terms count topic_weight times"""
+    features = [zlib.crc32(t.encode('utf-8')) % N_FEATURES for t in _tokens(transcript)]
+    features += [zlib.crc32(t.encode('utf-8')) % N_FEATURES for t in _tokens(topic)] * topic_weight
+    if not features:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    indices, counts = np.unique(np.asarray(features, dtype=np.int32), return_counts=True)
+    return indices, counts.astype(np.float32)
+
+
+class RelatedSamples:
+    """TF-IDF / cosine index over sample topics and transcripts.
+
+    Each sample's term counts are computed once and kept; sync() compares a
+    digest per row against the database when the samples catalog version
+    changes and re-tokenizes only rows that were added or edited. The
+    weighted, normalized sparse matrix is reassembled from the kept counts
+    on the next query (a few ms for thousands of samples), so a query is a
+    single sparse matrix-vector product.
+    """
+
+    def __init__(self, min_score=1.5, topic_weight=3):
+        self.min_score = min_score
+        self.topic_weight = topic_weight
+        self._docs = {}        # id -> (digest, score, indices, counts)
+        self._version = None
+        self._snapshot = None  # (ids, scores, matrix, idf)
+        self._lock = threading.Lock()
+
+    def update(self, sample_id, topic, transcript, score):
+        digest = zlib.crc32(f"{topic}\x00{transcript}".encode('utf-8'))
+        doc = self._docs.get(sample_id)
+        if doc is not None and doc[0] == digest:
+            if doc[1] != score:
+                self._docs[sample_id] = (digest, score, doc[2], doc[3])
+                self._snapshot = None
+            return
+        self._docs[sample_id] = (digest, score) + _term_counts(topic, transcript, self.topic_weight)
+        self._snapshot = None
+
+    def remove(self, sample_id):
+        if self._docs.pop(sample_id, None) is not None:
+            self._snapshot = None
+
+    def sync(self, version):
+        """Bring the index up to date with the database if the catalog changed"""
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            rows = db.session.query(Sample.id, Sample.topic, Sample.transcript, Sample.score).all()
+            for sample_id, topic, transcript, score in rows:
+                self.update(sample_id, topic, transcript, score)
+            for sample_id in set(self._docs) - {row[0] for row in rows}:
+                self.remove(sample_id)
+            self._version = version
+
+    def _build(self):
+        ids = np.fromiter(self._docs.keys(), dtype=np.int64, count=len(self._docs))
+        docs = list(self._docs.values())
+        scores = np.array([doc[1] or 0 for doc in docs], dtype=np.float32)
+
+        indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(doc[2]) for doc in docs])
+        indices = np.concatenate([doc[2] for doc in docs]) if docs else np.zeros(0, dtype=np.int32)
+        counts = np.concatenate([doc[3] for doc in docs]) if docs else np.zeros(0, dtype=np.float32)
+
+        # Smoothed idf and sublinear tf, as in scikit-learn's TfidfVectorizer
+        df = np.bincount(indices, minlength=N_FEATURES)
+        idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+        data = (1 + np.log(counts)) * idf[indices]
+
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(docs), N_FEATURES))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix = sparse.diags(1 / norms) @ matrix
+        return ids, scores, matrix.tocsr(), idf
+
+    def query(self, topic, transcript, limit=5, exclude=()):
+        """[(sample_id, similarity)] of the most similar high-scoring samples"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot = self._snapshot or self._build()
+        ids, scores, matrix, idf = snapshot
+        if not len(ids):
+            return []
+
+        indices, counts = _term_counts(topic, transcript, self.topic_weight)
+        if not len(indices):
+            return []
+        weights = (1 + np.log(counts)) * idf[indices]
+        weights /= np.linalg.norm(weights) or 1
+
+        query = sparse.csr_matrix((weights, indices, [0, len(indices)]), shape=(1, N_FEATURES))
+        similarity = (matrix @ query.T).toarray().ravel()
+        similarity[scores < self.min_score] = 0
+        if exclude:
+            similarity[np.isin(ids, list(exclude))] = 0
+
+        limit = min(limit, len(ids))
+        top = np.argpartition(-similarity, limit - 1)[:limit]
+        top = top[np.argsort(-similarity[top])]
+        return [(int(ids[i]), float(similarity[i])) for i in top if similarity[i] > 0]
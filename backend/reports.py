@@ -0,0 +1,256 @@
+import os
+import io
+import re
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+
+from database import db, AnalysisReport
+
+REPORT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+_template_bytes = None
+_template_lock = threading.Lock()
+
+
+def _build_template():
+    """The fixed part of every report: title, header lines and the styled score table"""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+
+    title = doc.add_heading('necs. - Speech Feedback Report', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph("Date: ")
+    doc.add_paragraph("Topic: ")
+    doc.add_paragraph()
+
+    doc.add_heading('Score Summary', 1)
+
+    table = doc.add_table(rows=5, cols=2)
+    table.style = 'Light Grid Accent 1'
+
+    for i, criterion in enumerate(['Content', 'Accuracy', 'Delivery', '', 'TOTAL SCORE']):
+        for cell, text in zip(table.rows[i].cells, (criterion, '')):
+            run = cell.paragraphs[0].add_run(text)
+            if i == 4:
+                run.bold = True
+
+    doc.add_paragraph()
+    doc.add_heading('Detailed Feedback', 1)
+
+    stream = io.BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+def _template():
+    global _template_bytes
+    if _template_bytes is None:
+        with _template_lock:
+            if _template_bytes is None:
+                _template_bytes = _build_template()
+    return _template_bytes
+
+
+def generate_docx(topic, transcript, grading_result, created_at=None):
+    """Fill a copy of the pre-styled template instead of building from scratch"""
+    # python-docx is only needed once someone downloads a report
+    from docx import Document
+
+    doc = Document(io.BytesIO(_template()))
+    created_at = created_at or datetime.now()
+
+    paragraphs = doc.paragraphs
+    paragraphs[1].add_run(created_at.strftime('%B %d, %Y'))
+    paragraphs[2].add_run(topic)
+
+    scores = grading_result['scores']
+    values = [
+        f"{scores['content']}/0.9",
+        f"{scores['accuracy']}/0.6",
+        f"{scores['delivery']}/0.5",
+        '',
+        f"{scores['total']}/2.0"
+    ]
+    table = doc.tables[0]
+    for i, value in enumerate(values):
+        table.rows[i].cells[1].paragraphs[0].runs[0].text = value
+
+    feedback = grading_result['feedback']
+
+    doc.add_heading('1. Content', 2)
+    doc.add_paragraph(feedback['content'])
+
+    doc.add_heading('2. Accuracy', 2)
+    doc.add_paragraph(feedback['accuracy'])
+
+    doc.add_heading('3. Delivery', 2)
+    doc.add_paragraph(feedback['delivery'])
+
+    doc.add_page_break()
+
+    doc.add_heading('Your Speech Transcript', 1)
+    doc.add_paragraph(transcript)
+
+    doc.add_page_break()
+
+    doc.add_heading('Sample 2.0/2.0 Response', 1)
+    doc.add_paragraph(grading_result['sample_response'])
+
+    file_stream = io.BytesIO()
+    doc.save(file_stream)
+    file_stream.seek(0)
+
+    return file_stream
+
+
+def generate_class_docx(summary, created_at=None):
+    """The class summary from a batch analysis: averages, score bands and a roster"""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+    title = doc.add_heading('necs. - Class Summary Report', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Date: {(created_at or datetime.now()).strftime('%B %d, %Y')}")
+    doc.add_paragraph(f"Recordings: {summary['analyzed']} analyzed, {len(summary['failed'])} failed")
+
+    doc.add_heading('Class Averages', 1)
+    table = doc.add_table(rows=1, cols=4)
+    table.style = 'Light Grid Accent 1'
+    for cell, text in zip(table.rows[0].cells, ('Criterion', 'Average', 'Lowest', 'Highest')):
+        cell.text = text
+    for criterion, maximum in (('content', 0.9), ('accuracy', 0.6), ('delivery', 0.5), ('total', 2.0)):
+        stats = summary['scores'][criterion]
+        if stats:
+            row = table.add_row().cells
+            row[0].text = f"{criterion.title()} (/{maximum})"
+            row[1].text, row[2].text, row[3].text = str(stats['mean']), str(stats['min']), str(stats['max'])
+
+    doc.add_heading('Score Distribution', 1)
+    for band, count in summary['score_bands'].items():
+        doc.add_paragraph(f"{band}: {count}", style='List Bullet')
+
+    fluency = summary['fluency']
+    if any(fluency.values()):
+        doc.add_heading('Delivery', 1)
+        for metric, label in (('words_per_minute', 'Words per minute'), ('pauses_per_minute', 'Pauses per minute'),
+                              ('fillers_per_minute', 'Filler words per minute')):
+            if fluency[metric]:
+                doc.add_paragraph(f"{label}: {fluency[metric]['mean']} on average "
+                                  f"({fluency[metric]['min']}-{fluency[metric]['max']})", style='List Bullet')
+
+    doc.add_heading('Students', 1)
+    table = doc.add_table(rows=1, cols=6)
+    table.style = 'Light Grid Accent 1'
+    for cell, text in zip(table.rows[0].cells, ('Student', 'Topic', 'Content', 'Accuracy', 'Delivery', 'Total')):
+        cell.text = text
+    for entry in summary['roster']:
+        row = table.add_row().cells
+        values = (entry['student'], entry['topic'], entry['content'], entry['accuracy'], entry['delivery'], entry['total'])
+        for cell, value in zip(row, values):
+            cell.text = str(value)
+
+    if summary['failed']:
+        doc.add_heading('Not Analyzed', 1)
+        for failure in summary['failed']:
+            doc.add_paragraph(f"{failure['student']} ({failure['filename']}): {failure['error']}", style='List Bullet')
+
+    file_stream = io.BytesIO()
+    doc.save(file_stream)
+    file_stream.seek(0)
+    return file_stream
+
+
+class ReportStore:
+    """Analysis results stored by id, rendered to .docx only when downloaded.
+
+    Rows live in the main database so any worker can serve a download. The
+    rendered document is cached on local disk for ttl_seconds; rows and
+    files older than that are removed by purge(), which the app schedules
+    on its janitor thread.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def save(self, topic, transcript_data, grading_result):
+        report = AnalysisReport(
+            id=uuid.uuid4().hex,
+            topic=topic,
+            transcript=transcript_data["text"],
+            duration=transcript_data["duration"],
+            result=json.dumps({
+                "scores": grading_result["scores"],
+                "feedback": grading_result["feedback"],
+                "sample_response": grading_result["sample_response"]
+            })
+        )
+        db.session.add(report)
+        db.session.commit()
+        return report.id
+
+    def save_class_summary(self, summary):
+        """Store a batch's class summary; it downloads like any other report"""
+        report = AnalysisReport(
+            id=uuid.uuid4().hex,
+            topic='Class summary',
+            transcript='',
+            duration=0,
+            result=json.dumps({"class_summary": summary})
+        )
+        db.session.add(report)
+        db.session.commit()
+        return report.id
+
+    def get(self, report_id):
+        if not REPORT_ID_PATTERN.match(report_id):
+            return None
+        report = db.session.get(AnalysisReport, report_id)
+        if report is None or report.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+            return None
+        return report
+
+    def docx_path(self, report):
+        """Path of the rendered document, building it on first request"""
+        path = os.path.join(self.cache_dir, f"{report.id}.docx")
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl_seconds:
+            return path
+
+        result = json.loads(report.result)
+        if 'class_summary' in result:
+            doc_stream = generate_class_docx(result['class_summary'], report.created_at)
+        else:
+            doc_stream = generate_docx(report.topic, report.transcript, result, report.created_at)
+
+        # Write then rename so concurrent downloads never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(doc_stream.getvalue())
+        os.replace(tmp_path, path)
+        return path
+
+    def purge(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        try:
+            AnalysisReport.query.filter(AnalysisReport.created_at < cutoff).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Report purge error: {e}")
+
+        now = time.time()
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,134 @@
+import os
+import random
+import hashlib
+import threading
+from datetime import datetime
+
+from database import db, Question, SampleResponse
+from metrics import record_tokens
+
+# Bump whenever the prompt below changes so stale samples are regenerated
+SAMPLE_PROMPT_VERSION = '1'
+SAMPLE_RESPONSE_VARIANTS = int(os.getenv('SAMPLE_RESPONSE_VARIANTS', 3))
+SAMPLE_RESPONSE_MODEL = "llama-3.3-70b-versatile"
+
+
+def topic_key(topic):
+    """Questions typed with different spacing/case share the same samples"""
+    normalized = ' '.join(topic.split()).lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def build_sample_prompt(topic):
+    return f"""You are an expert English speaking examiner. Write a comprehensive sample 2.0/2.0 response to the following NEC Speaking question that would take approximately 5 minutes to speak (around 600-750 words).
+
+**Topic/Question:** {topic}
+
+The sample should:
+- Start with "My question is... (if question number is provided), and the prompt is... Here is my response." and then answer the question fully
+- End with "This is the end of my speech. Thank you."
+- Be detailed and well-structured with clear introduction, body paragraphs, and conclusion
+- Include specific examples, explanations, and supporting details
+- Demonstrate sophisticated vocabulary and varied sentence structures
+- Show natural flow with appropriate transitions
+- Be comprehensive enough to fill a 5-minute speaking time
+- Be creative in the introduction to hook the listener's attention
+
+Return only the speech text, with no title, notes or formatting."""
+
+
+def generate_sample_response(client, topic):
+    response = client.chat.completions.create(
+        model=SAMPLE_RESPONSE_MODEL,
+        messages=[{"role": "user", "content": build_sample_prompt(topic)}],
+        temperature=0.7
+    )
+    record_tokens(SAMPLE_RESPONSE_MODEL, response.usage)
+    return response.choices[0].message.content.strip()
+
+
+def _store(topic, text, question_id=None):
+    key = topic_key(topic)
+    variant = SampleResponse.query.filter_by(
+        topic_key=key, prompt_version=SAMPLE_PROMPT_VERSION
+    ).count()
+    sample = SampleResponse(
+        question_id=question_id,
+        topic_key=key,
+        topic=topic,
+        variant=variant,
+        text=text,
+        prompt_version=SAMPLE_PROMPT_VERSION
+    )
+    db.session.add(sample)
+    db.session.commit()
+    return sample
+
+
+def get_sample_response(client, topic):
+    """Return a stored variant for the topic, generating one only on a miss"""
+    variants = SampleResponse.query.filter_by(
+        topic_key=topic_key(topic), prompt_version=SAMPLE_PROMPT_VERSION
+    ).all()
+    if variants:
+        return random.choice(variants).text
+
+    text = generate_sample_response(client, topic)
+    try:
+        question = Question.query.filter_by(question=topic).first()
+        _store(topic, text, question.id if question else None)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Sample response store error: {e}")
+    return text
+
+
+warmup_status = {'running': False, 'generated': 0, 'failed': 0, 'total': 0,
+                 'started_at': None, 'finished_at': None}
+_warmup_lock = threading.Lock()
+
+
+def warm_up(client, variants=SAMPLE_RESPONSE_VARIANTS):
+    """Top up every question in the bank to `variants` stored samples"""
+    questions = Question.query.all()
+    warmup_status.update(generated=0, failed=0, total=0,
+                         started_at=datetime.utcnow().isoformat(), finished_at=None)
+
+    for question in questions:
+        existing = SampleResponse.query.filter_by(
+            topic_key=topic_key(question.question), prompt_version=SAMPLE_PROMPT_VERSION
+        ).count()
+        missing = max(0, variants - existing)
+        warmup_status['total'] += missing
+        for _ in range(missing):
+            try:
+                text = generate_sample_response(client, question.question)
+                _store(question.question, text, question.id)
+                warmup_status['generated'] += 1
+            except Exception as e:
+                db.session.rollback()
+                warmup_status['failed'] += 1
+                print(f"Warm-up failed for question {question.id}: {e}")
+
+    warmup_status['finished_at'] = datetime.utcnow().isoformat()
+    print(f"✅ Sample response warm-up: {warmup_status['generated']} generated, "
+          f"{warmup_status['failed']} failed")
+    return warmup_status
+
+
+def start_warm_up(app, client, variants=SAMPLE_RESPONSE_VARIANTS):
+    """Run warm_up in a background thread; returns False if one is already running"""
+    with _warmup_lock:
+        if warmup_status['running']:
+            return False
+        warmup_status['running'] = True
+
+    def run():
+        try:
+            with app.app_context():
+                warm_up(client, variants)
+        finally:
+            warmup_status['running'] = False
+
+    threading.Thread(target=run, name="sample-warmup", daemon=True).start()
+    return True
@@ -0,0 +1,176 @@
+import re
+import html
+
+from sqlalchemy import text, or_
+
+from database import db, Question, Sample
+
+# Highlight markers used inside the database; the snippet is HTML-escaped
+# first and only these are turned into <mark> tags
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+# catalog -> searchable columns, most important first (weights / bm25 boosts
+# follow this order), plus the column Postgres builds snippets from
+SEARCH_CATALOGS = {
+    'samples': {'model': Sample, 'table': 'samples',
+                'columns': ('topic', 'question', 'speaker', 'transcript'),
+                'boosts': (10.0, 5.0, 2.0, 1.0), 'snippet': 'transcript'},
+    'questions': {'model': Question, 'table': 'questions',
+                  'columns': ('topic', 'question', 'category'),
+                  'boosts': (5.0, 2.0, 1.0), 'snippet': 'question'},
+}
+
+
+def _highlight(snippet):
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _pg_vector(spec):
+    # Must match the indexed expression exactly for the planner to use it
+    return ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(spec['columns'], 'ABCD')
+    )
+
+
+def _fts5_query(query):
+    """Quote every term (FTS5 syntax characters are literal) and prefix-match the last"""
+    terms = re.findall(r'\w+', query, re.UNICODE)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchIndex:
+    """Ranked full-text search over samples and questions.
+
+    Postgres: GIN indexes on weighted tsvector expressions, which the
+    database keeps current on every write. SQLite: FTS5 external-content
+    tables kept in sync by triggers, so ORM writes, bulk imports and raw
+    SQL are all indexed. Other databases fall back to an unranked LIKE scan.
+    """
+
+    def __init__(self):
+        self.dialect = None    # 'postgresql', 'sqlite' or 'like'; detected on first search
+
+    def _detect(self):
+        name = db.engine.dialect.name
+        if name == 'sqlite':
+            tables = {row[0] for row in db.session.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            if all(f"{spec['table']}_fts" in tables for spec in SEARCH_CATALOGS.values()):
+                return 'sqlite'
+            return 'like'
+        return 'postgresql' if name == 'postgresql' else 'like'
+
+    def setup(self):
+        """Create missing indexes/tables; call inside an app context after create_all"""
+        self.dialect = db.engine.dialect.name
+        if self.dialect == 'postgresql':
+            for name, spec in SEARCH_CATALOGS.items():
+                db.session.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{spec['table']}_search "
+                    f"ON {spec['table']} USING GIN (({_pg_vector(spec)}))"
+                ))
+            db.session.commit()
+        elif self.dialect == 'sqlite':
+            try:
+                for name, spec in SEARCH_CATALOGS.items():
+                    self._setup_fts5(spec)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.dialect = 'like'
+                print(f"⚠️ FTS5 unavailable, search falls back to LIKE: {e}")
+
+    def _setup_fts5(self, spec):
+        table = spec['table']
+        fts = f"{table}_fts"
+        columns = ', '.join(spec['columns'])
+        new_values = ', '.join(f"new.{c}" for c in spec['columns'])
+        old_values = ', '.join(f"old.{c}" for c in spec['columns'])
+
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': fts}
+        ).first()
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{columns}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+        ))
+        db.session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        db.session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        ))
+        db.session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        if not exists:
+            # Index rows that existed before the table did
+            db.session.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"))
+
+    def search(self, catalog, query, limit=20, offset=0):
+        """[(id, rank, snippet_html)] best first, at most limit + 1 rows so callers can page"""
+        spec = SEARCH_CATALOGS[catalog]
+        if self.dialect is None:
+            self.dialect = self._detect()
+        if self.dialect == 'postgresql':
+            rows = self._search_postgres(spec, query, limit + 1, offset)
+        elif self.dialect == 'sqlite':
+            rows = self._search_fts5(spec, query, limit + 1, offset)
+        else:
+            rows = self._search_like(spec, query, limit + 1, offset)
+        return [(row[0], row[1], _highlight(row[2])) for row in rows]
+
+    def _search_postgres(self, spec, query, limit, offset):
+        vector = _pg_vector(spec)
+        # Rank and page first, then build headlines for the page only
+        # (ts_headline re-parses the document)
+        return db.session.execute(text(f"""
+            WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+            hits AS (
+                SELECT t.id, ts_rank({vector}, q.query) AS rank
+                FROM {spec['table']} t, q
+                WHERE {vector} @@ q.query
+                ORDER BY rank DESC, t.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT hits.id, hits.rank,
+                   ts_headline('english', coalesce(t.{spec['snippet']}, ''), q.query,
+                               'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxFragments=2, MinWords=8, MaxWords=20')
+            FROM hits JOIN {spec['table']} t ON t.id = hits.id, q
+            ORDER BY hits.rank DESC, hits.id DESC
+        """), {'query': query, 'limit': limit, 'offset': offset}).all()
+
+    def _search_fts5(self, spec, query, limit, offset):
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        fts = f"{spec['table']}_fts"
+        boosts = ', '.join(str(b) for b in spec['boosts'])
+        # bm25 is lower-is-better; negate so rank reads like Postgres
+        return db.session.execute(text(f"""
+            SELECT rowid, -bm25({fts}, {boosts}) AS rank,
+                   snippet({fts}, -1, '{_MARK_START}', '{_MARK_END}', '…', 16)
+            FROM {fts}
+            WHERE {fts} MATCH :match
+            ORDER BY bm25({fts}, {boosts}), rowid DESC
+            LIMIT :limit OFFSET :offset
+        """), {'match': match, 'limit': limit, 'offset': offset}).all()
+
+    def _search_like(self, spec, query, limit, offset):
+        model = spec['model']
+        pattern = f"%{query}%"
+        rows = (model.query
+                .filter(or_(*[getattr(model, c).ilike(pattern) for c in spec['columns']]))
+                .order_by(model.id.desc()).limit(limit).offset(offset).all())
+        return [(row.id, 0.0, (getattr(row, spec['snippet']) or '')[:200]) for row in rows]
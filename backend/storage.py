@@ -0,0 +1,153 @@
+import os
+import shutil
+
+from audio import decode_pcm, encode_preview, waveform_peaks, AudioDecodeError
+
+CONTENT_TYPES = {'.wav': 'audio/wav', '.mp3': 'audio/mpeg', '.m4a': 'audio/mp4',
+                 '.webm': 'audio/webm', '.ogg': 'audio/ogg'}
+
+
+class LocalStorage:
+    """Audio files in a local folder, served by the app under base_url.
+
+    Used for development and tests, and on single-node deployments that
+    don't want a third-party store.
+    """
+
+    def __init__(self, root, base_url='/api/media/'):
+        self.root = root
+        self.base_url = base_url
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, path, key):
+        """Store the file at path under key (extension kept); returns its URL"""
+        name = key + os.path.splitext(path)[1].lower()
+        target = os.path.join(self.root, name)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+        return self.base_url + name
+
+    def path(self, name):
+        """Local path for a stored name, or None if it escapes the root or is missing"""
+        target = os.path.realpath(os.path.join(self.root, name))
+        if not target.startswith(os.path.realpath(self.root) + os.sep) or not os.path.isfile(target):
+            return None
+        return target
+
+
+class CloudinaryStorage:
+    """Audio files on Cloudinary (uploaded as 'video' resources)"""
+
+    def __init__(self, folder='necs_samples', chunk_size=6 * 1024 * 1024):
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self._uploader = None
+
+    def uploader(self):
+        # Imported and configured on the first upload, not at worker boot
+        if self._uploader is None:
+            import cloudinary
+            import cloudinary.uploader
+            cloudinary.config(
+                cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+                api_key=os.getenv('CLOUDINARY_API_KEY'),
+                api_secret=os.getenv('CLOUDINARY_API_SECRET'),
+                secure=True
+            )
+            self._uploader = cloudinary.uploader
+        return self._uploader
+
+    def put(self, path, key):
+        # Sent in chunks so a long recording never needs one huge request;
+        # same key -> same public_id, so re-uploading is idempotent
+        result = self.uploader().upload_large(
+            path,
+            resource_type="video",
+            folder=self.folder,
+            public_id=key,
+            overwrite=True,
+            chunk_size=self.chunk_size
+        )
+        return result['secure_url']
+
+
+class S3Storage:
+    """Audio files in an S3-compatible bucket (AWS, R2, MinIO, ...).
+
+    Files above chunk_size go up as multipart uploads. public_base_url is
+    the URL the bucket (or its CDN) serves objects from.
+    """
+
+    def __init__(self, bucket, public_base_url, prefix='samples/', endpoint_url=None,
+                 chunk_size=8 * 1024 * 1024):
+        import boto3    # only needed when this backend is selected
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_base_url = public_base_url.rstrip('/') + '/'
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.transfer_config = TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size)
+
+    def put(self, path, key):
+        extension = os.path.splitext(path)[1].lower()
+        name = f"{self.prefix}{key}{extension}"
+        self.client.upload_file(
+            path, self.bucket, name,
+            ExtraArgs={'ContentType': CONTENT_TYPES.get(extension, 'application/octet-stream'),
+                       'CacheControl': 'public, max-age=31536000, immutable'},
+            Config=self.transfer_config
+        )
+        return self.public_base_url + name
+
+
+def derive_sample_media(storage, path, key):
+    """Waveform peaks and a stored low-bitrate preview; returns (preview_url, peaks).
+
+    The audio is decoded once for both. Either is None when it can't be
+    made (undecodable file, ffmpeg without libopus) - the sample then just
+    plays the original.
+    """
+    try:
+        audio = decode_pcm(path)
+    except AudioDecodeError as e:
+        print(f"⚠️ No waveform or preview for {key}: {e}")
+        return None, None
+    peaks = waveform_peaks(audio)
+
+    preview_path = f"{os.path.splitext(path)[0]}.preview.ogg"
+    try:
+        encode_preview(audio, preview_path)
+        return storage.put(preview_path, f"{key}_preview"), peaks
+    except AudioDecodeError as e:
+        print(f"⚠️ No preview for {key}: {e}")
+        return None, peaks
+    finally:
+        if os.path.exists(preview_path):
+            os.remove(preview_path)
+
+
+def store_sample_media(storage, path, key):
+    """Store a sample's original plus its preview; returns {'audio_url', 'preview_url', 'peaks'}"""
+    audio_url = storage.put(path, key)
+    preview_url, peaks = derive_sample_media(storage, path, key)
+    return {'audio_url': audio_url, 'preview_url': preview_url, 'peaks': peaks}
+
+
+def create_storage(kind=None):
+    """Storage backend from AUDIO_STORAGE: cloudinary (default), s3 or local"""
+    kind = kind or os.getenv('AUDIO_STORAGE', 'cloudinary')
+    if kind == 'local':
+        return LocalStorage(os.getenv('LOCAL_STORAGE_DIR', os.path.join('uploads', 'media')),
+                            os.getenv('MEDIA_BASE_URL', '/api/media/'))
+    if kind == 's3':
+        return S3Storage(
+            os.getenv('S3_BUCKET'),
+            os.getenv('S3_PUBLIC_BASE_URL'),
+            prefix=os.getenv('S3_PREFIX', 'samples/'),
+            endpoint_url=os.getenv('S3_ENDPOINT_URL')
+        )
+    if kind == 'cloudinary':
+        return CloudinaryStorage(os.getenv('CLOUDINARY_FOLDER', 'necs_samples'))
+    raise ValueError(f"Unknown AUDIO_STORAGE: {kind}")
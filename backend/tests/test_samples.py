@@ -0,0 +1,49 @@
+"""Sample detail visibility. Run from backend/: python -m pytest tests"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, init_db
+from database import db, Sample
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"})
+    with app.app_context():
+        init_db()
+        for status in ('ready', 'pending', 'failed'):
+            db.session.add(Sample(filename=f"{status}.mp3", topic='Topic', speaker='Speaker', transcript='...',
+                                  feedback='...', content_hash=status, upload_status=status))
+        db.session.commit()
+        ids = {sample.upload_status: sample.id for sample in Sample.query.all()}
+    client = app.test_client()
+    client.sample_ids = ids
+    return client
+
+
+def login_admin(client):
+    with client.session_transaction() as session:
+        session['admin_authenticated'] = True
+
+
+def test_public_detail_only_serves_ready_samples(client):
+    ids = client.sample_ids
+    assert client.get(f"/api/samples/{ids['ready']}").status_code == 200
+    assert client.get(f"/api/samples/{ids['pending']}").status_code == 404
+    assert client.get(f"/api/samples/{ids['failed']}").status_code == 404
+    # include_pending is ignored without an admin session
+    assert client.get(f"/api/samples/{ids['pending']}?include_pending=1").status_code == 404
+
+
+def test_admin_detail_includes_pending_when_asked(client):
+    ids = client.sample_ids
+    login_admin(client)
+    assert client.get(f"/api/samples/{ids['pending']}").status_code == 404
+    response = client.get(f"/api/samples/{ids['pending']}?include_pending=1")
+    assert response.status_code == 200
+    assert response.get_json()['sample']['upload_status'] == 'pending'
+    assert client.get(f"/api/samples/{ids['failed']}?include_pending=1").status_code == 200
@@ -0,0 +1,49 @@
+import re
+from difflib import SequenceMatcher
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", '', word.lower())
+
+
+def stitch_transcripts(texts, window=12, min_match=2):
+    """Join the transcripts of overlapping segments into one text.
+
+    The end of what has been joined so far and the start of the next
+    segment describe the same overlapping audio, so the longest run of
+    words (ignoring case and punctuation) they share is kept once: the
+    earlier text up to the end of that run, then the later text after it.
+    A run shorter than min_match words only counts when it sits exactly
+    where the two texts meet; otherwise they are simply concatenated.
+    """
+    words = []
+    for text in texts:
+        incoming = text.split()
+        if words and incoming:
+            tail = [_normalize(w) for w in words[-window:]]
+            head = [_normalize(w) for w in incoming[:window]]
+            match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+            seam = match.a + match.size == len(tail) and match.b == 0
+            if match.size >= min_match or (match.size and seam):
+                words = words[:len(words) - len(tail) + match.a + match.size]
+                incoming = incoming[match.b + match.size:]
+        words.extend(incoming)
+    return ' '.join(words)
+
+
+def stitch_words(parts, segments):
+    """Join per-segment word timestamps onto the whole recording's timeline.
+
+    Each part's times are shifted by its segment start; in the overlap
+    between neighbours, words starting before the middle of the overlap
+    come from the earlier segment and the rest from the later one.
+    """
+    cuts = [(end + next_start) / 2 for (_, end), (next_start, _) in zip(segments, segments[1:])]
+    bounds = zip([float('-inf')] + cuts, cuts + [float('inf')])
+    words = []
+    for part, (offset, _), (low, high) in zip(parts, segments, bounds):
+        for word in part:
+            start = word["start"] + offset
+            if low <= start < high:
+                words.append({**word, "start": round(start, 2), "end": round(word["end"] + offset, 2)})
+    return words
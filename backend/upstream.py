@@ -0,0 +1,275 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import metrics
+
+# One keep-alive pool per process for every Groq call; HTTP/2 multiplexes
+# concurrent requests over a single connection when the h2 package is installed
+UPSTREAM_HTTP2 = os.getenv('UPSTREAM_HTTP2', '1') != '0'
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', 20))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv('UPSTREAM_KEEPALIVE_SECONDS', 120))
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 120))
+
+
+class UpstreamBusy(Exception):
+    """No slot for the model freed up within the queue timeout"""
+
+    def __init__(self, model, retry_after):
+        super().__init__(f"Too many requests in flight to {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class MemorySlots:
+    """In-process FIFO slots - per process, so only for single-worker setups.
+
+    A caller holds a slot while its ticket is among the first `limit`
+    tickets for the model, so slots are handed out in arrival order.
+    """
+
+    def __init__(self):
+        self._tickets = {}
+        self._changed = threading.Condition()
+
+    def acquire(self, model, limit, timeout):
+        ticket = object()
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            queue = self._tickets.setdefault(model, [])
+            queue.append(ticket)
+            while queue.index(ticket) >= limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    queue.remove(ticket)
+                    self._changed.notify_all()
+                    return None
+                self._changed.wait(remaining)
+        return (model, ticket)
+
+    def release(self, token):
+        model, ticket = token
+        with self._changed:
+            self._tickets[model].remove(ticket)
+            self._changed.notify_all()
+
+
+class SQLiteSlots:
+    """FIFO slots in a WAL-mode SQLite file shared by every worker on the node.
+
+    Each caller inserts a ticket row and holds a slot while fewer than
+    `limit` older tickets exist for the model, so arrival order is kept
+    across processes without an explicit lock. Waiters poll (and are woken
+    early by releases in their own process); tickets of dead processes or
+    older than lease_seconds are reclaimed.
+    """
+
+    def __init__(self, path, lease_seconds=900, poll_interval=0.1):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._released = threading.Condition()
+        self._reaped_at = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_model ON tickets (model, id)")
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def reap(self):
+        """Drop tickets left behind by crashed workers or callers that never released"""
+        conn = self._connection()
+        conn.execute("DELETE FROM tickets WHERE updated_at < ?", (time.time() - self.lease_seconds,))
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM tickets").fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                conn.execute("DELETE FROM tickets WHERE pid = ?", (pid,))
+            except PermissionError:
+                pass
+
+    def acquire(self, model, limit, timeout):
+        conn = self._connection()
+        ticket = conn.execute(
+            "INSERT INTO tickets (model, pid, updated_at) VALUES (?, ?, ?)", (model, os.getpid(), time.time())
+        ).lastrowid
+        deadline = time.monotonic() + timeout
+        while True:
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM tickets WHERE model = ? AND id < ?", (model, ticket)
+            ).fetchone()[0]
+            if ahead < limit:
+                # The lease runs from the moment the slot is granted
+                conn.execute("UPDATE tickets SET updated_at = ? WHERE id = ?", (time.time(), ticket))
+                return ticket
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.release(ticket)
+                return None
+            conn.execute("UPDATE tickets SET updated_at = ? WHERE id = ?", (time.time(), ticket))
+            if time.monotonic() - self._reaped_at > self.poll_interval * 10:
+                self._reaped_at = time.monotonic()
+                self.reap()
+            with self._released:
+                self._released.wait(min(self.poll_interval, remaining))
+
+    def release(self, ticket):
+        self._connection().execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+        with self._released:
+            self._released.notify_all()
+
+
+class UpstreamGovernor:
+    """Caps in-flight upstream calls per model; excess callers queue in order.
+
+    limits maps model -> max calls in flight (0 = unlimited), default_limit
+    covers every other model. A caller that waits longer than queue_timeout
+    gets UpstreamBusy instead of a slot.
+    """
+
+    def __init__(self, slots, limits=None, default_limit=8, queue_timeout=60, retry_after=30):
+        self.slots = slots
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    def limit(self, model):
+        return self.limits.get(model, self.default_limit)
+
+    def acquire(self, model):
+        """Block until model has a free slot; returns a token for release()"""
+        limit = self.limit(model)
+        if not limit:
+            return None
+        started = time.perf_counter()
+        token = self.slots.acquire(model, limit, self.queue_timeout)
+        metrics.UPSTREAM_QUEUE_SECONDS.labels(model).observe(time.perf_counter() - started)
+        if token is None:
+            metrics.UPSTREAM_REJECTED.labels(model).inc()
+            raise UpstreamBusy(model, self.retry_after)
+        metrics.UPSTREAM_IN_FLIGHT.labels(model).inc()
+        return (model, token)
+
+    def release(self, token):
+        if token is None:
+            return
+        model, slot = token
+        metrics.UPSTREAM_IN_FLIGHT.labels(model).dec()
+        self.slots.release(slot)
+
+    @contextmanager
+    def slot(self, model):
+        token = self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release(token)
+
+
+def parse_limits(spec):
+    """'whisper-large-v3-turbo=4,llama-3.3-70b-versatile=6' -> {model: limit}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        model, _, limit = item.rpartition('=')
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+def create_http_client():
+    """The pooled httpx client handed to the Groq SDK"""
+    import httpx
+
+    http2 = UPSTREAM_HTTP2
+    if http2:
+        try:
+            import h2    # noqa: F401 - httpx needs it for HTTP/2
+        except ImportError:
+            print("⚠️ h2 is not installed, upstream calls use HTTP/1.1 keep-alive")
+            http2 = False
+    return httpx.Client(
+        http2=http2,
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_SECONDS,
+        ),
+    )
+
+
+class _GovernedStream:
+    """Iterates a streamed completion, holding its slot until the stream ends or is closed"""
+
+    def __init__(self, stream, governor, token):
+        self._stream = stream
+        self._governor = governor
+        self._token = token
+        self._released = False
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            try:
+                if hasattr(self._stream, 'close'):
+                    self._stream.close()
+            finally:
+                self._governor.release(self._token)
+
+    def __del__(self):
+        self.close()
+
+
+class _GovernedEndpoint:
+    def __init__(self, endpoint, governor):
+        self._endpoint = endpoint
+        self._governor = governor
+
+    def create(self, **kwargs):
+        token = self._governor.acquire(kwargs.get('model'))
+        try:
+            result = self._endpoint.create(**kwargs)
+        except BaseException:
+            self._governor.release(token)
+            raise
+        if kwargs.get('stream'):
+            return _GovernedStream(result, self._governor, token)
+        self._governor.release(token)
+        return result
+
+
+class GovernedClient:
+    """A Groq client whose create() calls each take a governor slot for their model"""
+
+    def __init__(self, client, governor):
+        self.client = client
+        self.chat = SimpleNamespace(completions=_GovernedEndpoint(client.chat.completions, governor))
+        self.audio = SimpleNamespace(transcriptions=_GovernedEndpoint(client.audio.transcriptions, governor))
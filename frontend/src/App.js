@@ -399,6 +399,8 @@ export default function SpeakUpApp() {
                     </div>
                   )}
 
+                  <RelatedSamples samples={results.related_samples} />
+
                   <div className="flex gap-3">
                     <button onClick={downloadDocument} className="inline-flex items-center justify-center gap-2 flex-1 py-3 rounded-xl bg-[#1e90ff] text-white"><Download size={16} /> Download Report</button>
                     <button onClick={reset} className="py-3 px-6 rounded-xl bg-gray-700">New Analysis</button>
@@ -462,7 +464,7 @@ function SimulationMode() {
     }
 
     try {
-      const response = await fetch(`${API_BASE_URL}/api/questions/random`);
+      const response = await fetch(`${API_BASE_URL}/api/questions/random?no_repeat=1`, { credentials: 'include' });
       const data = await response.json();
       
       if (data.error) {
@@ -747,7 +749,7 @@ function SimulationMode() {
                   setCountdown(60);
                   
                   try {
-                    const response = await fetch(`${API_BASE_URL}/api/questions/random`);
+                    const response = await fetch(`${API_BASE_URL}/api/questions/random?no_repeat=1`, { credentials: 'include' });
                     const data = await response.json();
                     
                     if (data.error) {
@@ -919,6 +921,8 @@ function SimulationMode() {
               </div>
             )}
 
+            <RelatedSamples samples={results.related_samples} />
+
             <div className="flex gap-3">
               <button
                 onClick={downloadSimulationReport}
@@ -1107,6 +1111,7 @@ function AdminPanel({ onClose }) {
   const [uploading, setUploading] = useState(false);
   const [message, setMessage] = useState('');
   const [samples, setSamples] = useState([]);
+  const [samplesCursor, setSamplesCursor] = useState(null);
   const [loadingSamples, setLoadingSamples] = useState(true);
   const [editingId, setEditingId] = useState(null);
   const [editData, setEditData] = useState({});
@@ -1124,12 +1129,13 @@ function AdminPanel({ onClose }) {
     if (activeTab === 'questions') fetchQuestions();
   }, [activeTab]);
 
-  const fetchSamples = async () => {
-    setLoadingSamples(true);
+  const fetchSamples = async (cursor = null) => {
+    if (!cursor) setLoadingSamples(true);
     try {
-      const res = await fetch(`${API_BASE_URL}/api/samples`);
+      const res = await fetch(`${API_BASE_URL}/api/samples?include_pending=1${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`, { credentials: 'include' });
       const data = await res.json();
-      setSamples(data.samples || []);
+      setSamples(prev => cursor ? [...prev, ...(data.samples || [])] : (data.samples || []));
+      setSamplesCursor(data.next_cursor || null);
     } catch (e) {
       console.error(e);
     } finally {
@@ -1176,7 +1182,7 @@ function AdminPanel({ onClose }) {
       });
       const data = await response.json();
       if (data.success) {
-        setMessage('✓ Sample uploaded successfully!');
+        setMessage('✓ Sample saved! The audio is uploading in the background.');
         setAudioFile(null);
         setTopic('');
         setQuestion('');
@@ -1192,7 +1198,16 @@ function AdminPanel({ onClose }) {
     }
   };
 
-  const startEdit = (sample) => {
+  const startEdit = async (summary) => {
+    // The list only carries summaries; transcript and feedback come from the detail endpoint
+    let sample = summary;
+    try {
+      const res = await fetch(`${API_BASE_URL}/api/samples/${summary.id}`);
+      const data = await res.json();
+      if (data.sample) sample = data.sample;
+    } catch (e) {
+      console.error(e);
+    }
     setEditingId(sample.id);
     setEditData({
       topic: sample.topic || '',
@@ -1408,7 +1423,11 @@ function AdminPanel({ onClose }) {
                     <div className="flex justify-between items-start gap-3">
                       <div>
                         <div className="font-bold">{s.topic}</div>
-                        <div className="text-xs text-gray-400">{s.speaker} • {s.score}/2.0</div>
+                        <div className="text-xs text-gray-400">
+                          {s.speaker} • {s.score}/2.0
+                          {s.upload_status === 'pending' && <span className="ml-2 text-amber-400">Uploading audio…</span>}
+                          {s.upload_status === 'failed' && <span className="ml-2 text-red-400">Upload failed, upload the file again to retry</span>}
+                        </div>
                       </div>
                       <div className="flex gap-2">
                         <button onClick={() => startEdit(s)} className="px-2 py-1 rounded bg-blue-600 text-white"><Edit3 size={14} /></button>
@@ -1433,6 +1452,9 @@ function AdminPanel({ onClose }) {
                     ) : null}
                   </div>
                 ))}
+                {samplesCursor && (
+                  <button onClick={() => fetchSamples(samplesCursor)} className="w-full py-2 rounded bg-gray-700">Load more</button>
+                )}
               </div>
             )}
           </div>
@@ -1529,21 +1551,75 @@ function AdminPanel({ onClose }) {
   );
 }
 
+function RelatedSamples({ samples }) {
+  if (!samples || samples.length === 0) return null;
+  return (
+    <div className="p-4 rounded-xl bg-gray-800 border border-gray-700">
+      <h4 className="font-bold mb-2">Compare With Similar Samples</h4>
+      <div className="space-y-2">
+        {samples.map(sample => (
+          <div key={sample.id} className="flex justify-between items-center gap-3 p-2 rounded bg-gray-900 border border-gray-700">
+            <div>
+              <div className="text-sm font-bold">{sample.topic}</div>
+              <div className="text-xs text-gray-400">{sample.speaker} • {sample.score}/2.0</div>
+            </div>
+            <a href={sample.previewUrl || sample.audioUrl} target="_blank" rel="noreferrer" className="px-3 py-1 rounded bg-gray-700 text-sm">Listen</a>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+}
+
+function Waveform({ peaks }) {
+  // Peaks (0-100) are precomputed by the server, so no client-side decoding
+  if (!peaks || peaks.length === 0) return null;
+  return (
+    <svg viewBox={`0 0 ${peaks.length} 100`} preserveAspectRatio="none" className="w-full h-16 mb-4">
+      {peaks.map((peak, i) => (
+        <rect key={i} x={i + 0.15} y={50 - Math.max(peak, 1) / 2} width={0.7} height={Math.max(peak, 1)} fill="#1e90ff" />
+      ))}
+    </svg>
+  );
+}
+
 function SampleLibrary() {
   const [samples, setSamples] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
   const [selectedSample, setSelectedSample] = useState(null);
   const [playingId, setPlayingId] = useState(null);
   const audioRef = useRef(null);
 
   useEffect(() => { fetchSamples(); }, []);
 
-  const fetchSamples = async () => {
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    // Search the whole library on the server once typing pauses
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(`${API_BASE_URL}/api/samples/search?q=${encodeURIComponent(query)}`);
+        const data = await res.json();
+        setSearchResults(data.results || []);
+      } catch (e) {
+        console.error(e);
+      }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const fetchSamples = async (cursor = null) => {
     try {
-      const res = await fetch(`${API_BASE_URL}/api/samples`);
+      const res = await fetch(`${API_BASE_URL}/api/samples${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`);
       const data = await res.json();
-      setSamples(data.samples || []);
+      setSamples(prev => cursor ? [...prev, ...(data.samples || [])] : (data.samples || []));
+      setNextCursor(data.next_cursor || null);
     } catch (e) {
       console.error(e);
     } finally {
@@ -1551,11 +1627,19 @@ function SampleLibrary() {
     }
   };
 
-  const filteredSamples = samples.filter(sample =>
-    sample.topic.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    (sample.speaker || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-    (sample.tags || []).some(tag => tag.toLowerCase().includes(searchTerm.toLowerCase()))
-  );
+  const viewSample = async (sample) => {
+    setSelectedSample(sample);
+    try {
+      const res = await fetch(`${API_BASE_URL}/api/samples/${sample.id}`);
+      const data = await res.json();
+      if (data.sample) setSelectedSample(data.sample);
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
+  const filteredSamples = searchResults || samples;
+  const playingSample = playingId && filteredSamples.find(s => s.id === playingId);
 
   const openPlayback = (sampleId, audioUrl) => {
     // Just open the playback bar without auto-playing
@@ -1586,7 +1670,7 @@ function SampleLibrary() {
       </div>
 
       <div className="p-3 bg-gray-800 border border-gray-700 rounded">
-        <input type="text" placeholder="Search by topic, speaker, or tag..." value={searchTerm} onChange={(e) => setSearchTerm(e.target.value)} className="w-full px-3 py-2 rounded bg-gray-900 border border-gray-700" />
+        <input type="text" placeholder="Search by topic, speaker, or words in the speech..." value={searchTerm} onChange={(e) => setSearchTerm(e.target.value)} className="w-full px-3 py-2 rounded bg-gray-900 border border-gray-700" />
       </div>
 
       {filteredSamples.length === 0 ? (
@@ -1604,18 +1688,26 @@ function SampleLibrary() {
               </div>
 
               <div className="mb-2 text-sm text-[#d1d1d1] italic">{sample.question || '(no question provided)'}</div>
+              {/* Snippets are HTML-escaped by the server apart from the <mark> highlights */}
+              {sample.snippet && (
+                <div className="mb-2 text-xs text-gray-400" dangerouslySetInnerHTML={{ __html: sample.snippet }} />
+              )}
               <div className="flex gap-2">
-                <button onClick={() => openPlayback(sample.id, sample.audioUrl)} className="px-3 py-2 rounded bg-gray-700">Playback</button>
+                <button onClick={() => openPlayback(sample.id, sample.previewUrl || sample.audioUrl)} className="px-3 py-2 rounded bg-gray-700">Playback</button>
                 <button onClick={() => downloadAudio(sample.filename, sample.audioUrl)} className="px-3 py-2 rounded bg-gray-700">Download</button>
-                <button onClick={() => setSelectedSample(sample)} className="px-3 py-2 rounded bg-[#1e90ff] text-white">View</button>
+                <button onClick={() => viewSample(sample)} className="px-3 py-2 rounded bg-[#1e90ff] text-white">View</button>
               </div>
             </div>
           ))}
         </div>
       )}
 
+      {nextCursor && !searchResults && (
+        <button onClick={() => fetchSamples(nextCursor)} className="w-full py-2 rounded bg-gray-800 border border-gray-700">Load more</button>
+      )}
+
       <audio ref={audioRef} onEnded={() => setPlayingId(null)} onPause={() => setPlayingId(null)} />
-      {playingId && (<PlaybackBar audioUrl={samples.find(s => s.id === playingId)?.audioUrl} onClose={() => {audioRef.current?.pause(); setPlayingId(null);}}/>)}
+      {playingSample && (<PlaybackBar audioUrl={playingSample.previewUrl || playingSample.audioUrl} onClose={() => {audioRef.current?.pause(); setPlayingId(null);}}/>)}
 
       {selectedSample && (
         <div className="fixed inset-0 bg-black/60 flex items-center justify-center z-50 p-4">
@@ -1628,6 +1720,8 @@ function SampleLibrary() {
               <button onClick={() => setSelectedSample(null)} className="text-xl font-bold">×</button>
             </div>
 
+            <Waveform peaks={selectedSample.peaks} />
+
             {selectedSample.transcript && (
               <div className="mb-4">
                 <h4 className="font-bold mb-2">Transcript</h4>